@@ -1,127 +1,1644 @@
+import argparse
+import bisect
+import collections
+import collections.abc
+import contextlib
+import datetime
+import heapq
+import io
+import itertools
+import json
 import math
+import re
+import sys
+import threading
+import time
+import weakref
 
 
 class Task:
+    # Tasks are held in large numbers, so they keep their memos without a
+    # container in the common case: __memos is None, a single memo, or a
+    # tuple of memos if the task belongs to more than one.
+    __slots__ = ("__description", "__is_completed", "__memos", "__weakref__")
+
+    # Completion and memos of a task may be changed by several threads at
+    # once, through any of its memos. Such changes hold one of these locks,
+    # picked by the identity of the task, and never wait for another lock
+    # while holding it. Changes of many tasks at once take all locks in
+    # order instead, which is cheaper than taking one lock per task.
+    __locks = tuple(threading.Lock() for _ in range(64))
+
     def __init__(self, description):
-        self.description = description
-        self.is_completed = False
+        self.__description = description
+        self.__is_completed = False
+        self.__memos = None
+
+    @property
+    def description(self):
+        return self.__description
+
+    @description.setter
+    def description(self, description):
+        with Task.__lock_of(self):
+            previous_description = self.__description
+            self.__description = description
+            memos = self.__attached_memos()
+
+        for memo in memos:
+            memo._on_task_description_changed(self, previous_description)
+
+    @property
+    def is_completed(self):
+        return self.__is_completed
+
+    @is_completed.setter
+    def is_completed(self, is_completed):
+        is_completed = bool(is_completed)
+
+        with Task.__lock_of(self):
+            if is_completed == self.__is_completed:
+                return
+
+            self.__is_completed = is_completed
+            memos = self.__attached_memos()
+
+        for memo in memos:
+            memo._on_task_completion_changed(self, is_completed)
 
     def complete(self):
         self.is_completed = True
 
+    @staticmethod
+    def _create_all(task_data):
+        """Returns new tasks for (description, is_completed) pairs.
+
+        This is how tasks are copied or loaded, i.e. from storage or from
+        another process.
+        """
+        tasks = []
+
+        for description, is_completed in task_data:
+            task = Task(description)
+            # The task belongs to no memo yet, so there is no one to tell.
+            task.__is_completed = bool(is_completed)
+            tasks.append(task)
+
+        return tasks
+
+    def _share_description(self, description):
+        """Replaces the description by an equal copy, i.e. a shared one.
+
+        The memos are not told, as the description does not change. If it
+        was changed in the meantime, the new one is kept.
+        """
+        with Task.__lock_of(self):
+            if self.__description == description:
+                self.__description = description
+
+    def _attach_to(self, memo):
+        """Attaches the task to memo and returns whether it was open then."""
+        with Task.__lock_of(self):
+            if self.__memos is None:
+                self.__memos = memo
+            else:
+                self.__memos = self.__attached_memos() + (memo,)
+
+            return not self.__is_completed
+
+    def _detach_from(self, memo):
+        """Detaches the task from memo and returns whether it was open."""
+        with Task.__lock_of(self):
+            self.__detach(memo)
+            return not self.__is_completed
+
+    def _complete_for(self, memo):
+        """Completes the task on behalf of the given memo.
+
+        Returns None if the task was completed already, otherwise the other
+        memos of the task, which the caller tells about the completion once
+        it released its own lock (see _complete_all).
+        """
+        with Task.__lock_of(self):
+            if self.__is_completed:
+                return None
+
+            self.__is_completed = True
+
+            if self.__memos is memo:
+                return ()
+
+            return tuple(other_memo for other_memo
+                         in self.__attached_memos() if other_memo is not memo)
+
+    def __detach(self, memo):
+        memos = self.__attached_memos()
+
+        for index, attached_memo in enumerate(memos):
+            if attached_memo is memo:
+                memos = memos[:index] + memos[index + 1:]
+                break
 
-class Memo:
-    def __init__(self, name, tasks=None):
-        if tasks is None:
-            tasks = []
+        if len(memos) == 0:
+            self.__memos = None
+        elif len(memos) == 1:
+            self.__memos = memos[0]
+        else:
+            self.__memos = memos
+
+    def __attached_memos(self):
+        if self.__memos is None:
+            return ()
+        elif type(self.__memos) is tuple:
+            return self.__memos
+        else:
+            return (self.__memos,)
+
+    @staticmethod
+    def __lock_of(task):
+        # Objects are aligned to 16 bytes, so the lowest bits of their ids
+        # would leave most of the locks unused.
+        return Task.__locks[(id(task) >> 4) % len(Task.__locks)]
+
+    @staticmethod
+    def __acquire_locks_of(tasks):
+        # Only the locks of the given tasks are taken, so bulk operations on
+        # unrelated tasks do not wait for each other. They are taken in the
+        # order of the locks, so that two of them never deadlock.
+        if len(tasks) == 1:
+            locks = (Task.__lock_of(tasks[0]),)
+        else:
+            lock_count = len(Task.__locks)
+            locks = [Task.__locks[index] for index in sorted(
+                {(id(task) >> 4) % lock_count for task in tasks})]
+
+        for lock in locks:
+            lock.acquire()
+
+        return locks
+
+    @staticmethod
+    def __release(locks):
+        for lock in locks:
+            lock.release()
+
+    @staticmethod
+    def _attach_all_to(tasks, memo):
+        """Attaches the tasks to memo and returns which of them are open.
+
+        The flags are returned as a bytearray, with 1 for every open task.
+
+        Both happen under the lock of the tasks, so a concurrent completion
+        is either seen here or reported to the memo afterwards.
+        """
+        open_flags = bytearray(len(tasks))
+        locks = Task.__acquire_locks_of(tasks)
+
+        try:
+            for index, task in enumerate(tasks):
+                if task.__memos is None:
+                    task.__memos = memo
+                else:
+                    task.__memos = task.__attached_memos() + (memo,)
+
+                if not task.__is_completed:
+                    open_flags[index] = 1
+        finally:
+            Task.__release(locks)
+
+        return open_flags
+
+    @staticmethod
+    def _detach_all_from(tasks, memo):
+        """Detaches the tasks from memo and returns how many were open."""
+        open_task_count = 0
+        locks = Task.__acquire_locks_of(tasks)
+
+        try:
+            for task in tasks:
+                if task.__memos is memo:
+                    task.__memos = None
+                else:
+                    task.__detach(memo)
+
+                if not task.__is_completed:
+                    open_task_count += 1
+        finally:
+            Task.__release(locks)
+
+        return open_task_count
+
+    @staticmethod
+    def _complete_all(tasks, memo):
+        """Completes all tasks on behalf of the given memo.
+
+        Returns the tasks that were open before, so the caller can update its
+        own bookkeeping in one step, and the (memo, task) pairs of the other
+        memos which have to be told about the completion. The caller tells
+        them once it released its own lock, so that no thread ever waits for
+        the lock of one memo while holding the lock of another.
+        """
+        completed_tasks = []
+        other_memo_tasks = []
+        locks = Task.__acquire_locks_of(tasks)
+
+        try:
+            for task in tasks:
+                if task.__is_completed:
+                    continue
+
+                task.__is_completed = True
+                completed_tasks.append(task)
+
+                if task.__memos is not memo:
+                    for other_memo in task.__attached_memos():
+                        if other_memo is not memo:
+                            other_memo_tasks.append((other_memo, task))
+        finally:
+            Task.__release(locks)
+
+        return completed_tasks, other_memo_tasks
+
+
+class _TaskStates:
+    """States of the task slots of a memo, with a summary of each state.
+
+    For the open and the completed state, every level of the summary has a
+    byte per block of 64 entries of the level below, which is 1 if the
+    block holds that state. Finding the next slot in a state looks at one
+    block per level, up and down again, so it takes O(log n) steps however
+    many slots lie in between, and listing k of them O(k log n).
+    """
+
+    __slots__ = ("states", "__summaries")
+
+    __block_size = 64
+
+    def __init__(self):
+        self.states = bytearray()
+        # The summary levels by state, from the finest to the top one.
+        self.__summaries = {1: [], 2: []}
+
+    def __len__(self):
+        return len(self.states)
+
+    def append(self, state):
+        self.states.append(state)
+
+        # Only the first slot of a block changes the size of the summaries.
+        if len(self.states) % self.__block_size == 1 and self.__resize():
+            self.__refresh(0, len(self.states))
+        else:
+            self.__mark(len(self.states) - 1, state)
+
+    def extend(self, states):
+        first_slot = len(self.states)
+        self.states.extend(states)
+        self.__refresh(0 if self.__resize() else first_slot,
+                       len(self.states))
+
+    def set(self, slot, state):
+        """Changes the state of a slot and returns its previous state."""
+        states = self.states
+        previous_state = states[slot]
+
+        if previous_state != state:
+            states[slot] = state
+
+            if previous_state in self.__summaries:
+                self.__unmark(slot, previous_state)
+
+            if state in self.__summaries:
+                self.__mark(slot, state)
 
+        return previous_state
+
+    def set_all(self, slots, state):
+        """Changes the state of many slots, with one summary update."""
+        slots = list(slots)
+
+        if not slots:
+            return
+
+        for slot in slots:
+            self.states[slot] = state
+
+        first_slot = min(slots)
+        end_slot = max(slots) + 1
+
+        if len(slots) * self.__block_size >= end_slot - first_slot:
+            # Dense enough to refresh all blocks in between.
+            self.__refresh(first_slot, end_slot)
+        else:
+            for block in {slot // self.__block_size for slot in slots}:
+                first_slot = block * self.__block_size
+                self.__refresh(first_slot, first_slot + self.__block_size)
+
+    def find(self, state, start, end):
+        """Returns the first slot from start to end in state, or -1."""
+        block_size = self.__block_size
+        # Most matches are in the block of start.
+        position = self.states.find(
+            state, start, min((start // block_size + 1) * block_size, end))
+
+        if position != -1 or start >= end:
+            return position
+
+        levels = [self.states] + self.__summaries[state]
+        depth = 0
+        position = start
+
+        # Up to the first level with a match behind the position ...
+        while True:
+            level = levels[depth]
+            position = level.find(
+                state if depth == 0 else 1, position,
+                min((position // block_size + 1) * block_size, len(level)))
+
+            if position != -1:
+                break
+
+            depth += 1
+
+            if depth == len(levels):
+                return -1
+
+            position = start // block_size ** depth + 1
+
+        # ... and down along the first marked blocks.
+        while depth > 0:
+            depth -= 1
+            first_position = position * block_size
+            position = levels[depth].find(state if depth == 0 else 1,
+                                          first_position,
+                                          first_position + block_size)
+
+        return position if position < end else -1
+
+    def count(self, state, start=0, end=None):
+        return self.states.count(state, start,
+                                 len(self.states) if end is None else end)
+
+    def truncate(self, length):
+        if length >= len(self.states):
+            return
+
+        del self.states[length:]
+
+        if self.__resize():
+            self.__refresh(0, length)
+        else:
+            self.__refresh(length - 1, length)
+
+    def compact(self, removed_state):
+        """Drops the slots in removed_state, which is not summarized."""
+        self.states = self.states.replace(bytes([removed_state]), b"")
+        self.__resize()
+        self.__refresh(0, len(self.states))
+
+    def __mark(self, slot, state):
+        position = slot
+
+        for level in self.__summaries[state]:
+            position //= self.__block_size
+
+            if level[position]:
+                break
+
+            level[position] = 1
+
+    def __unmark(self, slot, state):
+        block_size = self.__block_size
+        lower_level = self.states
+        marker = state
+        position = slot
+
+        for level in self.__summaries[state]:
+            first_position = position - position % block_size
+
+            if lower_level.find(marker, first_position,
+                                first_position + block_size) != -1:
+                break
+
+            position //= block_size
+            level[position] = 0
+            lower_level = level
+            marker = 1
+
+    def __resize(self):
+        """Fits the summary levels to the slots.
+
+        Returns whether the number of levels changed, which leaves them to
+        be refreshed as a whole.
+        """
+        # The top level is a single block, which needs no summary.
+        sizes = []
+        size = len(self.states)
+
+        while size > self.__block_size:
+            size = (size - 1) // self.__block_size + 1
+            sizes.append(size)
+
+        is_resized = False
+
+        for summary in self.__summaries.values():
+            if len(summary) != len(sizes):
+                is_resized = True
+                summary[:] = [bytearray(size) for size in sizes]
+                continue
+
+            for level, size in zip(summary, sizes):
+                if len(level) < size:
+                    level.extend(bytes(size - len(level)))
+                else:
+                    del level[size:]
+
+        return is_resized
+
+    def __refresh(self, first_slot, end_slot):
+        """Recomputes the summaries of the blocks of the given slots."""
+        if first_slot >= end_slot:
+            return
+
+        block_size = self.__block_size
+
+        for state, summary in self.__summaries.items():
+            lower_level = self.states
+            marker = state
+            first_block = first_slot // block_size
+            end_block = (end_slot - 1) // block_size + 1
+
+            for level in summary:
+                for block in range(first_block, min(end_block, len(level))):
+                    first_position = block * block_size
+                    level[block] = lower_level.find(
+                        marker, first_position,
+                        first_position + block_size) != -1
+
+                lower_level = level
+                marker = 1
+                first_block //= block_size
+                end_block = (end_block - 1) // block_size + 1
+
+
+class _TaskCursor:
+    """Position of an iteration over the task slots of a memo.
+
+    The memo moves it along when it compacts its task list, so iterations
+    which release the lock between batches neither skip nor repeat tasks.
+    """
+
+    __slots__ = ("slot", "end", "__weakref__")
+
+    def __init__(self, slot, end):
+        self.slot = slot
+        self.end = end
+
+
+class Memo:
+    """List of tasks which is completed once all of its tasks are.
+
+    A memo may be used by several threads at once. Each memo has a lock of
+    its own, so threads working on different memos do not wait for each
+    other. Hold the lock to make several calls on the memo atomic. When a
+    task belongs to several memos, the other memos are told about its
+    completion right after the lock of the completing memo is released.
+    """
+
+    __slots__ = ("name", "priority", "deadline", "lock", "__tasks",
+                 "__task_slots", "__task_states", "__cursors",
+                 "__removed_task_count", "__open_task_count", "__version",
+                 "__formatter", "__listeners")
+
+    # The state of every slot of the task list is kept in _TaskStates, so
+    # open or completed tasks are found through its summaries instead of
+    # asking every task for its completion.
+    __removed = 0
+    __open = 1
+    __completed = 2
+    __states_of_open_flags = bytes([__completed, __open]) + bytes(254)
+
+    def __init__(self, name, tasks=None, priority=None, deadline=None):
         self.name = name
-        self.__tasks = tasks
+        # Both are optional, and only used by a MemoScheduler.
+        self.priority = priority
+        self.deadline = deadline
+        self.lock = threading.RLock()
+        self.__tasks = []
+        self.__task_slots = {}
+        self.__task_states = _TaskStates()
+        # The cursors of the running iterations, if there ever were any.
+        self.__cursors = None
+        self.__removed_task_count = 0
+        self.__open_task_count = 0
+        self.__version = 0
+        self.__formatter = None
+        self.__listeners = ()
+
+        if tasks is not None:
+            for task in tasks:
+                self.add_task(task)
 
     def add_task(self, task):
-        if task is not None and task not in self.__tasks:
-            self.__tasks.append(task)
+        start_time = time.perf_counter() if _metrics is not None else None
+
+        with self.lock:
+            if task is not None and id(task) not in self.__task_slots:
+                self.__append_task(task)
+
+        if start_time is not None:
+            _record_operation("add", start_time)
 
     def remove_task(self, task):
-        if task in self.__tasks:
-            self.__tasks.remove(task)
+        with self.lock:
+            slot = self.__task_slots.pop(id(task), None)
+
+            if slot is None:
+                return
+
+            self.__tasks[slot] = None
+            self.__set_task_state(slot, Memo.__removed)
+            self.__removed_task_count += 1
+            self.__version += 1
+            self.__trim_removed_tasks()
+            task._detach_from(self)
+            self._notify_listeners("remove", [task])
+
+    def add_tasks(self, tasks):
+        start_time = time.perf_counter() if _metrics is not None else None
+
+        with self.lock:
+            new_tasks = self.__add_tasks(tasks)
+            self._notify_listeners("add", new_tasks)
+
+        if start_time is not None:
+            _record_operation("add", start_time, len(new_tasks))
+
+    def _load_tasks(self, tasks):
+        """Adds tasks without telling the listeners of the memo.
+
+        This is meant for tasks which already belonged to the memo, i.e.
+        when a memo loads its tasks from storage.
+        """
+        with self.lock:
+            self.__add_tasks(tasks)
+
+    def __add_tasks(self, tasks):
+        task_slots = self.__task_slots
+        # Duplicates are dropped in one pass, keeping the first of them in
+        # place. The ids of the new tasks are kept in a set of their own,
+        # as the slots are only updated once all of them are known.
+        new_task_keys = set()
+        add_task_key = new_task_keys.add
+        new_tasks = [task for task in tasks
+                     if task is not None and id(task) not in task_slots
+                     and not (id(task) in new_task_keys
+                              or add_task_key(id(task)))]
+
+        next_slot = len(self.__tasks)
+        task_slots.update(zip(map(id, new_tasks),
+                              range(next_slot, next_slot + len(new_tasks))))
+        self.__tasks.extend(new_tasks)
+        self.__version += 1
+        open_flags = Task._attach_all_to(new_tasks, self)
+
+        # The flags are 1 for open and 0 for completed tasks.
+        self.__task_states.extend(open_flags.translate(
+            Memo.__states_of_open_flags))
+        self.__open_task_count += open_flags.count(1)
+
+        return new_tasks
+
+    def remove_tasks(self, tasks):
+        tasks = list(tasks)
+
+        with self.lock:
+            task_slots = self.__task_slots
+            task_list = self.__tasks
+            states = self.__task_states.states
+            removed_slots = []
+            removed_tasks = []
+
+            for task in tasks:
+                slot = task_slots.pop(id(task), None)
+
+                if slot is not None:
+                    task_list[slot] = None
+                    removed_slots.append(slot)
+                    removed_tasks.append(task)
+
+            self.__open_task_count -= sum(
+                1 for slot in removed_slots if states[slot] == Memo.__open)
+            self.__task_states.set_all(removed_slots, Memo.__removed)
+            self.__removed_task_count += len(removed_tasks)
+            self.__version += 1
+            self.__trim_removed_tasks()
+            Task._detach_all_from(removed_tasks, self)
+            self._notify_listeners("remove", removed_tasks)
+
+    def complete_tasks(self, task_ids):
+        start_time = time.perf_counter() if _metrics is not None else None
+        task_ids = list(task_ids)
+
+        with self.lock:
+            self.__compact_tasks()
+            tasks = self.__tasks
+
+            if task_ids and (min(task_ids) < 1
+                             or max(task_ids) > len(tasks)):
+                for task_id in task_ids:
+                    if not 0 < task_id <= len(tasks):
+                        raise InvalidTaskId(task_id)
+
+            completed_tasks, other_memo_tasks = Task._complete_all(
+                [tasks[task_id - 1] for task_id in task_ids], self)
+            # All of the tasks are completed now, including those which
+            # were completed already and are yet to be reported as such.
+            task_states = self.__task_states
+            open_state = Memo.__open
+            completed_state = Memo.__completed
+
+            if len(task_ids) * 64 > len(task_states):
+                # Counting the open tasks afterwards at C speed is cheaper
+                # than checking the state of that many tasks one by one.
+                task_states.set_all((task_id - 1 for task_id in task_ids),
+                                    completed_state)
+                self.__open_task_count = task_states.count(open_state)
+            else:
+                for task_id in task_ids:
+                    if task_states.set(task_id - 1,
+                                       completed_state) == open_state:
+                        self.__open_task_count -= 1
+
+            if self.__listeners:
+                for task in completed_tasks:
+                    self._notify_listeners("completion", task)
+
+        for other_memo, task in other_memo_tasks:
+            other_memo._on_task_completion_changed(task, True)
+
+        if start_time is not None:
+            _record_operation("complete", start_time, len(task_ids))
 
     def complete_task(self, task_id):
-        if 0 < task_id <= len(self.__tasks):
-            self.__tasks[task_id - 1].complete()
-        else:
-            raise InvalidTaskId(task_id)
+        start_time = time.perf_counter() if _metrics is not None else None
+
+        with self.lock:
+            self.__compact_tasks()
+
+            if not 0 < task_id <= len(self.__tasks):
+                raise InvalidTaskId(task_id)
+
+            task = self.__tasks[task_id - 1]
+            other_memos = task._complete_for(self)
+
+            if other_memos is not None:
+                self.__set_task_state(task_id - 1, Memo.__completed)
+                self._notify_listeners("completion", task)
+
+        for other_memo in other_memos or ():
+            other_memo._on_task_completion_changed(task, True)
+
+        if start_time is not None:
+            _record_operation("complete", start_time)
+
+    def id_task_tuples(self):
+        """Returns a live MemoTaskView of the (task id, task) tuples."""
+        return MemoTaskView(self)
 
     def list_id_task_tuples(self):
-        tuples = []
+        with self.lock:
+            self.__compact_tasks()
+            tuples = []
+
+            for index, task in enumerate(self.__tasks):
+                tuples.append((index + 1, task))
+
+            return tuples
+
+    def _iter_id_task_tuples(self, first_id=1, last_id=None, completed=None):
+        if completed is not None:
+            return self.__iter_id_task_tuples_by_state(
+                first_id, last_id,
+                Memo.__completed if completed else Memo.__open)
+
+        return self.__iter_id_task_tuples(first_id, last_id)
+
+    def __iter_id_task_tuples(self, first_id, last_id):
+        if first_id <= 1 and last_id is None:
+            task_id = 0
+
+            for task in self.__tasks:
+                if task is not None:
+                    task_id += 1
+                    yield task_id, task
+        else:
+            first_id = max(first_id, 1)
+
+            with self.lock:
+                self.__compact_tasks()
+                tasks = self.__tasks[first_id - 1:last_id]
+
+            for task_id, task in enumerate(tasks, first_id):
+                yield task_id, task
+
+    def __iter_id_task_tuples_by_state(self, first_id, last_id, state):
+        # The tasks are looked up in batches, and the lock is released in
+        # between, so asking for the first few of many tasks stays cheap.
+        # The position in between is a cursor, which __compact_tasks moves
+        # along with the tasks.
+        cursor = _TaskCursor(max(first_id, 1) - 1, last_id)
+        batch_size = 16
+
+        with self.lock:
+            if self.__cursors is None:
+                self.__cursors = weakref.WeakSet()
+
+            self.__cursors.add(cursor)
+
+        while True:
+            with self.lock:
+                self.__compact_tasks()
+                states = self.__task_states
+                end = len(states) if cursor.end is None \
+                    else min(cursor.end, len(states))
+                slot = states.find(state, cursor.slot, end)
+                id_task_tuples = []
 
-        for index, task in enumerate(self.__tasks):
-            tuples.append((index + 1, task))
+                while slot != -1 and len(id_task_tuples) < batch_size:
+                    id_task_tuples.append((slot + 1, self.__tasks[slot]))
+                    slot = states.find(state, slot + 1, end)
 
-        return tuples
+                cursor.slot = end if slot == -1 else slot
+
+            for id_task_tuple in id_task_tuples:
+                yield id_task_tuple
+
+            if slot == -1:
+                return
+
+            batch_size = min(batch_size * 2, 4096)
+
+    def next_open_task(self, after_id=0):
+        """Returns (task id, task) of the first open task after after_id."""
+        return next(self._iter_id_task_tuples(after_id + 1, completed=False),
+                    None)
+
+    def open_task_ids(self, limit=None):
+        """Returns the ids of the open tasks, or of the first limit ones."""
+        return [task_id for task_id, _ in itertools.islice(
+            self._iter_id_task_tuples(completed=False), limit)]
+
+    def completed_task_ids(self, limit=None):
+        """Returns the ids of the completed tasks, or of the first ones."""
+        return [task_id for task_id, _ in itertools.islice(
+            self._iter_id_task_tuples(completed=True), limit)]
+
+    def count_open(self):
+        completed_task_count, task_count = self.progress()
+        return task_count - completed_task_count
 
     def _get_number_of_task(self):
-        return len(self.__tasks)
+        return len(self.__tasks) - self.__removed_task_count
+
+    def _get_task_id(self, task):
+        """Returns the id of task within the memo, or None."""
+        with self.lock:
+            if id(task) not in self.__task_slots:
+                return None
+
+            self.__compact_tasks()
+            return self.__task_slots[id(task)] + 1
 
     def get_task(self, task_id):
-        if 0 < task_id <= len(self.__tasks):
-            return self.__tasks[task_id - 1]
-        else:
-            return InvalidTaskId(task_id)
+        with self.lock:
+            self.__compact_tasks()
+
+            if 0 < task_id <= len(self.__tasks):
+                return self.__tasks[task_id - 1]
+            else:
+                raise InvalidTaskId(task_id)
 
     def is_completed(self):
-        for task in self.__tasks:
-            if not task.is_completed:
-                break
+        return self.__open_task_count == 0
+
+    def progress(self):
+        with self.lock:
+            task_count = self._get_number_of_task()
+            return task_count - self.__open_task_count, task_count
+
+    def _get_version(self):
+        """Returns a number that changes whenever the rendering changes."""
+        return self.__version
+
+    def _add_listener(self, listener):
+        """Registers a callable that is told about every change of the memo.
+
+        The listener is called with the memo, the kind of change and its
+        arguments: "add" and "remove" with the list of affected tasks,
+        "completion" with the changed task, and "description" with a tuple
+        of the changed task and its previous description. It is called
+        while the memo is locked.
+        """
+        with self.lock:
+            self.__listeners += (listener,)
+
+    def _remove_listener(self, listener):
+        with self.lock:
+            self.__listeners = tuple(
+                registered_listener for registered_listener
+                in self.__listeners if registered_listener != listener)
+
+    def _on_task_description_changed(self, task, previous_description):
+        with self.lock:
+            self.__version += 1
+            self._notify_listeners("description",
+                                   (task, previous_description))
+
+    def _on_task_completion_changed(self, task, is_completed):
+        with self.lock:
+            slot = self.__task_slots.get(id(task))
+
+            if slot is None:
+                return
+
+            # Notifications of concurrent changes may arrive in any order,
+            # so the memo takes the current completion of the task rather
+            # than the reported one. Later ones then find nothing to change.
+            self.__set_task_state(slot, Memo.__completed
+                                  if task.is_completed else Memo.__open)
+            self._notify_listeners("completion", task)
+
+    def _notify_listeners(self, change, argument):
+        for listener in self.__listeners:
+            listener(self, change, argument)
+
+    def __append_task(self, task):
+        self.__task_slots[id(task)] = len(self.__tasks)
+        self.__tasks.append(task)
+        self.__version += 1
+
+        if task._attach_to(self):
+            self.__task_states.append(Memo.__open)
+            self.__open_task_count += 1
         else:
-            return True
+            self.__task_states.append(Memo.__completed)
+
+        self._notify_listeners("add", [task])
+
+    def __set_task_state(self, slot, state):
+        """Changes the state of a slot and counts the open tasks with it."""
+        previous_state = self.__task_states.set(slot, state)
 
-        return False
+        if previous_state == Memo.__open:
+            self.__open_task_count -= 1
+
+        if state == Memo.__open:
+            self.__open_task_count += 1
+
+    def __trim_removed_tasks(self):
+        # Removed tasks leave a hole in the task list, so that the slots of
+        # the remaining tasks stay valid. Holes at the end can be dropped
+        # right away, all others are closed lazily by __compact_tasks.
+        task_states = self.__task_states.states
+        task_count = len(task_states)
+
+        while task_count and task_states[task_count - 1] == Memo.__removed:
+            task_count -= 1
+
+        self.__removed_task_count -= len(self.__tasks) - task_count
+        del self.__tasks[task_count:]
+        self.__task_states.truncate(task_count)
+
+    def __compact_tasks(self):
+        if self.__removed_task_count == 0:
+            return
+
+        self.__tasks = [task for task in self.__tasks if task is not None]
+        self.__task_slots = {id(task): slot
+                             for slot, task in enumerate(self.__tasks)}
+        states = self.__task_states.states
+
+        # Each cursor moves up by the number of holes before it.
+        for cursor in self.__cursors or ():
+            cursor.slot -= states.count(Memo.__removed, 0, cursor.slot)
+
+            if cursor.end is not None:
+                cursor.end -= states.count(Memo.__removed, 0, cursor.end)
+
+        self.__task_states.compact(Memo.__removed)
+        self.__removed_task_count = 0
 
     def __str__(self):
-        memo_formatter = MemoFormatter(self)
-        return memo_formatter.format()
+        with self.lock:
+            if self.__formatter is None:
+                self.__formatter = MemoFormatter(self)
+
+            return self.__formatter.format()
+
+
+class MemoTaskView(collections.abc.Sequence):
+    """Sequence of the (task id, task) tuples of a memo, without a copy.
+
+    Unlike list_id_task_tuples, the view does not build a list of all tasks.
+    It asks the memo on every access, so it reflects later changes of the
+    memo. A slice of the view is a view of the given ids, which are fixed
+    once the slice is taken.
+    """
+
+    __slots__ = ("memo", "__task_ids")
+
+    def __init__(self, memo, task_ids=None):
+        self.memo = memo
+        self.__task_ids = task_ids
+
+    def __len__(self):
+        if self.__task_ids is None:
+            return self.memo._get_number_of_task()
+
+        return len(self.__task_ids)
+
+    def __getitem__(self, index):
+        task_ids = self.__task_ids
+
+        if task_ids is None:
+            task_ids = range(1, self.memo._get_number_of_task() + 1)
+
+        if isinstance(index, slice):
+            return MemoTaskView(self.memo, task_ids[index])
+
+        task_id = task_ids[index]
+
+        try:
+            return task_id, self.memo.get_task(task_id)
+        except InvalidTaskId:
+            raise IndexError("The task {0} does not exist anymore.".format(
+                task_id))
+
+    def __iter__(self):
+        task_ids = self.__task_ids
+
+        if task_ids is None:
+            return self.memo._iter_id_task_tuples()
+        elif task_ids.step == 1:
+            return self.memo._iter_id_task_tuples(task_ids.start,
+                                                  task_ids.stop - 1)
+        else:
+            return (self[index] for index in range(len(task_ids)))
+
+    def __repr__(self):
+        return "MemoTaskView({0!r}, {1!r})".format(self.memo.name,
+                                                    self.__task_ids)
 
 
 class MemoStack:
-    def __init__(self):
+    """Stack of memos which may be shared by several threads.
+
+    All operations on the stack are atomic. pop and pop_if_completed hold
+    the lock of the top memo as well while they check it, so the memo they
+    remove is complete at the moment it is removed.
+
+    With share_descriptions, the tasks on the stack share their equal
+    descriptions through MemoDescriptionPool.shared(stack).
+    """
+
+    __slots__ = ("memos", "__lock", "__listeners", "__shared")
+
+    # Whether the memos on the stack tell listeners about their changes.
+    _reports_memo_changes = True
+
+    def __init__(self, share_descriptions=False):
         self.memos = []
+        self.__lock = threading.RLock()
+        self.__listeners = ()
+        self.__shared = None
+
+        if share_descriptions:
+            MemoDescriptionPool.shared(self)
 
     def push(self, memo):
+        start_time = time.perf_counter() if _metrics is not None else None
+
         if memo is not None:
-            self.memos.append(memo)
+            with self.__lock:
+                self.memos.append(memo)
+                self.__notify_listeners("push", memo)
+
+        if start_time is not None:
+            _record_operation("push", start_time)
 
     def pop(self):
-        memo = self.peek()
+        start_time = time.perf_counter() if _metrics is not None else None
 
-        if memo.is_completed():
-            return self.memos.pop()
-        else:
-            raise MemoNotCompleted(memo)
+        with self.__lock:
+            memo = self.peek()
+
+            with memo.lock:
+                if not memo.is_completed():
+                    raise MemoNotCompleted(memo)
+
+                self.__pop_memo()
+
+        if start_time is not None:
+            _record_operation("pop", start_time)
+
+        return memo
+
+    def pop_if_completed(self):
+        """Pops the top memo if it is completed, otherwise returns None."""
+        start_time = time.perf_counter() if _metrics is not None else None
+        memo = None
+
+        with self.__lock:
+            if self.memos:
+                with self.memos[-1].lock:
+                    if self.memos[-1].is_completed():
+                        memo = self.__pop_memo()
+
+        # Only actual pops are counted, so the pop rate is not inflated by
+        # callers that poll an open memo.
+        if start_time is not None and memo is not None:
+            _record_operation("pop", start_time)
+
+        return memo
+
+    def _pop_if_top(self, memo, force=False):
+        """Pops memo if it is the top memo and completed.
+
+        With force the memo is popped while it has open tasks as well, i.e.
+        to replay a pop that was made before. Returns whether it was popped.
+        """
+        with self.__lock:
+            if not self.memos or self.memos[-1] is not memo:
+                return False
+
+            with memo.lock:
+                if not force and not memo.is_completed():
+                    return False
+
+                self.__pop_memo()
+                return True
+
+    def snapshot(self):
+        """Returns a read-only copy of the memos on the stack, bottom first.
+
+        Each memo is a tuple of its name and a tuple of the description and
+        completion of each of its tasks. No memo is pushed or popped while
+        the copy is taken, and each memo is copied while it is locked, so
+        readers get a consistent state without holding any lock. Taking it
+        costs O(n) in the number of tasks on the stack.
+        """
+        with self.__lock:
+            memos = []
+
+            for memo in self.memos:
+                with memo.lock:
+                    memos.append((memo.name, tuple(
+                        (task.description, task.is_completed)
+                        for _, task in memo._iter_id_task_tuples())))
+
+            return tuple(memos)
 
     def peek(self):
-        if not self.is_empty():
-            return self.memos[len(self.memos) - 1]
-        else:
-            raise MemoStackIsEmpty()
+        with self.__lock:
+            if not self.is_empty():
+                return self.memos[len(self.memos) - 1]
+            else:
+                raise MemoStackIsEmpty()
 
     def is_empty(self):
         return len(self.memos) == 0
 
+    def _add_listener(self, listener):
+        """Registers a callable that is told about pushed and popped memos.
+
+        The listener is called with the stack, "push" or "pop" and the memo.
+        """
+        with self.__lock:
+            self.__listeners += (listener,)
+
+    def _remove_listener(self, listener):
+        with self.__lock:
+            self.__listeners = tuple(
+                registered_listener for registered_listener
+                in self.__listeners if registered_listener != listener)
+
+    def _get_shared(self, key, create):
+        """Returns the object kept with the stack under key.
+
+        It is created by calling create the first time, so that every user
+        of the stack gets the same one.
+        """
+        with self.__lock:
+            if self.__shared is None:
+                self.__shared = {}
+
+            shared = self.__shared.get(key)
+
+            if shared is None:
+                shared = self.__shared[key] = create()
+
+            return shared
+
+    def __pop_memo(self):
+        memo = self.memos.pop()
+        self.__notify_listeners("pop", memo)
+        return memo
+
+    def __notify_listeners(self, change, memo):
+        for listener in self.__listeners:
+            listener(self, change, memo)
+
+
+class _MemoStackFollower:
+    """Base of the classes which follow a memo stack and the memos on it.
+
+    The follower registers a listener with the stack and one with every
+    memo on it. A memo pushed more than once is followed once, until it is
+    popped as often. Subclasses are told about pushed and popped memos
+    through _on_stack_changed, after the memo was followed or unfollowed,
+    and about the changes of the followed memos through _on_memo_changed.
+    _on_memo_followed and _on_memo_unfollowed are called while the memo is
+    locked, so that none of its changes is missed or seen twice.
+    """
+
+    # Whether the changes of the memos are followed, or only the stack.
+    # Only the latter works for stacks whose memos report no changes.
+    _follows_memos = True
+
+    def __init__(self, memo_stack):
+        if self._follows_memos \
+                and not getattr(memo_stack, "_reports_memo_changes", False):
+            raise TypeError("A {0} cannot follow a {1}, as its memos do not "
+                            "report their changes.".format(
+                                type(self).__name__,
+                                type(memo_stack).__name__))
+
+        self.memo_stack = memo_stack
+        self.__lock = threading.Lock()
+        # Memos on the stack by their id, with the number of times they are
+        # on it.
+        self.__memo_counts = {}
+
+        memo_stack._add_listener(self.__on_stack_changed)
+
+        for memo in list(memo_stack.memos):
+            self.__follow_memo(memo)
+
+    def close(self):
+        """Stops following the stack and its memos."""
+        self.memo_stack._remove_listener(self.__on_stack_changed)
+
+        with self.__lock:
+            memo_counts, self.__memo_counts = self.__memo_counts, {}
+
+        if self._follows_memos:
+            for memo, _ in memo_counts.values():
+                memo._remove_listener(self._on_memo_changed)
+
+    @classmethod
+    def shared(cls, memo_stack):
+        """Returns the one instance following memo_stack for all its users.
+
+        It is created on the first call and follows the stack from then on,
+        so it is not to be closed.
+        """
+        return memo_stack._get_shared(cls, lambda: cls(memo_stack))
+
+    def _on_stack_changed(self, change, memo):
+        pass
+
+    def _on_memo_changed(self, memo, change, argument):
+        pass
+
+    def _on_memo_followed(self, memo):
+        pass
+
+    def _on_memo_unfollowed(self, memo):
+        pass
+
+    def __on_stack_changed(self, memo_stack, change, memo):
+        if change == "push":
+            self.__follow_memo(memo)
+        else:
+            self.__unfollow_memo(memo)
+
+        self._on_stack_changed(change, memo)
+
+    def __follow_memo(self, memo):
+        with self.__lock:
+            memo_count = self.__memo_counts.get(id(memo), (memo, 0))[1]
+            self.__memo_counts[id(memo)] = (memo, memo_count + 1)
+
+        if memo_count == 0 and not self._follows_memos:
+            self._on_memo_followed(memo)
+        elif memo_count == 0:
+            with memo.lock:
+                memo._add_listener(self._on_memo_changed)
+                self._on_memo_followed(memo)
+
+    def __unfollow_memo(self, memo):
+        with self.__lock:
+            memo_count = self.__memo_counts.pop(id(memo))[1] - 1
+
+            if memo_count > 0:
+                self.__memo_counts[id(memo)] = (memo, memo_count)
+
+        if memo_count == 0 and not self._follows_memos:
+            self._on_memo_unfollowed(memo)
+        elif memo_count == 0:
+            with memo.lock:
+                memo._remove_listener(self._on_memo_changed)
+                self._on_memo_unfollowed(memo)
+
+
+class MemoScheduler(_MemoStackFollower):
+    """Orders memos or tasks by priority and deadline, next to a MemoStack.
+
+    The item to work on next is the one with the highest priority, and
+    among those the one with the earliest deadline. Items without a
+    priority or deadline come after those with one, and items that tie
+    come in the order they were scheduled. Priorities are numbers, and
+    deadlines any values comparable with each other, i.e. dates.
+
+    The items are kept in a binary heap which knows the position of every
+    item, so peek is O(1), and next, scheduling an item, changing its
+    priority or deadline and removing any item are O(log n).
+
+    A scheduler given a memo_stack follows it: a memo popped from the stack
+    leaves the schedule, but keeps its priority and deadline, and a memo
+    with either is scheduled when it is pushed. So taking back a pop puts
+    the memo back on the schedule.
+    """
+
+    _follows_memos = False
+
+    def __init__(self, memo_stack=None):
+        self.__lock = threading.Lock()
+        # Entries are lists of the sort key, the item, its priority and its
+        # deadline. The positions of the entries are kept by item id.
+        self.__heap = []
+        self.__positions = {}
+        self.__sequence = itertools.count()
+        self.memo_stack = memo_stack
+
+        if memo_stack is not None:
+            super().__init__(memo_stack)
+
+    def close(self):
+        """Stops following the memo stack, if any."""
+        if self.memo_stack is not None:
+            super().close()
+
+    def __len__(self):
+        return len(self.__heap)
+
+    def __contains__(self, item):
+        return id(item) in self.__positions
+
+    def schedule(self, item, priority=None, deadline=None):
+        """Schedules item, or reschedules it if it is scheduled already.
+
+        Without a priority and a deadline, those of item are taken, if it
+        has any, like a Memo. Otherwise they are set on such an item.
+        """
+        if priority is None and deadline is None:
+            priority = getattr(item, "priority", None)
+            deadline = getattr(item, "deadline", None)
+        elif hasattr(item, "priority"):
+            item.priority = priority
+            item.deadline = deadline
+
+        with self.__lock:
+            position = self.__positions.get(id(item))
+
+            if position is None:
+                key = MemoScheduler.__key(priority, deadline,
+                                          next(self.__sequence))
+                self.__heap.append([key, item, priority, deadline])
+                self.__sift_up(len(self.__heap) - 1)
+            else:
+                entry = self.__heap[position]
+                # A rescheduled item keeps its place among equal items.
+                old_key = entry[0]
+                entry[0] = MemoScheduler.__key(priority, deadline,
+                                               old_key[-1])
+                entry[2] = priority
+                entry[3] = deadline
+
+                if entry[0] < old_key:
+                    self.__sift_up(position)
+                else:
+                    self.__sift_down(position)
+
+    def get_schedule(self, item):
+        """Returns (priority, deadline) of item, or None if unscheduled."""
+        with self.__lock:
+            position = self.__positions.get(id(item))
+
+            if position is None:
+                return None
+
+            return tuple(self.__heap[position][2:])
+
+    def remove(self, item):
+        """Removes item from the schedule and returns whether it was in it.
+
+        The priority and deadline of item are cleared, like a Memo's.
+        """
+        MemoScheduler.__clear(item)
+
+        with self.__lock:
+            position = self.__positions.get(id(item))
+
+            if position is None:
+                return False
+
+            self.__remove_entry(position)
+            return True
+
+    def peek(self):
+        """Returns the item to work on next."""
+        with self.__lock:
+            if not self.__heap:
+                raise MemoSchedulerIsEmpty()
+
+            return self.__heap[0][1]
+
+    def next(self):
+        """Removes the item to work on next and returns it."""
+        with self.__lock:
+            if not self.__heap:
+                raise MemoSchedulerIsEmpty()
+
+            item = self.__remove_entry(0)[1]
+
+        MemoScheduler.__clear(item)
+        return item
+
+    def top(self, count):
+        """Returns the next count items as (item, priority, deadline).
+
+        Only the entries which may be among them are visited, which are
+        fewer than 2 * count, so this takes O(count log count).
+        """
+        with self.__lock:
+            heap = self.__heap
+            scheduled_items = []
+            candidates = [(heap[0][0], 0)] if heap and count > 0 else []
+
+            while candidates and len(scheduled_items) < count:
+                _, position = heapq.heappop(candidates)
+                _, item, priority, deadline = heap[position]
+                scheduled_items.append((item, priority, deadline))
+
+                for child in (2 * position + 1, 2 * position + 2):
+                    if child < len(heap):
+                        heapq.heappush(candidates, (heap[child][0], child))
+
+            return scheduled_items
+
+    def _on_memo_followed(self, memo):
+        if getattr(memo, "priority", None) is not None \
+                or getattr(memo, "deadline", None) is not None:
+            self.schedule(memo)
+
+    def _on_memo_unfollowed(self, memo):
+        with self.__lock:
+            position = self.__positions.get(id(memo))
+
+            if position is not None:
+                self.__remove_entry(position)
+
+    @staticmethod
+    def __clear(item):
+        if hasattr(item, "priority"):
+            item.priority = None
+            item.deadline = None
+
+    @staticmethod
+    def __key(priority, deadline, sequence):
+        # Missing values sort last, and are never compared with others.
+        return (priority is None, 0 if priority is None else -priority,
+                deadline is None, 0 if deadline is None else deadline,
+                sequence)
+
+    def __remove_entry(self, position):
+        heap = self.__heap
+        entry = heap[position]
+        del self.__positions[id(entry[1])]
+        last_entry = heap.pop()
+
+        if position < len(heap):
+            heap[position] = last_entry
+            self.__positions[id(last_entry[1])] = position
+
+            if last_entry[0] < entry[0]:
+                self.__sift_up(position)
+            else:
+                self.__sift_down(position)
+
+        return entry
+
+    def __sift_up(self, position):
+        heap = self.__heap
+        positions = self.__positions
+        entry = heap[position]
+
+        while position > 0:
+            parent = (position - 1) >> 1
+            parent_entry = heap[parent]
+
+            if parent_entry[0] <= entry[0]:
+                break
+
+            heap[position] = parent_entry
+            positions[id(parent_entry[1])] = position
+            position = parent
+
+        heap[position] = entry
+        positions[id(entry[1])] = position
+
+    def __sift_down(self, position):
+        heap = self.__heap
+        positions = self.__positions
+        entry = heap[position]
+        length = len(heap)
+
+        while True:
+            child = 2 * position + 1
+
+            if child >= length:
+                break
+
+            if child + 1 < length and heap[child + 1][0] < heap[child][0]:
+                child += 1
+
+            child_entry = heap[child]
+
+            if entry[0] <= child_entry[0]:
+                break
+
+            heap[position] = child_entry
+            positions[id(child_entry[1])] = position
+            position = child
+
+        heap[position] = entry
+        positions[id(entry[1])] = position
+
 
 class MemoFormatter:
     __border = "**"
     __padding = "  "
     __id_marker = "[]"
     __reserved_space = len(__border) + len(__padding) + len(__id_marker)
+    # Memos with more tasks are rendered anew on every format, since their
+    # rendered text and lines would take more memory than their tasks.
+    __cache_task_limit = 10000
 
     def __init__(self, memo):
         self.memo = memo
-        self.__memo_width = max(len(memo.name) + self.__reserved_space, 25)
-        self.__task_count = len(memo.list_id_task_tuples())
+        self.__layout = None
+        self.__update_layout()
+        self.__formatted_memo = None
+        self.__task_lines = {}
 
     def format(self):
-        string_list = []
+        start_time = time.perf_counter() if _metrics is not None else None
+        # The formatter is kept by its memo and asked again on every print,
+        # so the whole text is reused as long as the memo is unchanged, and
+        # the lines of each task as long as the task and its id are.
+        render_key = (self.memo._get_version(), self.memo.name)
+
+        if self.__formatted_memo is not None \
+                and self.__formatted_memo[0] == render_key:
+            formatted_memo = self.__formatted_memo[1]
+        elif self.memo._get_number_of_task() \
+                > MemoFormatter.__cache_task_limit:
+            self.__formatted_memo = None
+            self.__task_lines = {}
+            formatted_memo = "\n".join(self.__generate_lines(
+                None, self.memo._iter_id_task_tuples()))
+        else:
+            task_lines = {}
+            formatted_memo = "\n".join(self.__generate_lines(
+                task_lines, self.memo._iter_id_task_tuples()))
+            self.__task_lines = task_lines
+            self.__formatted_memo = (render_key, formatted_memo)
+
+        if start_time is not None:
+            _record_operation("render", start_time, self.__task_count,
+                              len(formatted_memo))
+
+        return formatted_memo
+
+    def format_window(self, first_id=1, last_id=None, open_only=False,
+                      limit=None, skip=0):
+        start_time = time.perf_counter() if _metrics is not None else None
+        # The counter is advanced once per rendered task, as zip stops at
+        # the end of the window before it asks the counter again.
+        rendered_tasks = itertools.count()
+        task_tuples = (task_tuple for task_tuple, _ in zip(
+            self.__iter_window(first_id, last_id, open_only, limit, skip),
+            rendered_tasks))
+        formatted_window = "\n".join(self.__generate_lines(None,
+                                                           task_tuples))
+
+        if start_time is not None:
+            _record_operation("render", start_time, next(rendered_tasks),
+                              len(formatted_window))
+
+        return formatted_window
+
+    def iter_lines(self, first_id=1, last_id=None, open_only=False,
+                   limit=None, skip=0):
+        """Yields the lines of the memo one at a time.
+
+        Unlike format, this neither builds the whole text nor caches the
+        rendered lines, so even huge memos are rendered with bounded memory.
+        The tasks can be restricted to the id range from first_id to last_id,
+        to open tasks and to at most limit tasks after skipping the first
+        skip of them, i.e. to a page. The id column and the box keep the
+        width of the whole memo.
+        """
+        return self.__generate_lines(None, self.__iter_window(
+            first_id, last_id, open_only, limit, skip))
+
+    def __iter_window(self, first_id, last_id, open_only, limit, skip):
+        if not open_only and skip:
+            # Without a filter, the tasks to skip are known by their ids.
+            first_id = max(first_id, 1) + skip
+            skip = 0
+
+        task_tuples = self.memo._iter_id_task_tuples(
+            first_id, last_id, completed=False if open_only else None)
+
+        if limit is not None or skip:
+            task_tuples = itertools.islice(
+                task_tuples, skip, None if limit is None else skip + limit)
+
+        return task_tuples
+
+    def write_to(self, stream):
+        for index, line in enumerate(self.iter_lines()):
+            if index > 0:
+                stream.write("\n")
+
+            stream.write(line)
+
+    def __generate_lines(self, task_lines, task_tuples):
+        if self.__update_layout():
+            self.__task_lines = {}
+
         decoration = "*" * self.__memo_width
 
-        string_list.append(decoration)
-        self.__append_memo_title(string_list)
-        string_list.append(decoration)
+        yield decoration
+        yield self.__format_memo_title()
+        yield decoration
 
-        for task_tuple in self.memo.list_id_task_tuples():
-            self.__append_task_tuple(task_tuple, string_list)
+        for task_tuple in task_tuples:
+            for line in self.__get_task_lines(task_tuple, task_lines):
+                yield line
 
-        string_list.append(decoration)
+        yield decoration
 
-        return "\n".join(string_list)
+    def __update_layout(self):
+        """Updates the memo width and the task count the layout depends on.
 
-    def __append_memo_title(self, string_list):
+        Returns whether the width of the memo or of the id column changed,
+        which affects the lines of all tasks.
+        """
+        layout = self.__layout
+        self.__memo_width = max(len(self.memo.name) + self.__reserved_space,
+                                25)
+        self.__task_count = self.memo._get_number_of_task()
+        self.__layout = (self.__memo_width, len(str(self.__task_count)))
+
+        return layout != self.__layout
+
+    def __format_memo_title(self):
         text_template = "*{0}{1}{2}*"
         spaces = self.__memo_width - len(self.memo.name) - 2
-        text_line = text_template.format(" " * math.floor(spaces / 2),
-                                         self.memo.name,
-                                         " " * math.ceil(spaces / 2))
-        string_list.append(text_line)
+        return text_template.format(" " * math.floor(spaces / 2),
+                                    self.memo.name,
+                                    " " * math.ceil(spaces / 2))
+
+    def __get_task_lines(self, task_tuple, task_lines):
+        task_id, task = task_tuple
+        cached_lines = self.__task_lines.get(id(task))
+
+        if cached_lines is not None and cached_lines[0] is task \
+                and cached_lines[1] == task_id \
+                and cached_lines[2] == task.description:
+            lines = cached_lines[3]
+        else:
+            lines = []
+            self.__append_task_tuple(task_tuple, lines)
+
+        if task_lines is not None:
+            task_lines[id(task)] = (task, task_id, task.description, lines)
+
+        return lines
 
     def __append_task_tuple(self, task_tuple, string_list):
         text_line_length = self.__compute_task_description_length()
@@ -181,22 +1698,1272 @@ class MemoFormatter:
         return " " * space_count
 
 
+class MemoSearchIndex(_MemoStackFollower):
+    """Inverted index over the task descriptions of the memos on a stack.
+
+    The index follows the stack and its memos through their listeners, so
+    it is updated with every pushed or popped memo, every added or removed
+    task and every changed description. A task that belongs to several
+    memos is indexed once. The memos of stacks in storage, like a
+    SqliteMemoStack, report no changes, so they are searched with scan.
+    """
+
+    __word_pattern = re.compile(r"\w+")
+    # Prefix queries search a sorted list of the terms. Keeping it sorted on
+    # every new term would be quadratic for a large index, so new terms are
+    # collected apart and only merged once there are enough of them.
+    __new_term_limit = 1000
+    # How much more expensive ranking a hit is than passing a task while
+    # scanning the memos for hits.
+    __scan_factor = 4
+
+    def __init__(self, memo_stack):
+        self.__lock = threading.Lock()
+        self.__postings = {}
+        self.__sorted_terms = []
+        self.__new_terms = []
+        self.__task_terms = {}
+        self.__task_memos = {}
+        super().__init__(memo_stack)
+
+    def close(self):
+        """Stops following the stack and forgets all tasks."""
+        super().close()
+
+        with self.__lock:
+            self.__postings = {}
+            self.__sorted_terms = []
+            self.__new_terms = []
+            self.__task_terms = {}
+            self.__task_memos = {}
+
+    def search(self, query, completed=None, limit=None):
+        """Returns (memo, task id) tuples of the tasks matching the query.
+
+        Every word of the query matches the tasks whose description contains
+        it, and a word ending with '*' matches all words starting with it.
+        The hits are ranked by the number of query words they match, then
+        by the position of their memo on the stack from the top, then by
+        task id. completed limits the hits to completed or open tasks, and
+        limit to the given number of best hits.
+        """
+        query_terms = [term.lower() for term in query.split()]
+
+        with self.__lock:
+            scores = _TaskScores(
+                [self.__find_tasks(query_term) for query_term in query_terms],
+                completed)
+            ranked_levels = []
+            ranked_task_count = 0
+
+            for score, task_count in scores.levels():
+                if limit is not None:
+                    missing_hit_count = limit - ranked_task_count
+
+                    if missing_hit_count <= 0:
+                        break
+
+                    # Ranking looks up the task id of every hit, while
+                    # scanning the memos from the top passes about
+                    # total / task_count tasks for every hit it finds.
+                    if len(self.__task_memos) * missing_hit_count \
+                            < MemoSearchIndex.__scan_factor * task_count \
+                            * task_count:
+                        ranked_levels.append((score, None))
+                        break
+
+                ranked_levels.append((score, [
+                    (task, self.__task_memos[task])
+                    for task in scores.tasks_with(score)]))
+                ranked_task_count += task_count
+
+        hits = []
+
+        for score, task_memos in ranked_levels:
+            hit_count = None if limit is None else limit - len(hits)
+
+            if task_memos is None:
+                hits.extend(self.__scan_memos(scores, score, hit_count))
+            else:
+                hits.extend(self.__rank(task_memos, hit_count))
+
+        return hits[:limit]
+
+    def __rank(self, task_memos, hit_count):
+        memo_positions = {id(memo): position for position, memo
+                          in enumerate(reversed(self.memo_stack.memos))}
+        hits = []
+
+        for task, memos in task_memos:
+            for memo in memos:
+                task_id = memo._get_task_id(task)
+
+                if task_id is not None:
+                    hits.append((memo_positions.get(id(memo), 0), task_id,
+                                 memo))
+
+        if hit_count is None:
+            hits.sort(key=lambda hit: hit[:2])
+        else:
+            hits = heapq.nsmallest(hit_count, hits, key=lambda hit: hit[:2])
+
+        return [(memo, task_id) for _, task_id, memo in hits]
+
+    def __scan_memos(self, scores, score, hit_count):
+        hits = []
+
+        for memo in reversed(list(self.memo_stack.memos)):
+            for task_id, task in memo._iter_id_task_tuples():
+                if scores.score_of(task) == score:
+                    hits.append((memo, task_id))
+
+                    if len(hits) == hit_count:
+                        return hits
+
+        return hits
+
+    @staticmethod
+    def scan(memo_stack, query, completed=None, limit=None):
+        """Searches the memos on memo_stack without an index, like search.
+
+        This reads every task, so it takes O(total tasks), but works for
+        any stack, also those whose memos do not report their changes.
+        """
+        query_terms = [term.lower() for term in query.split()]
+        hits = []
+
+        for position, memo in enumerate(reversed(list(memo_stack.memos))):
+            for task_id, task in memo._iter_id_task_tuples(
+                    completed=completed):
+                score = MemoSearchIndex.__score(
+                    query_terms, set(MemoSearchIndex._tokenize(
+                        task.description)))
+
+                if score:
+                    hits.append((-score, position, task_id, memo))
+
+        if limit is None:
+            hits.sort(key=lambda hit: hit[:3])
+        else:
+            hits = heapq.nsmallest(limit, hits, key=lambda hit: hit[:3])
+
+        return [(memo, task_id) for _, _, task_id, memo in hits]
+
+    @staticmethod
+    def _tokenize(text):
+        return MemoSearchIndex.__word_pattern.findall(text.lower())
+
+    @staticmethod
+    def __score(query_terms, words):
+        score = 0
+
+        for query_term in query_terms:
+            if query_term.endswith("*"):
+                prefix = query_term.rstrip("*")
+
+                if any(word.startswith(prefix) for word in words):
+                    score += 1
+            else:
+                terms = MemoSearchIndex._tokenize(query_term)
+
+                if terms and words.issuperset(terms):
+                    score += 1
+
+        return score
+
+    def __find_tasks(self, query_term):
+        if not query_term.endswith("*"):
+            # A word like "e-mail" is indexed as several terms, all of which
+            # the matching tasks contain.
+            task_sets = sorted((self.__postings.get(term, ())
+                                for term in self._tokenize(query_term)),
+                               key=len)
+
+            if len(task_sets) < 2:
+                return task_sets[0] if task_sets else ()
+
+            return set(task_sets[0]).intersection(*task_sets[1:])
+
+        prefix = query_term.rstrip("*").lower()
+
+        if len(self.__new_terms) > MemoSearchIndex.__new_term_limit \
+                or len(self.__sorted_terms) > 2 * len(self.__postings):
+            # Terms which are no longer indexed are dropped along the way.
+            self.__sorted_terms = sorted(self.__postings)
+            self.__new_terms = []
+
+        sorted_terms = self.__sorted_terms
+        postings = self.__postings
+        tasks = set()
+
+        for index in range(bisect.bisect_left(sorted_terms, prefix),
+                           len(sorted_terms)):
+            if not sorted_terms[index].startswith(prefix):
+                break
+
+            tasks.update(postings.get(sorted_terms[index], ()))
+
+        for term in self.__new_terms:
+            if term.startswith(prefix):
+                tasks.update(postings.get(term, ()))
+
+        return tasks
+
+    def _on_memo_changed(self, memo, change, argument):
+        if change == "completion":
+            return
+
+        with self.__lock:
+            if change == "add":
+                for task in argument:
+                    self.__add_task(memo, task)
+            elif change == "remove":
+                for task in argument:
+                    self.__remove_task(memo, task)
+            elif change == "description":
+                task = argument[0]
+                self.__index_terms(task, self._tokenize(task.description))
+
+    # The listeners of a memo are called while the memo is locked, and then
+    # take the lock of the index. So the index never locks a memo while
+    # holding its own lock, which also holds for search.
+    def _on_memo_followed(self, memo):
+        with self.__lock:
+            for _, task in memo._iter_id_task_tuples():
+                self.__add_task(memo, task)
+
+    def _on_memo_unfollowed(self, memo):
+        with self.__lock:
+            for _, task in memo._iter_id_task_tuples():
+                self.__remove_task(memo, task)
+
+    def __add_task(self, memo, task):
+        memos = self.__task_memos.get(task)
+
+        if memos is None:
+            self.__task_memos[task] = (memo,)
+            self.__index_terms(task, self._tokenize(task.description))
+        elif memo not in memos:
+            self.__task_memos[task] = memos + (memo,)
+
+    def __remove_task(self, memo, task):
+        memos = tuple(indexed_memo for indexed_memo
+                      in self.__task_memos.get(task, ())
+                      if indexed_memo is not memo)
+
+        if memos:
+            self.__task_memos[task] = memos
+        elif task in self.__task_memos:
+            del self.__task_memos[task]
+            self.__index_terms(task, ())
+
+    def __index_terms(self, task, terms):
+        old_terms = self.__task_terms.pop(task, ())
+        terms = frozenset(terms)
+
+        for term in old_terms:
+            if term not in terms:
+                tasks = self.__postings[term]
+                tasks.discard(task)
+
+                if not tasks:
+                    del self.__postings[term]
+
+        for term in terms:
+            if term not in old_terms:
+                tasks = self.__postings.get(term)
+
+                if tasks is None:
+                    tasks = self.__postings[term] = set()
+                    self.__new_terms.append(term)
+
+                tasks.add(task)
+
+        if terms:
+            self.__task_terms[task] = terms
+
+
+class _TaskScores:
+    """Number of matched query words for the tasks matching a query.
+
+    The largest set of matching tasks is not counted through, since its
+    tasks match that word only, unless they are among the other matches.
+    This keeps queries with a word that matches most of the tasks cheap.
+    """
+
+    __slots__ = ("__scores", "__largest_tasks", "__completed",
+                 "__largest_only_count")
+
+    def __init__(self, task_sets, completed):
+        largest_index = max(range(len(task_sets)),
+                            key=lambda index: len(task_sets[index]),
+                            default=None)
+        largest_tasks = () if largest_index is None \
+            else task_sets[largest_index]
+        scores = {}
+
+        for index, tasks in enumerate(task_sets):
+            if index != largest_index:
+                for task in tasks:
+                    scores[task] = scores.get(task, 0) + 1
+
+        for task in list(scores):
+            if completed is not None and task.is_completed != completed:
+                del scores[task]
+            elif task in largest_tasks:
+                scores[task] += 1
+
+        self.__scores = scores
+        self.__largest_tasks = largest_tasks
+        self.__completed = completed
+        # An estimate, as the completion of these tasks is not checked yet.
+        self.__largest_only_count = len(largest_tasks) - sum(
+            1 for task in scores if task in largest_tasks)
+
+    def levels(self):
+        """Returns (score, estimated task count) tuples, best score first."""
+        task_counts = {}
+
+        for score in self.__scores.values():
+            task_counts[score] = task_counts.get(score, 0) + 1
+
+        if self.__largest_only_count > 0:
+            task_counts[1] = task_counts.get(1, 0) + self.__largest_only_count
+
+        return sorted(task_counts.items(), reverse=True)
+
+    def tasks_with(self, score):
+        tasks = [task for task, task_score in self.__scores.items()
+                 if task_score == score]
+
+        if score == 1:
+            tasks.extend(task for task in self.__largest_tasks
+                         if task not in self.__scores
+                         and self.__matches_completion(task))
+
+        return tasks
+
+    def score_of(self, task):
+        score = self.__scores.get(task)
+
+        if score is not None:
+            return score
+        elif task in self.__largest_tasks and self.__matches_completion(task):
+            return 1
+        else:
+            return 0
+
+    def __matches_completion(self, task):
+        return self.__completed is None \
+            or task.is_completed == self.__completed
+
+
+class _MemoChangeRecorder(_MemoStackFollower):
+    """Records the changes of a memo stack for all the histories on it.
+
+    The changes a thread makes between begin_step and end_step are
+    collected as one step, unless the thread is replaying a step. A change
+    only keeps references to the objects involved, so recording it costs
+    O(1) whatever the size of the stack. Changes outside of a step are not
+    recorded.
+    """
+
+    def __init__(self, memo_stack):
+        self.__lock = threading.Lock()
+        # The steps being recorded by thread, with the number of times they
+        # were begun, and the threads replaying a step.
+        self.__steps = {}
+        self.__replaying_threads = set()
+        super().__init__(memo_stack)
+
+    def begin_step(self):
+        with self.__lock:
+            step = self.__steps.setdefault(threading.get_ident(), [0, []])
+            step[0] += 1
+
+    def end_step(self):
+        """Ends a step and returns its changes, or None within a step."""
+        with self.__lock:
+            thread_id = threading.get_ident()
+            step = self.__steps[thread_id]
+            step[0] -= 1
+
+            if step[0] > 0:
+                return None
+
+            del self.__steps[thread_id]
+            return step[1]
+
+    @contextlib.contextmanager
+    def replaying(self):
+        """Leaves the changes of the thread out of its steps meanwhile."""
+        thread_id = threading.get_ident()
+
+        with self.__lock:
+            self.__replaying_threads.add(thread_id)
+
+        try:
+            yield
+        finally:
+            with self.__lock:
+                self.__replaying_threads.discard(thread_id)
+
+    def __record(self, change):
+        thread_id = threading.get_ident()
+
+        with self.__lock:
+            step = self.__steps.get(thread_id)
+
+            if step is not None \
+                    and thread_id not in self.__replaying_threads:
+                step[1].append(change)
+
+    def _on_stack_changed(self, change, memo):
+        self.__record((change, memo))
+
+    def _on_memo_changed(self, memo, change, argument):
+        if change in ("add", "remove"):
+            if argument:
+                self.__record((change, memo, list(argument)))
+        elif change == "completion":
+            # A task on several memos reports its completion to each, which
+            # records the change more than once. Setting the completion is
+            # idempotent, so replaying the duplicates does no harm.
+            self.__record(("completion", argument, argument.is_completed))
+        elif change == "description":
+            task, previous_description = argument
+            self.__record(("description", task, previous_description,
+                           task.description))
+
+
+class MemoHistory:
+    """Undo and redo of the changes of a memo stack and its memos.
+
+    The history records the changes a thread makes between begin_step and
+    end_step as one step, i.e. the changes of one console command. Every
+    history has its own steps, i.e. one per console session, so undo only
+    takes back the steps made through it. The changes are recorded by one
+    listener of the stack and its memos for all histories on the stack,
+    see _MemoChangeRecorder. It is a log of changes, not a copy of the
+    stack, so it offers no views of earlier states; MemoStack.snapshot
+    copies the current one.
+
+    Only the last limit steps are kept, and the oldest ones are dropped
+    while the steps refer to more than task_limit tasks, as they keep them
+    alive. A pushed or popped memo counts with all its tasks.
+
+    Undoing a step applies the inverse of its changes in reverse order, and
+    redoing it applies them again. Removed tasks are added back at the end
+    of their memo, and a memo is only popped again if it is on top of the
+    stack and completed, as by MemoStack.pop. If a change cannot be
+    replayed anymore, the changes replayed before it are taken back, so the
+    step stays in place, and MemoHistoryConflict is raised.
+    """
+
+    def __init__(self, memo_stack, limit=100, task_limit=100000):
+        self.memo_stack = memo_stack
+        self.limit = limit
+        self.task_limit = task_limit
+        self.__recorder = _MemoChangeRecorder.shared(memo_stack)
+        self.__lock = threading.Lock()
+        # Steps as tuples of their changes and the number of tasks they
+        # refer to, which is counted for all steps together.
+        self.__undo_steps = collections.deque()
+        self.__redo_steps = []
+        self.__task_count = 0
+
+    def close(self):
+        """Drops the steps, the recorder keeps following the stack."""
+        with self.__lock:
+            self.__undo_steps = collections.deque()
+            self.__redo_steps = []
+            self.__task_count = 0
+
+    @property
+    def can_undo(self):
+        return bool(self.__undo_steps)
+
+    @property
+    def can_redo(self):
+        return bool(self.__redo_steps)
+
+    def begin_step(self):
+        """Starts a step. Steps begun within a step are part of it."""
+        self.__recorder.begin_step()
+
+    def end_step(self):
+        changes = self.__recorder.end_step()
+
+        if not changes:
+            return
+
+        task_count = sum(MemoHistory.__count_tasks(change)
+                         for change in changes)
+
+        with self.__lock:
+            for _, redo_task_count in self.__redo_steps:
+                self.__task_count -= redo_task_count
+
+            self.__undo_steps.append((changes, task_count))
+            self.__redo_steps = []
+            self.__task_count += task_count
+            self.__trim()
+
+    @contextlib.contextmanager
+    def step(self):
+        self.begin_step()
+
+        try:
+            yield self
+        finally:
+            self.end_step()
+
+    def undo(self):
+        """Undoes the last step and returns whether there was one."""
+        return self.__replay(self.__undo_steps, self.__redo_steps,
+                             self.__undo_change, self.__redo_change, True)
+
+    def redo(self):
+        """Redoes the last undone step and returns whether there was one."""
+        return self.__replay(self.__redo_steps, self.__undo_steps,
+                             self.__redo_change, self.__undo_change, False)
+
+    def __replay(self, steps, other_steps, apply_change, revert_change,
+                 is_reversed):
+        with self.__lock:
+            if not steps:
+                return False
+
+            step = steps.pop()
+
+        changes = step[0][::-1] if is_reversed else step[0]
+
+        with self.__recorder.replaying():
+            for index, change in enumerate(changes):
+                if not apply_change(change):
+                    # The step can only be replayed later on if the changes
+                    # replayed so far are taken back, or else it is dropped.
+                    if all(revert_change(replayed_change)
+                           for replayed_change in reversed(changes[:index])):
+                        with self.__lock:
+                            steps.append(step)
+                    else:
+                        with self.__lock:
+                            self.__task_count -= step[1]
+
+                    raise MemoHistoryConflict()
+
+        with self.__lock:
+            other_steps.append(step)
+            self.__trim()
+
+        return True
+
+    def __trim(self):
+        undo_steps = self.__undo_steps
+
+        while undo_steps and (len(undo_steps) > self.limit
+                              or self.__task_count > self.task_limit):
+            self.__task_count -= undo_steps.popleft()[1]
+
+    @staticmethod
+    def __count_tasks(change):
+        kind = change[0]
+
+        if kind in ("push", "pop"):
+            return 1 + change[1]._get_number_of_task()
+        elif kind in ("add", "remove"):
+            return len(change[2])
+        else:
+            return 1
+
+    def __undo_change(self, change):
+        kind = change[0]
+
+        if kind == "push":
+            return self.memo_stack._pop_if_top(change[1])
+        elif kind == "pop":
+            self.memo_stack.push(change[1])
+        elif kind == "add":
+            change[1].remove_tasks(change[2])
+        elif kind == "remove":
+            change[1].add_tasks(change[2])
+        elif kind == "description":
+            change[1].description = change[2]
+        else:
+            change[1].is_completed = not change[2]
+
+        return True
+
+    def __redo_change(self, change):
+        kind = change[0]
+
+        if kind == "push":
+            self.memo_stack.push(change[1])
+        elif kind == "pop":
+            return self.memo_stack._pop_if_top(change[1])
+        elif kind == "add":
+            change[1].add_tasks(change[2])
+        elif kind == "remove":
+            change[1].remove_tasks(change[2])
+        elif kind == "description":
+            change[1].description = change[3]
+        else:
+            change[1].is_completed = change[2]
+
+        return True
+
+
+class MemoChange:
+    """A change of a memo stack or a memo, as delivered by a MemoChangeFeed.
+
+    kind is "push" or "pop" for a memo pushed onto or popped from the stack,
+    "add" or "remove" for tasks added to or removed from the memo,
+    "completion" for tasks whose completion changed, which they tell through
+    is_completed, and "description" for tasks with a new description. tasks
+    is a tuple of the affected tasks, empty for "push" and "pop".
+    """
+
+    __slots__ = ("kind", "memo", "tasks")
+
+    kinds = frozenset(("push", "pop", "add", "remove", "completion",
+                       "description"))
+
+    def __init__(self, kind, memo, tasks=()):
+        self.kind = kind
+        self.memo = memo
+        self.tasks = tasks
+
+    def __repr__(self):
+        return "MemoChange({0!r}, {1!r}, {2} tasks)".format(
+            self.kind, self.memo.name, len(self.tasks))
+
+
+class MemoChangeFeed(_MemoStackFollower):
+    """Delivers the changes of a memo stack and its memos to subscribers.
+
+    The feed follows the stack and the memos on it through their listeners.
+    Tasks report their changes through their memos, so changes of tasks on
+    no memo of the stack are not delivered. Each subscriber is called with
+    a list of MemoChange objects, limited to the kinds and the predicate it
+    was subscribed with, and is not called for an empty list.
+
+    Subscribers are never called while a memo or the stack is locked, so
+    they may use both: the feed only queues the changes, and a thread of
+    the feed delivers them in order right after they were made. Changes
+    made while it is busy are delivered together. The changes made between
+    begin_batch and end_batch are delivered when the batch ends, on the
+    thread ending it. A deferred feed collects all changes until flush is
+    called, and has no thread. Queued changes are coalesced: consecutive
+    changes of the same kind and memo are merged into one, listing every
+    task once, and a memo pushed and popped again right away is left out.
+    Either way the work of the feed is proportional to the number of
+    changes, whatever the size of the stack.
+    """
+
+    __mergeable_kinds = frozenset(("add", "remove", "completion",
+                                   "description"))
+
+    def __init__(self, memo_stack, deferred=False):
+        self.deferred = deferred
+        self.__lock = threading.Lock()
+        self.__condition = threading.Condition(self.__lock)
+        self.__subscribers = ()
+        self.__pending_changes = []
+        self.__batch_depth = 0
+        # The thread delivering changes, which is the dispatcher or one
+        # flushing the feed, and the dispatcher, started with the first
+        # change it has to deliver.
+        self.__delivering_thread = None
+        self.__dispatcher = None
+        self.__is_closed = False
+        super().__init__(memo_stack)
+
+    def close(self):
+        """Stops following the stack and drops the undelivered changes.
+
+        The thread of the feed is stopped, after the delivery it may be
+        busy with.
+        """
+        super().close()
+
+        with self.__lock:
+            self.__pending_changes = []
+            self.__is_closed = True
+            dispatcher = self.__dispatcher
+            self.__condition.notify_all()
+
+        if dispatcher is not None \
+                and dispatcher is not threading.current_thread():
+            dispatcher.join()
+
+    def subscribe(self, callback, kinds=None, predicate=None):
+        """Calls callback with lists of changes from now on.
+
+        kinds limits the changes to the given kinds of MemoChange, and
+        predicate to those for which it returns true.
+        """
+        if kinds is not None:
+            kinds = frozenset(kinds)
+            unknown_kinds = kinds - MemoChange.kinds
+
+            if unknown_kinds:
+                raise ValueError("Unknown kinds of changes: {0}".format(
+                    ", ".join(sorted(unknown_kinds))))
+
+        with self.__lock:
+            self.__subscribers += ((callback, kinds, predicate),)
+
+    def unsubscribe(self, callback):
+        with self.__lock:
+            self.__subscribers = tuple(
+                subscriber for subscriber in self.__subscribers
+                if subscriber[0] != callback)
+
+    def begin_batch(self):
+        """Starts a batch. Batches begun within a batch are part of it."""
+        with self.__lock:
+            self.__batch_depth += 1
+
+    def end_batch(self):
+        with self.__lock:
+            self.__batch_depth -= 1
+
+            if self.__batch_depth > 0 or self.deferred:
+                return
+
+        self.flush()
+
+    @contextlib.contextmanager
+    def batch(self):
+        self.begin_batch()
+
+        try:
+            yield self
+        finally:
+            self.end_batch()
+
+    def flush(self):
+        """Delivers the collected changes now, on the calling thread.
+
+        Returns once the changes made before were delivered. A subscriber
+        flushing the feed which calls it returns right away.
+        """
+        with self.__lock:
+            if self.__delivering_thread is threading.current_thread():
+                return
+
+            while self.__delivering_thread is not None:
+                self.__condition.wait()
+
+            subscribers, pending_changes = self.__start_delivery()
+
+        self.__finish_delivery(subscribers, pending_changes)
+
+    def __start_delivery(self):
+        pending_changes, self.__pending_changes = self.__pending_changes, []
+        self.__delivering_thread = threading.current_thread()
+        return self.__subscribers, pending_changes
+
+    def __finish_delivery(self, subscribers, pending_changes):
+        try:
+            if pending_changes:
+                self.__deliver(subscribers, [
+                    MemoChange(kind, memo, MemoChangeFeed.__unique(tasks))
+                    for kind, memo, tasks in pending_changes])
+        finally:
+            with self.__lock:
+                self.__delivering_thread = None
+                self.__condition.notify_all()
+
+    def __dispatch(self):
+        while True:
+            with self.__lock:
+                while not self.__is_closed \
+                        and (self.__delivering_thread is not None
+                             or self.__batch_depth > 0
+                             or not self.__pending_changes):
+                    self.__condition.wait()
+
+                if self.__is_closed:
+                    return
+
+                subscribers, pending_changes = self.__start_delivery()
+
+            try:
+                self.__finish_delivery(subscribers, pending_changes)
+            except Exception:
+                # A failing subscriber must not stop the delivery to the
+                # others, so it is reported like an uncaught exception.
+                sys.excepthook(*sys.exc_info())
+
+    @staticmethod
+    def __deliver(subscribers, changes):
+        for callback, kinds, predicate in subscribers:
+            selected_changes = changes
+
+            if kinds is not None:
+                selected_changes = [change for change in selected_changes
+                                    if change.kind in kinds]
+
+            if predicate is not None:
+                selected_changes = [change for change in selected_changes
+                                    if predicate(change)]
+
+            if selected_changes:
+                callback(selected_changes)
+
+    @staticmethod
+    def __unique(tasks):
+        if len(tasks) < 2:
+            return tuple(tasks)
+
+        # A task on several memos reports its completion to each, and may
+        # be changed more than once before it is delivered.
+        seen_tasks = set()
+        return tuple(task for task in tasks
+                     if not (task in seen_tasks or seen_tasks.add(task)))
+
+    def __record(self, kind, memo, tasks):
+        with self.__lock:
+            if not self.__subscribers or self.__is_closed:
+                return
+
+            self.__collect(kind, memo, tasks)
+
+            if self.__batch_depth > 0 or self.deferred:
+                return
+
+            if self.__dispatcher is None:
+                self.__dispatcher = threading.Thread(
+                    target=self.__dispatch, name="MemoChangeFeed",
+                    daemon=True)
+                self.__dispatcher.start()
+
+            self.__condition.notify_all()
+
+    def __collect(self, kind, memo, tasks):
+        pending_changes = self.__pending_changes
+
+        if pending_changes:
+            last_kind, last_memo, last_tasks = pending_changes[-1]
+
+            if last_memo is memo:
+                if kind == last_kind \
+                        and kind in MemoChangeFeed.__mergeable_kinds:
+                    last_tasks.extend(tasks)
+                    return
+                elif kind == "pop" and last_kind == "push":
+                    pending_changes.pop()
+                    return
+
+        pending_changes.append((kind, memo, list(tasks)))
+
+    def _on_stack_changed(self, change, memo):
+        self.__record(change, memo, ())
+
+    def _on_memo_changed(self, memo, change, argument):
+        if change in ("add", "remove"):
+            if argument:
+                self.__record(change, memo, argument)
+        elif change == "description":
+            self.__record(change, memo, (argument[0],))
+        else:
+            self.__record(change, memo, (argument,))
+
+
+class MemoDescriptionPool(_MemoStackFollower):
+    """Shares one copy of every task description on a memo stack.
+
+    Memos made from templates hold many tasks with equal descriptions,
+    each with a string of its own. The pool follows the stack and its
+    memos through their listeners, and gives every task added to a memo on
+    the stack the pooled copy of its description, so the other copies can
+    be freed. The pool counts the tasks using each description, and
+    forgets a description once no task on the stack uses it anymore, i.e.
+    after its tasks were removed or their memos popped. A stack made with
+    share_descriptions has a pool from the start, which is the shared one.
+    """
+
+    def __init__(self, memo_stack):
+        self.__lock = threading.Lock()
+        # Pooled descriptions by themselves, with the number of their uses.
+        self.__descriptions = {}
+        self.__use_count = 0
+        self.__used_size = 0
+        self.__pooled_size = 0
+        super().__init__(memo_stack)
+
+    def close(self):
+        """Stops following the stack and forgets all descriptions."""
+        super().close()
+
+        with self.__lock:
+            self.__descriptions = {}
+            self.__use_count = 0
+            self.__used_size = 0
+            self.__pooled_size = 0
+
+    def intern(self, description):
+        """Returns the pooled copy of description, or description itself."""
+        with self.__lock:
+            entry = self.__descriptions.get(description)
+
+        return description if entry is None else entry[0]
+
+    def report(self):
+        """Returns how many descriptions are shared and the bytes saved.
+
+        The saved bytes are those of one copy of its description per task,
+        less those of the pooled copies.
+        """
+        with self.__lock:
+            unique_count = len(self.__descriptions)
+
+            return {"descriptions": self.__use_count,
+                    "unique_descriptions": unique_count,
+                    "dedup_ratio": self.__use_count / unique_count
+                    if unique_count else 1.0,
+                    "bytes_saved": self.__used_size - self.__pooled_size}
+
+    def __acquire(self, tasks):
+        with self.__lock:
+            for task in tasks:
+                description = task.description
+                entry = self.__descriptions.get(description)
+                size = sys.getsizeof(description)
+
+                if entry is None:
+                    self.__descriptions[description] = [description, 1]
+                    self.__pooled_size += size
+                else:
+                    entry[1] += 1
+
+                    if entry[0] is not description:
+                        task._share_description(entry[0])
+
+                self.__use_count += 1
+                self.__used_size += size
+
+    def __release(self, descriptions):
+        with self.__lock:
+            for description in descriptions:
+                entry = self.__descriptions.get(description)
+
+                if entry is None:
+                    continue
+
+                size = sys.getsizeof(description)
+                entry[1] -= 1
+                self.__use_count -= 1
+                self.__used_size -= size
+
+                if entry[1] == 0:
+                    del self.__descriptions[description]
+                    self.__pooled_size -= size
+
+    def _on_memo_changed(self, memo, change, argument):
+        if change == "add":
+            self.__acquire(argument)
+        elif change == "remove":
+            self.__release([task.description for task in argument])
+        elif change == "description":
+            self.__release((argument[1],))
+            self.__acquire((argument[0],))
+
+    # The memo is locked while its tasks are counted, so that no task is
+    # added or removed in the meantime, and its listeners then lock the
+    # pool just like here.
+    def _on_memo_followed(self, memo):
+        self.__acquire([task for _, task in memo._iter_id_task_tuples()])
+
+    def _on_memo_unfollowed(self, memo):
+        self.__release([task.description for _, task
+                        in memo._iter_id_task_tuples()])
+
+
+class MemoMetrics:
+    """Counters and latency histograms of the memo operations.
+
+    Nothing is measured until a MemoMetrics is enabled, and then only by
+    that one. The measured operations are "push" and "pop" of a MemoStack,
+    "add" and "complete" of a Memo, "render" of a MemoFormatter and every
+    command of a MemoConsole, as "command:<name>". Each operation counts
+    its calls, the tasks it involved and its latency, and a render also
+    the characters it produced. The sink, if given, is called with the
+    operation, its seconds, its task count and its size after every
+    measurement, i.e. to forward them to a monitoring system.
+    """
+
+    # Upper bounds of the latency buckets in seconds, as in Prometheus.
+    latency_buckets = (0.000001, 0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.__lock = threading.Lock()
+        self.__operations = {}
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disable()
+
+    @property
+    def is_enabled(self):
+        return _metrics is self
+
+    def enable(self):
+        global _metrics
+        _metrics = self
+        return self
+
+    def disable(self):
+        global _metrics
+
+        if _metrics is self:
+            _metrics = None
+
+    def reset(self):
+        with self.__lock:
+            self.__operations = {}
+
+    def record(self, operation, seconds, task_count=1, size=None):
+        with self.__lock:
+            statistics = self.__operations.get(operation)
+
+            if statistics is None:
+                statistics = self.__operations[operation] = {
+                    "count": 0, "seconds": 0.0, "max_seconds": 0.0,
+                    "task_count": 0, "size": 0,
+                    "buckets": [0] * (len(MemoMetrics.latency_buckets) + 1)}
+
+            statistics["count"] += 1
+            statistics["seconds"] += seconds
+            statistics["max_seconds"] = max(statistics["max_seconds"],
+                                            seconds)
+            statistics["task_count"] += task_count
+            statistics["size"] += size or 0
+            statistics["buckets"][bisect.bisect_left(
+                MemoMetrics.latency_buckets, seconds)] += 1
+
+        if self.sink is not None:
+            self.sink(operation, seconds, task_count, size)
+
+    def snapshot(self):
+        """Returns the statistics of every operation by its name.
+
+        The statistics are the number of calls, their total and maximum
+        seconds, the total number of tasks and characters and the number of
+        calls per latency bucket, the last one being unbounded.
+        """
+        with self.__lock:
+            return {operation: dict(statistics,
+                                    buckets=list(statistics["buckets"]))
+                    for operation, statistics in self.__operations.items()}
+
+    def to_json(self):
+        return json.dumps({"latency_buckets": MemoMetrics.latency_buckets,
+                           "operations": self.snapshot()},
+                          indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        """Returns the statistics in the Prometheus text exposition format."""
+        operations = sorted(self.snapshot().items())
+        lines = ["# HELP pymemo_operation_seconds Latency of the memo "
+                 "operations.",
+                 "# TYPE pymemo_operation_seconds histogram"]
+
+        for operation, statistics in operations:
+            label = MemoMetrics.__format_label(operation)
+            cumulative_count = 0
+
+            for bound, count in zip(MemoMetrics.latency_buckets + ("+Inf",),
+                                    statistics["buckets"]):
+                cumulative_count += count
+                lines.append("pymemo_operation_seconds_bucket{{{0},"
+                             "le=\"{1}\"}} {2}".format(label, bound,
+                                                       cumulative_count))
+
+            lines.append("pymemo_operation_seconds_sum{{{0}}} {1!r}".format(
+                label, statistics["seconds"]))
+            lines.append("pymemo_operation_seconds_count{{{0}}} {1}".format(
+                label, statistics["count"]))
+
+        for name, key, description in (
+                ("pymemo_operation_tasks_total", "task_count",
+                 "Tasks involved in the memo operations."),
+                ("pymemo_operation_characters_total", "size",
+                 "Characters rendered by the memo operations.")):
+            lines.append("# HELP {0} {1}".format(name, description))
+            lines.append("# TYPE {0} counter".format(name))
+
+            for operation, statistics in operations:
+                lines.append("{0}{{{1}}} {2}".format(
+                    name, MemoMetrics.__format_label(operation),
+                    statistics[key]))
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def __format_label(operation):
+        return "operation=\"{0}\"".format(
+            operation.replace("\\", "\\\\").replace("\"", "\\\"")
+            .replace("\n", "\\n"))
+
+
+# The enabled MemoMetrics, if any. The measured operations check it before
+# they look at the clock, which is all they cost while it is None.
+_metrics = None
+
+
+def _record_operation(operation, start_time, task_count=1, size=None):
+    metrics = _metrics
+
+    # The metrics may have been disabled while the operation was running.
+    if metrics is not None:
+        metrics.record(operation, time.perf_counter() - start_time,
+                       task_count, size)
+
+
 class MemoConsole:
     __prompt = "PyMemo> "
-
-    def __init__(self):
+    __page_size = 20
+    __output_buffer_size = 1000
+
+    def __init__(self, memo_stack=None):
+        self.__memo_stack = memo_stack
+        self.__commands = {}
+        self.__register_default_commands()
+        self.__history = None
         self.__reset()
 
+    @property
+    def memo_stack(self):
+        return self.__stack
+
     def start(self):
         self.__reset()
         self.__run_input_loop()
 
+    def run_batch(self, lines, output=None):
+        """Executes the commands of a script, i.e. read from a file or pipe.
+
+        Unlike start, this shows no prompts and no confirmations, skips
+        blank lines and writes the output in chunks. Descriptions and names
+        for the 'task' and 'memo' commands are taken from the rest of the
+        line, or from the next line if the command stands alone. The
+        commands are not recorded for undo.
+        A summary is written to stderr at the end, and the number of
+        commands, the number of errors and the elapsed seconds are returned.
+        """
+        self.__reset(is_batch=True)
+        self.__lines = iter(lines)
+        self.__output = sys.stdout if output is None else output
+        self.__output_buffer = []
+        start_time = time.perf_counter()
+
+        try:
+            while self.__is_running:
+                self.__receive_user_input()
+        finally:
+            self.__flush_output()
+
+        elapsed_time = time.perf_counter() - start_time
+        sys.stderr.write(
+            "Executed {0} commands with {1} errors in {2:.3f}s "
+            "({3:.0f} commands/s).\n".format(
+                self.__command_count, self.__error_count, elapsed_time,
+                self.__command_count / elapsed_time if elapsed_time else 0))
+
+        return self.__command_count, self.__error_count, elapsed_time
+
+    def execute(self, line):
+        """Executes a single line of input and returns its output as text.
+
+        This is meant for sessions which receive their input line by line,
+        i.e. over a socket. Like run_batch, it shows no prompts and no
+        confirmations. A 'task' or 'memo' command without arguments takes
+        its description or name from the line of the next call.
+        """
+        self.__is_line_fed = True
+        self.__lines = iter((line,))
+        self.__output = io.StringIO()
+        self.__output_buffer = []
+
+        try:
+            if self.__pending_command is None:
+                self.__receive_user_input()
+            else:
+                handler, arguments = self.__pending_command
+                self.__pending_command = None
+                self.__run_command(handler, arguments)
+        finally:
+            self.__flush_output()
+
+        return self.__output.getvalue()
+
+    @property
+    def is_running(self):
+        return self.__is_running
+
     def quit(self):
         self.__is_running = False
 
-    def __reset(self):
-        self.__stack = MemoStack()
+    def close(self):
+        """Drops the undo history of the session, i.e. once it is over.
+
+        Each console has a history of its own, so undo takes back only the
+        commands entered on it.
+        """
+        if self.__history is not None:
+            self.__history.close()
+            self.__history = None
+
+    def register_command(self, handler, *names):
+        """Makes handler available as a command under each of the names.
+
+        The handler is called with the list of words following the command
+        name. Names are case insensitive, and registering a name again
+        replaces the handler of the previous registration. The metrics
+        record a command under its last name, whichever name was entered.
+        """
+        command = (handler, names[-1].lower())
+
+        for name in names:
+            self.__commands[name.lower()] = command
+
+    def write_line(self, *values):
+        """Prints the values like print, but respects the batch output."""
+        self.__print(*values)
+
+    def __reset(self, is_batch=False):
+        self.close()
+
+        if self.__memo_stack is not None:
+            self.__stack = self.__memo_stack
+        else:
+            self.__stack = MemoStack()
+
+        # The memos of stacks in storage, like a SqliteMemoStack, report no
+        # changes, so there is nothing to undo for them.
+        if not is_batch and getattr(self.__stack, "_reports_memo_changes",
+                                    False):
+            self.__history = MemoHistory(self.__stack)
+
+        self.__is_batch = is_batch
+
+        self.__scheduler = MemoScheduler.shared(self.__stack)
         self.__is_running = True
+        self.__lines = None
+        self.__is_line_fed = False
+        self.__is_awaiting_line = False
+        self.__pending_command = None
+        self.__argument_text = ""
+        self.__output = None
+        self.__output_buffer = None
+        self.__command_count = 0
+        self.__error_count = 0
 
     def __run_input_loop(self):
         print("Started the PyMemo application.\n"
@@ -208,123 +2975,509 @@ class MemoConsole:
             self.quit()
 
     def __receive_user_input(self):
-        user_input = input(MemoConsole.__prompt).lower()
+        user_input = self.__read_line(MemoConsole.__prompt)
+
+        if user_input is None:
+            return
+
+        command, arguments, self.__argument_text = \
+            self.__parse_command(user_input)
+
+        if self.__lines is not None and not command:
+            return
+
+        self.__command_count += 1
+        handler, name = self.__commands.get(command, (None, None))
+
+        if handler is None:
+            self.__print_unknown_input()
+        elif _metrics is None:
+            self.__run_command(handler, arguments)
+        else:
+            start_time = time.perf_counter()
+            self.__run_command(handler, arguments)
+            _record_operation("command:" + name, start_time)
+
+    def __run_command(self, handler, arguments):
+        if self.__history is None:
+            handler(arguments)
+        else:
+            self.__history.begin_step()
+
+            try:
+                handler(arguments)
+            finally:
+                self.__history.end_step()
 
-        if self.__input_matches_any(user_input, "q", "quit"):
+        if self.__is_awaiting_line:
+            self.__is_awaiting_line = False
+            self.__pending_command = handler, arguments
+
+    @staticmethod
+    def __parse_command(user_input):
+        """Returns the command, its arguments and the text following it.
+
+        The text keeps the whitespace of the input, so descriptions and
+        names are taken from it rather than from the arguments.
+        """
+        tokens = user_input.split()
+
+        if not tokens:
+            return "", [], ""
+
+        argument_text = user_input.split(None, 1)[1] if len(tokens) > 1 \
+            else ""
+        return tokens[0].lower(), tokens[1:], argument_text
+
+    def __register_default_commands(self):
+        self.register_command(self.__quit_command, "q", "quit")
+        self.register_command(self.__print_help_command, "h", "help")
+        self.register_command(self.__read_memo, "m", "memo")
+        self.register_command(self.__read_task, "t", "task")
+        self.register_command(self.__print_command, "p", "print")
+        self.register_command(self.__print_open_tasks, "o", "open")
+        self.register_command(self.__pop_command, "pop")
+        self.register_command(self.__complete_tasks, "c", "complete")
+        self.register_command(self.__search_tasks, "s", "search")
+        self.register_command(self.__stats_command, "stats")
+        self.register_command(self.__undo_command, "undo")
+        self.register_command(self.__redo_command, "redo")
+        self.register_command(self.__schedule_command, "sc", "schedule")
+        self.register_command(self.__unschedule_command, "unschedule")
+        self.register_command(self.__print_next_memo, "n", "next")
+        self.register_command(self.__print_agenda, "a", "agenda")
+
+    def __read_line(self, prompt):
+        if self.__lines is None:
+            return input(prompt)
+
+        try:
+            return next(self.__lines).rstrip("\r\n")
+        except StopIteration:
+            if self.__is_line_fed:
+                self.__is_awaiting_line = True
+            else:
+                self.quit()
+
+            return None
+
+    def __print(self, *values):
+        if self.__output_buffer is None:
+            print(*values)
+            return
+
+        self.__output_buffer.append(" ".join(str(value) for value in values))
+
+        if len(self.__output_buffer) >= self.__output_buffer_size:
+            self.__flush_output()
+
+    def __flush_output(self):
+        if self.__output_buffer:
+            self.__output.write("\n".join(self.__output_buffer) + "\n")
+            self.__output_buffer = []
+
+    def __confirm(self, *values):
+        if self.__lines is None:
+            self.__print(*values)
+
+    def __print_error(self, message):
+        self.__error_count += 1
+        self.__print(message)
+
+    def __print_help(self):
+        self.__print("Available commands:\n"
+                     "\thelp (or h): Print this command list.\n"
+                     "\tquit (or q): Quit the application.\n"
+                     "\tprint (or p): Print the top memo if the stack is not "
+                     "empty\n"
+                     "\tprint (or p) <from>-<to> | page <number> | open: "
+                     "Print only the tasks within the id range or the open "
+                     "tasks of the top memo, or the given page of {0} of "
+                     "them, i.e. 'print 10-20' or 'print open page 2'.\n"
+                     "\topen (or o) [count]: Print the open tasks of the "
+                     "top memo, or only the first ones, i.e. 'open 5'.\n"
+                     "\tmemo (or m) [name]: "
+                     "Creates a memo and puts it at the top of the stack\n"
+                     "\ttask (or t) [description]: Creates a new task for "
+                     "the top memo.\n"
+                     "\tcomplete (or c) <task ids>: Completes the tasks "
+                     "with the given task ids or id ranges of the top memo, "
+                     "i.e. 'complete 1' or 'complete 1 3 5-8'.\n"
+                     "\tsearch (or s) <words> [is:open | is:completed]: "
+                     "Lists the tasks of all memos containing the words, "
+                     "best matches first. A word ending with '*' matches "
+                     "all words starting with it, i.e. 'search buy mil*'.\n"
+                     "\tundo: Undo the changes of the last command, i.e. a "
+                     "pop or a completion.\n"
+                     "\tredo: Redo the changes of the last undone command."
+                     "\n"
+                     "\tschedule (or sc) <priority> [YYYY-MM-DD]: Schedules "
+                     "the top memo with the given priority, higher ones "
+                     "first, and deadline, i.e. 'schedule 2 2026-12-24'.\n"
+                     "\tunschedule: Removes the top memo from the "
+                     "schedule.\n"
+                     "\tnext (or n): Print the scheduled memo to work on "
+                     "next.\n"
+                     "\tagenda (or a) [count]: List the scheduled memos in "
+                     "the order to work on them, or only the first ones.\n"
+                     "\tstats [on | off | reset | json | prometheus]: "
+                     "Print the operation metrics, slowest first, switch "
+                     "their collection on or off, clear them or export "
+                     "them.".format(MemoConsole.__page_size))
+
+    def __quit_command(self, arguments):
+        if arguments:
+            self.__print_unknown_input()
+        else:
             self.quit()
-        elif self.__input_matches_any(user_input, "h", "help"):
+
+    def __print_help_command(self, arguments):
+        if arguments:
+            self.__print_unknown_input()
+        else:
             self.__print_help()
-        elif self.__input_matches_any(user_input, "m", "memo"):
-            self.__read_memo()
-        elif self.__input_matches_any(user_input, "t", "task"):
-            self.__read_task()
-        elif self.__input_matches_any(user_input, "p", "print"):
+
+    def __print_command(self, arguments):
+        if arguments:
+            self.__print_memo_window(
+                [argument.lower() for argument in arguments])
+        else:
             self.__print_memo_stack()
-        elif user_input == "pop":
-            self.__pop_memo()
-        elif user_input.startswith("c") or user_input.startswith("complete"):
-            task_id = self.__extract_task_id(user_input)
-            self.__complete_task(task_id)
+
+    def __print_open_tasks(self, arguments):
+        try:
+            limit = int(arguments[0]) if arguments else None
+        except ValueError:
+            limit = 0
+
+        if len(arguments) > 1 or (limit is not None and limit < 1):
+            self.__print_unknown_input()
+        elif self.__stack.is_empty():
+            self.__print_error("The memo stack is empty.")
+        elif self.__stack.peek().count_open() == 0:
+            self.__print("All tasks of this memo are completed.")
         else:
+            memo_formatter = MemoFormatter(self.__stack.peek())
+            self.__print(memo_formatter.format_window(open_only=True,
+                                                      limit=limit))
+
+    def __pop_command(self, arguments):
+        if arguments:
             self.__print_unknown_input()
+        else:
+            self.__pop_memo()
 
-    @staticmethod
-    def __print_help():
-        print("Available commands:\n"
-              "\thelp (or h): Print this command list.\n"
-              "\tquit (or q): Quit the application.\n"
-              "\tprint (or p): Print the top memo if the stack is not empty\n"
-              "\tmemo (or m): "
-              "Creates a memo and puts it at the top of the stack\n"
-              "\ttask (or t): Creates a new task for the top memo.\n"
-              "\tcomplete (or c) <task id>: Completes the task with the "
-              "given task id of the top memo, i.e. 'complete 1'.")
-
-    def __complete_task(self, task_id):
-        if task_id is None:
+    def __complete_tasks(self, arguments):
+        if not arguments:
+            self.__print_unknown_input()
             return
 
-        if self.__stack.is_empty():
-            print("The memo stack is empty.")
+        task_id_ranges = self.__parse_task_ids(arguments)
+
+        if task_id_ranges is None:
+            self.__print_error(
+                "The task id you entered is no number!\n"
+                "Please pick the task you want to finish and enter "
+                "'complete' followed by the task id displayed next "
+                "to the task you want to finish, i.e. 'complete 1'.")
+        elif self.__stack.is_empty():
+            self.__print_error("The memo stack is empty.")
         else:
             try:
                 memo = self.__stack.peek()
-                memo.complete_task(task_id)
+                task_count = memo._get_number_of_task()
+
+                # The ranges are checked before they are expanded, so a
+                # huge one does not end up as a list of task ids.
+                for task_id_range in task_id_ranges:
+                    if task_id_range[0] < 1 or task_id_range[-1] > task_count:
+                        raise InvalidTaskId(task_id_range[0])
+
+                memo.complete_tasks(
+                    itertools.chain.from_iterable(task_id_ranges))
             except InvalidTaskId:
-                print("The task id you entered does not exist!\n"
-                      "Please enter a valid task id. You'll find them next "
-                      "to the task you want to complete.")
+                self.__print_error(
+                    "The task id you entered does not exist!\n"
+                    "Please enter a valid task id. You'll find them next "
+                    "to the task you want to complete.")
 
-    def __pop_memo(self):
-        if self.__stack.is_empty():
-            print("The memo stack is empty.")
+    @staticmethod
+    def __parse_task_ids(arguments):
+        task_id_ranges = []
+
+        try:
+            for argument in arguments:
+                first_id, _, last_id = argument.partition("-")
+                first_id = int(first_id)
+                last_id = int(last_id) if last_id else first_id
+                task_id_ranges.append(range(min(first_id, last_id),
+                                            max(first_id, last_id) + 1))
+        except ValueError:
+            return None
+
+        return task_id_ranges
+
+    def __search_tasks(self, arguments):
+        filters = {"is:open": False, "is:completed": True}
+        completed = None
+        query_terms = []
+
+        for argument in arguments:
+            if argument.lower() in filters:
+                completed = filters[argument.lower()]
+            else:
+                query_terms.append(argument)
+
+        if not query_terms:
+            self.__print_unknown_input()
             return
 
-        memo = self.__stack.peek()
-        if memo.is_completed():
-            memo = self.__stack.pop()
-            print("Well done! You just finished the following memo. "
-                  "Keep up the good work!")
-            print(memo)
+        query = " ".join(query_terms)
+
+        if getattr(self.__stack, "_reports_memo_changes", False):
+            # The index is built on the first search of any session and
+            # then kept up to date by the stack and its memos.
+            hits = MemoSearchIndex.shared(self.__stack).search(query,
+                                                               completed)
         else:
-            print("You cannot remove this memo - it is not complete! "
-                  "You must finish all tasks of the memo first.")
+            hits = MemoSearchIndex.scan(self.__stack, query, completed)
+
+        if not hits:
+            self.__print("No matching tasks found.")
+
+        for memo, task_id in hits:
+            task = memo.get_task(task_id)
+            self.__print("{0} [{1}] {2}{3}".format(
+                memo.name, task_id, task.description,
+                " (completed)" if task.is_completed else ""))
+
+    def __schedule_command(self, arguments):
+        try:
+            priority = int(arguments[0])
+            deadline = datetime.datetime.strptime(
+                arguments[1], "%Y-%m-%d").date() \
+                if len(arguments) > 1 else None
+        except (IndexError, ValueError):
+            priority = None
+
+        if priority is None or len(arguments) > 2:
+            self.__print_unknown_input()
+        elif self.__stack.is_empty():
+            self.__print_error("The memo stack is empty.")
+        else:
+            self.__scheduler.schedule(self.__stack.peek(), priority,
+                                      deadline)
 
-    def __print_memo_stack(self):
-        if self.__stack.is_empty():
-            print("The memo stack is empty.")
+    def __unschedule_command(self, arguments):
+        if arguments:
+            self.__print_unknown_input()
+        elif self.__stack.is_empty():
+            self.__print_error("The memo stack is empty.")
+        elif not self.__scheduler.remove(self.__stack.peek()):
+            self.__print_error("The top memo is not scheduled.")
+
+    def __print_next_memo(self, arguments):
+        if arguments:
+            self.__print_unknown_input()
+        elif len(self.__scheduler) == 0:
+            self.__print_error("No memo is scheduled.")
         else:
-            memo = self.__stack.peek()
-            print(memo)
+            self.__print("Next: " + self.__describe_schedule(
+                *self.__scheduler.top(1)[0]))
 
-    def __extract_task_id(self, user_input):
-        command_and_id = str(user_input).split(" ")
+    def __print_agenda(self, arguments):
+        try:
+            count = int(arguments[0]) if arguments else \
+                MemoConsole.__page_size
+        except ValueError:
+            count = 0
 
-        if len(command_and_id) != 2:
+        if len(arguments) > 1 or count < 1:
             self.__print_unknown_input()
-            return
+        elif len(self.__scheduler) == 0:
+            self.__print_error("No memo is scheduled.")
+        else:
+            for position, scheduled_memo in enumerate(
+                    self.__scheduler.top(count), 1):
+                self.__print("{0}. {1}".format(
+                    position, self.__describe_schedule(*scheduled_memo)))
+
+    @staticmethod
+    def __describe_schedule(memo, priority, deadline):
+        details = []
+
+        if priority is not None:
+            details.append("priority {0}".format(priority))
+
+        if deadline is not None:
+            details.append("due {0}".format(deadline))
+
+        if not details:
+            return memo.name
 
-        if command_and_id[0] == "c" or command_and_id[0] == "complete":
+        return "{0} ({1})".format(memo.name, ", ".join(details))
+
+    def __undo_command(self, arguments):
+        self.__replay_history(arguments, MemoHistory.undo, "undo")
+
+    def __redo_command(self, arguments):
+        self.__replay_history(arguments, MemoHistory.redo, "redo")
+
+    def __replay_history(self, arguments, replay, action):
+        if arguments:
+            self.__print_unknown_input()
+        elif self.__history is None:
+            self.__print_error("There is no {0} {1}.".format(
+                action, "in batch mode" if self.__is_batch
+                else "for this memo stack"))
+        else:
             try:
-                task_id = int(command_and_id[1])
-                return task_id
-            except ValueError:
-                print("The task id you entered is no number!\n"
-                      "Please pick the task you want to finish and enter "
-                      "'complete' followed by the task id displayed next "
-                      "to the task you want to finish, i.e. 'complete 1'.")
+                if not replay(self.__history):
+                    self.__print_error("There is nothing to {0}.".format(
+                        action))
+            except MemoHistoryConflict as conflict:
+                self.__print_error(str(conflict))
+
+    def __stats_command(self, arguments):
+        argument = arguments[0].lower() if len(arguments) == 1 else None
+
+        if len(arguments) > 1 or argument not in (
+                None, "on", "off", "reset", "json", "prometheus"):
+            self.__print_unknown_input()
+        elif argument == "on":
+            if _metrics is None:
+                MemoMetrics().enable()
+        elif _metrics is None:
+            self.__print_error("The metrics are disabled. Enter 'stats on' "
+                               "to collect them.")
+        elif argument == "off":
+            _metrics.disable()
+        elif argument == "reset":
+            _metrics.reset()
+        elif argument == "json":
+            self.__print(_metrics.to_json())
+        elif argument == "prometheus":
+            self.__print(_metrics.to_prometheus().rstrip("\n"))
         else:
+            self.__print_metrics(_metrics.snapshot())
+
+    def __print_metrics(self, operations):
+        if not operations:
+            self.__print("No operations were measured yet.")
+
+        for operation, statistics in sorted(
+                operations.items(), key=lambda item: -item[1]["seconds"]):
+            self.__print("{0}: {1} calls, {2} tasks, {3:.1f} us mean, "
+                         "{4:.1f} us max{5}".format(
+                             operation, statistics["count"],
+                             statistics["task_count"],
+                             statistics["seconds"] / statistics["count"]
+                             * 1000000,
+                             statistics["max_seconds"] * 1000000,
+                             ", {0} characters".format(statistics["size"])
+                             if statistics["size"] else ""))
+
+    def __pop_memo(self):
+        memo = self.__stack.pop_if_completed()
+
+        if memo is not None:
+            self.__confirm("Well done! You just finished the following memo. "
+                           "Keep up the good work!")
+            self.__confirm(memo)
+        elif self.__stack.is_empty():
+            self.__print_error("The memo stack is empty.")
+        else:
+            self.__print_error(
+                "You cannot remove this memo - it is not complete! "
+                "You must finish all tasks of the memo first.")
+
+    def __print_memo_stack(self):
+        if self.__stack.is_empty():
+            self.__print_error("The memo stack is empty.")
+        else:
+            memo = self.__stack.peek()
+            self.__print(memo)
+
+    def __print_memo_window(self, arguments):
+        window = self.__parse_memo_window(arguments)
+
+        if window is None:
             self.__print_unknown_input()
+        elif self.__stack.is_empty():
+            self.__print_error("The memo stack is empty.")
+        else:
+            memo_formatter = MemoFormatter(self.__stack.peek())
+            self.__print(memo_formatter.format_window(**window))
 
-    def __read_task(self):
+    @staticmethod
+    def __parse_memo_window(arguments):
+        window = {}
+        arguments = list(arguments)
+
+        try:
+            while arguments:
+                argument = arguments.pop(0)
+
+                if argument == "open":
+                    window["open_only"] = True
+                elif argument == "page" and arguments:
+                    page = int(arguments.pop(0))
+
+                    if page < 1:
+                        return None
+
+                    # The page is taken from the selected tasks, so with
+                    # open it is a page of the open tasks.
+                    window["skip"] = (page - 1) * MemoConsole.__page_size
+                    window["limit"] = MemoConsole.__page_size
+                else:
+                    first_id, _, last_id = argument.partition("-")
+                    window["first_id"] = int(first_id)
+                    window["last_id"] = int(last_id or first_id)
+        except ValueError:
+            return None
+
+        return window
+
+    def __read_task(self, arguments):
         if self.__stack.is_empty():
-            print("The memo stack is empty! Please create a memo first.")
+            self.__print_error(
+                "The memo stack is empty! Please create a memo first.")
         else:
-            task_description = input(
-                "{0}Please enter a new task description: ".format(
-                    MemoConsole.__prompt))
+            if arguments:
+                task_description = self.__argument_text
+            else:
+                task_description = self.__read_line(
+                    "{0}Please enter a new task description: ".format(
+                        MemoConsole.__prompt))
+
+            if task_description is None:
+                return
 
             memo = self.__stack.peek()
             task = Task(task_description)
             memo.add_task(task)
 
-    def __read_memo(self):
-        memo_name = input("{0}Please enter the new memo\'s name: ".format(
-            MemoConsole.__prompt))
+    def __read_memo(self, arguments):
+        if arguments:
+            memo_name = self.__argument_text
+        else:
+            memo_name = self.__read_line(
+                "{0}Please enter the new memo\'s name: ".format(
+                    MemoConsole.__prompt))
+
+        if memo_name is None:
+            return
 
         memo = Memo(memo_name)
         self.__stack.push(memo)
-        print(
+        self.__confirm(
             "Your memo \"{0}\" was created successfully. ".format(memo_name),
             "You may now add tasks to it.")
 
-    @staticmethod
-    def __input_matches_any(user_input, *allowed_values):
-        return user_input in allowed_values
-
-    @staticmethod
-    def __print_unknown_input():
-        print("We're sorry. But the command you entered is unknown.")
+    def __print_unknown_input(self):
+        self.__print_error(
+            "We're sorry. But the command you entered is unknown.")
 
 
 class MemoNotCompleted(Exception):
@@ -341,6 +3494,17 @@ class MemoStackIsEmpty(Exception):
         return "The memo stack is empty!"
 
 
+class MemoSchedulerIsEmpty(Exception):
+    def __str__(self):
+        return "No memo is scheduled!"
+
+
+class MemoHistoryConflict(Exception):
+    def __str__(self):
+        return "This cannot be undone or redone, since the memo stack " \
+               "was changed in the meantime."
+
+
 class InvalidTaskId(Exception):
     def __init__(self, index):
         self.index = index
@@ -349,6 +3513,85 @@ class InvalidTaskId(Exception):
         return "There is no task with id '{0}'.".format(self.index)
 
 
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Manage stacks of memos.")
+    parser.add_argument("--journal", metavar="DIRECTORY",
+                        help="keep the memo stack in the given directory, "
+                             "so that it survives a restart")
+    parser.add_argument("--journal-batch", metavar="RECORDS", type=int,
+                        default=1,
+                        help="write the journal every RECORDS changes "
+                             "instead of after every change, which loses "
+                             "up to RECORDS - 1 changes if the process is "
+                             "killed")
+    parser.add_argument("--no-fsync", dest="fsync", action="store_false",
+                        help="do not fsync the journal after writing it")
+    parser.add_argument("--sqlite", metavar="DATABASE",
+                        help="keep the memo stack in the given SQLite "
+                             "database")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="execute the commands of the given file, or of "
+                             "stdin for '-', instead of asking for them")
+    parser.add_argument("--serve", metavar="ADDRESS",
+                        help="serve the commands to clients on the given "
+                             "'host:port', port or 'unix:path' instead of "
+                             "asking for them")
+    parser.add_argument("--metrics", action="store_true",
+                        help="measure the operations from the start, see "
+                             "the 'stats' command")
+    parser.add_argument("--share-descriptions", action="store_true",
+                        help="keep one copy of equal task descriptions, "
+                             "i.e. of memos made from templates")
+    arguments = parser.parse_args(arguments)
+
+    if arguments.journal_batch < 1:
+        parser.error("argument --journal-batch: must be at least 1")
+
+    if arguments.share_descriptions and arguments.sqlite is not None:
+        parser.error("argument --share-descriptions: not allowed with "
+                     "argument --sqlite")
+
+    if arguments.metrics:
+        MemoMetrics().enable()
+
+    with contextlib.ExitStack() as resources:
+        memo_stack = MemoStack(share_descriptions=True) \
+            if arguments.share_descriptions else None
+
+        if arguments.journal is not None:
+            from PyMemoStorage import MemoJournal
+
+            journal = resources.enter_context(MemoJournal(
+                arguments.journal, batch_size=arguments.journal_batch,
+                fsync=arguments.fsync,
+                share_descriptions=arguments.share_descriptions))
+            memo_stack = journal.open()
+        elif arguments.sqlite is not None:
+            from PyMemoStorage import SqliteMemoStack
+
+            memo_stack = resources.enter_context(
+                SqliteMemoStack(arguments.sqlite))
+
+        if arguments.serve is not None:
+            from PyMemoServer import MemoServer
+
+            MemoServer(memo_stack).run(arguments.serve)
+            return
+
+        console = MemoConsole(memo_stack)
+
+        if arguments.batch is None:
+            console.start()
+        elif arguments.batch == "-":
+            console.run_batch(sys.stdin)
+        else:
+            with open(arguments.batch, encoding="utf-8") as commands:
+                console.run_batch(commands)
+
+
 if __name__ == '__main__':
-    console = MemoConsole()
-    console.start()
+    # Run main from the imported module, so that the console works on the
+    # same classes as the storage modules which import PyMemo themselves.
+    from PyMemo import main
+
+    main()
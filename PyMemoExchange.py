@@ -0,0 +1,238 @@
+import csv
+import itertools
+import json
+import re
+
+from PyMemo import Memo
+from PyMemo import MemoStack
+from PyMemo import Task
+
+
+class MemoJsonLines:
+    """Reads and writes memo stacks as JSON Lines.
+
+    Every memo is a {"memo": name} line followed by a
+    {"task": description, "completed": is_completed} line per task, from
+    the bottom of the stack to the top. Both directions stream: write
+    produces one line at a time, and read adds the tasks in batches while
+    it reads, so the file is never held in memory as a whole.
+    """
+
+    @staticmethod
+    def write(memo_stack, stream):
+        _write_lines(MemoJsonLines.iter_lines(memo_stack), stream)
+
+    @staticmethod
+    def iter_lines(memo_stack):
+        for memo in list(memo_stack.memos):
+            yield json.dumps({"memo": memo.name}, ensure_ascii=False) + "\n"
+
+            for _, task in memo._iter_id_task_tuples():
+                yield json.dumps({"task": task.description,
+                                  "completed": task.is_completed},
+                                 ensure_ascii=False) + "\n"
+
+    @staticmethod
+    def read(stream, memo_stack=None, batch_size=10000,
+             share_descriptions=False):
+        """Pushes the memos of the stream onto the stack and returns it.
+
+        Without a stack, a new MemoStack is made with share_descriptions.
+        """
+        return _read_records(MemoJsonLines.__iter_records(stream),
+                             memo_stack, batch_size, share_descriptions)
+
+    @staticmethod
+    def __iter_records(stream):
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+
+            if isinstance(record, dict) and isinstance(record.get("memo"),
+                                                       str):
+                yield None, record["memo"]
+            elif isinstance(record, dict) and isinstance(record.get("task"),
+                                                         str):
+                is_completed = record.get("completed", False)
+
+                # Only JSON booleans count, so "false" is not taken as true.
+                if not isinstance(is_completed, bool):
+                    raise ValueError("Line {0} has no valid completed "
+                                     "value.".format(line_number))
+
+                yield record["task"], is_completed
+            else:
+                raise ValueError("Line {0} is no memo or task record."
+                                 .format(line_number))
+
+
+class MemoCsv:
+    """Reads and writes memo stacks as CSV with a memo,task,completed header.
+
+    Each memo starts with a row of its name and empty task and completed
+    columns, followed by a row per task which repeats the memo name. When
+    reading, a task row whose memo differs from the previous row starts a
+    new memo as well, so hand-written files may leave out the memo rows.
+    Like MemoJsonLines, both directions stream.
+    """
+
+    __header = ("memo", "task", "completed")
+    __completed_values = {"true": True, "1": True, "yes": True, "x": True,
+                          "false": False, "0": False, "no": False, "": False}
+
+    @staticmethod
+    def write(memo_stack, stream):
+        writer = csv.writer(stream, lineterminator="\n")
+        writer.writerow(MemoCsv.__header)
+
+        for memo in list(memo_stack.memos):
+            writer.writerow((memo.name, "", ""))
+            writer.writerows(
+                (memo.name, task.description,
+                 "true" if task.is_completed else "false")
+                for _, task in memo._iter_id_task_tuples())
+
+    @staticmethod
+    def read(stream, memo_stack=None, batch_size=10000,
+             share_descriptions=False):
+        """Pushes the memos of the stream onto the stack and returns it.
+
+        Without a stack, a new MemoStack is made with share_descriptions.
+        """
+        return _read_records(MemoCsv.__iter_records(stream), memo_stack,
+                             batch_size, share_descriptions)
+
+    @staticmethod
+    def __iter_records(stream):
+        rows = csv.reader(stream)
+        header = next(rows, None)
+
+        if header is None:
+            return
+
+        if tuple(column.strip().lower() for column in header) \
+                != MemoCsv.__header:
+            raise ValueError("The CSV header has to be 'memo,task,"
+                             "completed'.")
+
+        memo_name = None
+
+        for row in rows:
+            if not row:
+                continue
+
+            if len(row) != 3:
+                raise ValueError("Row {0} has not 3 columns.".format(
+                    rows.line_num))
+
+            name, description, completed = row
+
+            if not description and not completed:
+                memo_name = name
+                yield None, name
+                continue
+
+            if name != memo_name:
+                memo_name = name
+                yield None, name
+
+            is_completed = MemoCsv.__completed_values.get(
+                completed.strip().lower())
+
+            if is_completed is None:
+                raise ValueError("Row {0} has no valid completed column."
+                                 .format(rows.line_num))
+
+            yield description, is_completed
+
+
+class MemoMarkdown:
+    """Writes memo stacks as Markdown checklists, one section per memo.
+
+    Names and descriptions are written on a single line, with backslashes,
+    pipes and brackets escaped, so they neither break tables nor turn into
+    links or checkboxes.
+    """
+
+    __special_characters = re.compile(r"([\\|\[\]])")
+
+    @staticmethod
+    def write(memo_stack, stream):
+        _write_lines(MemoMarkdown.iter_lines(memo_stack), stream)
+
+    @staticmethod
+    def iter_lines(memo_stack):
+        for index, memo in enumerate(list(memo_stack.memos)):
+            if index > 0:
+                yield "\n"
+
+            yield "## {0}\n\n".format(MemoMarkdown.__escape(memo.name))
+
+            for _, task in memo._iter_id_task_tuples():
+                yield "- [{0}] {1}\n".format(
+                    "x" if task.is_completed else " ",
+                    MemoMarkdown.__escape(task.description))
+
+    @staticmethod
+    def __escape(text):
+        return MemoMarkdown.__special_characters.sub(
+            r"\\\1", " ".join(text.splitlines()))
+
+
+def _write_lines(lines, stream, chunk_size=1000):
+    # Writing the lines in chunks saves most of the calls to the stream,
+    # while only a chunk of them is held in memory.
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+
+        if not chunk:
+            break
+
+        stream.write("".join(chunk))
+
+
+def _read_records(records, memo_stack, batch_size, share_descriptions):
+    """Pushes memos built from (description, is_completed) records.
+
+    A record with None as description starts a memo of the given name. The
+    memo is pushed before its tasks are read, and the tasks are added to
+    the pushed memo in batches through add_tasks, which keeps the memory
+    bounded for stacks that store their memos elsewhere, like a
+    SqliteMemoStack. The tasks added to a stack sharing its descriptions
+    get the pooled copies as they are added.
+    """
+    if memo_stack is None:
+        memo_stack = MemoStack(share_descriptions=share_descriptions)
+
+    memo = None
+    task_data = []
+
+    for description, value in records:
+        if description is None:
+            if memo is not None:
+                memo.add_tasks(Task._create_all(task_data))
+                task_data = []
+
+            memo_stack.push(Memo(value))
+            memo = memo_stack.peek()
+            continue
+
+        if memo is None:
+            raise ValueError("The task '{0}' belongs to no memo.".format(
+                description))
+
+        task_data.append((description, value))
+
+        if len(task_data) >= batch_size:
+            memo.add_tasks(Task._create_all(task_data))
+            task_data = []
+
+    if memo is not None:
+        memo.add_tasks(Task._create_all(task_data))
+
+    return memo_stack
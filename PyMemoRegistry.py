@@ -0,0 +1,258 @@
+import multiprocessing
+import os
+import threading
+import zlib
+
+from PyMemo import InvalidTaskId
+from PyMemo import Memo
+from PyMemo import MemoNotCompleted
+from PyMemo import MemoStack
+from PyMemo import MemoStackIsEmpty
+from PyMemo import Task
+
+
+class MemoStackRegistry:
+    """Memo stacks by key, spread over a number of worker processes.
+
+    Each stack lives in the worker process of its shard, which is picked
+    by a stable hash of the key, so the stacks neither share the memory nor
+    the interpreter lock of one process. Memos are copied in and out of the
+    workers: push takes a copy of the memo, and peek and pop return copies,
+    so changes have to go through the registry, i.e. complete_task.
+
+    execute runs a batch of calls with one round trip per involved shard,
+    and the shards work on their part of the batch at the same time.
+    """
+
+    def __init__(self, shard_count=None):
+        self.shard_count = shard_count or os.cpu_count() or 1
+        self.__shards = None
+
+    def start(self):
+        if self.__shards is not None:
+            return self
+
+        self.__shards = []
+
+        for _ in range(self.shard_count):
+            connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_serve_shard,
+                                             args=(worker_connection,),
+                                             daemon=True)
+            worker.start()
+            worker_connection.close()
+            self.__shards.append((connection, worker, threading.Lock()))
+
+        return self
+
+    def close(self):
+        if self.__shards is None:
+            return
+
+        for connection, worker, lock in self.__shards:
+            with lock:
+                connection.send(None)
+                connection.close()
+
+            worker.join()
+
+        self.__shards = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def push(self, key, memo):
+        self.__execute_one("push", key, memo)
+
+    def pop(self, key):
+        return self.__execute_one("pop", key)
+
+    def peek(self, key):
+        return self.__execute_one("peek", key)
+
+    def is_empty(self, key):
+        return self.__execute_one("is_empty", key)
+
+    def complete_task(self, key, task_id):
+        self.__execute_one("complete_task", key, task_id)
+
+    def execute(self, calls):
+        """Executes a batch of calls and returns their results in order.
+
+        Each call is a tuple of the method name, the stack key and, for
+        push and complete_task, the argument. A failed call does not stop
+        the others: its exception takes the place of its result.
+        """
+        calls = [self.__dump_call(*call) for call in calls]
+        calls_by_shard = {}
+
+        for index, call in enumerate(calls):
+            calls_by_shard.setdefault(self.__shard_of(call[1]), []).append(
+                (index, call))
+
+        results = [None] * len(calls)
+        shard_indexes = sorted(calls_by_shard)
+        locks = [self.__shards[shard_index][2]
+                 for shard_index in shard_indexes]
+
+        # The locks are taken in the order of the shards, so concurrent
+        # batches cannot wait for each other in a circle.
+        for lock in locks:
+            lock.acquire()
+
+        try:
+            for shard_index in shard_indexes:
+                self.__shards[shard_index][0].send(
+                    [call for _, call in calls_by_shard[shard_index]])
+
+            for shard_index in shard_indexes:
+                shard_results = self.__shards[shard_index][0].recv()
+
+                for (index, call), result in zip(
+                        calls_by_shard[shard_index], shard_results):
+                    results[index] = _load_result(call[0], result)
+        finally:
+            for lock in locks:
+                lock.release()
+
+        return results
+
+    def __execute_one(self, operation, key, argument=None):
+        result = self.execute([(operation, key, argument)])[0]
+
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+    @staticmethod
+    def __dump_call(operation, key, argument=None):
+        if operation not in _operations:
+            raise ValueError("Unknown operation '{0}'.".format(operation))
+
+        if operation == "push" and argument is not None:
+            argument = _dump_memo(argument)
+
+        return operation, key, argument
+
+    def __shard_of(self, key):
+        if self.__shards is None:
+            raise RuntimeError("The registry has not been started.")
+
+        # hash() of strings differs between processes, crc32 does not.
+        return zlib.crc32(repr(key).encode("utf-8")) % len(self.__shards)
+
+
+def _serve_shard(connection):
+    memo_stacks = {}
+
+    while True:
+        calls = connection.recv()
+
+        if calls is None:
+            break
+
+        connection.send([_execute_call(memo_stacks, *call)
+                         for call in calls])
+
+    connection.close()
+
+
+def _execute_call(memo_stacks, operation, key, argument):
+    try:
+        return "result", _operations[operation](memo_stacks, key, argument)
+    except MemoNotCompleted as error:
+        return "not completed", _dump_memo(error.memo)
+    except MemoStackIsEmpty:
+        return "empty", None
+    except InvalidTaskId as error:
+        return "invalid task id", error.index
+    except Exception as error:
+        return "error", error
+
+
+def _push(memo_stacks, key, memo_data):
+    if memo_data is None:
+        return
+
+    memo_stack = memo_stacks.get(key)
+
+    if memo_stack is None:
+        memo_stack = memo_stacks[key] = MemoStack()
+
+    memo_stack.push(_load_memo(memo_data))
+
+
+def _pop(memo_stacks, key, argument):
+    memo_stack = memo_stacks.get(key)
+
+    if memo_stack is None:
+        raise MemoStackIsEmpty()
+
+    memo = memo_stack.pop()
+
+    # Most users finish their memos, so empty stacks are dropped to keep
+    # the memory of a worker proportional to the open memos.
+    if memo_stack.is_empty():
+        del memo_stacks[key]
+
+    return _dump_memo(memo)
+
+
+def _peek(memo_stacks, key, argument):
+    if key not in memo_stacks:
+        raise MemoStackIsEmpty()
+
+    return _dump_memo(memo_stacks[key].peek())
+
+
+def _is_empty(memo_stacks, key, argument):
+    return key not in memo_stacks
+
+
+def _complete_task(memo_stacks, key, task_id):
+    if key not in memo_stacks:
+        raise MemoStackIsEmpty()
+
+    memo_stacks[key].peek().complete_task(task_id)
+
+
+_operations = {
+    "push": _push,
+    "pop": _pop,
+    "peek": _peek,
+    "is_empty": _is_empty,
+    "complete_task": _complete_task,
+}
+
+
+def _load_result(operation, result):
+    kind, value = result
+
+    if kind == "not completed":
+        return MemoNotCompleted(_load_memo(value))
+    elif kind == "empty":
+        return MemoStackIsEmpty()
+    elif kind == "invalid task id":
+        return InvalidTaskId(value)
+    elif kind == "error":
+        return value
+    elif operation in ("pop", "peek"):
+        return _load_memo(value)
+    else:
+        return value
+
+
+def _dump_memo(memo):
+    return memo.name, [(task.description, task.is_completed)
+                       for _, task in memo._iter_id_task_tuples()]
+
+
+def _load_memo(memo_data):
+    name, task_data = memo_data
+    memo = Memo(name)
+    memo.add_tasks(Task._create_all(task_data))
+    return memo
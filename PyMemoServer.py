@@ -0,0 +1,112 @@
+import asyncio
+
+from PyMemo import MemoConsole
+from PyMemo import MemoStack
+
+
+class MemoServer:
+    """Serves the console commands to many clients over local sockets.
+
+    Every connection is a session of its own MemoConsole on the shared memo
+    stack, which receives the input line by line and sends the output back
+    like run_batch would write it. Commands are executed on the event loop
+    one line at a time, with no await in between, so the commands of all
+    sessions are serialized on the stack without any locks.
+    """
+
+    # A client which sends a long script only keeps the event loop for this
+    # many commands at a time, so that the other sessions stay responsive.
+    __commands_per_turn = 64
+    # Thousands of clients may connect at once, and a full accept queue makes
+    # them retry only after a second.
+    __backlog = 4096
+
+    def __init__(self, memo_stack=None):
+        self.memo_stack = MemoStack() if memo_stack is None else memo_stack
+        self.__server = None
+        self.__writers = set()
+
+    @property
+    def session_count(self):
+        return len(self.__writers)
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Listens on a TCP socket and returns the bound (host, port)."""
+        self.__server = await asyncio.start_server(
+            self.__serve_client, host, port, backlog=MemoServer.__backlog)
+        return self.__server.sockets[0].getsockname()[:2]
+
+    async def start_unix(self, path):
+        """Listens on the Unix domain socket at path."""
+        self.__server = await asyncio.start_unix_server(
+            self.__serve_client, path, backlog=MemoServer.__backlog)
+        return path
+
+    def close(self):
+        if self.__server is not None:
+            self.__server.close()
+
+        for writer in list(self.__writers):
+            writer.close()
+
+    async def wait_closed(self):
+        if self.__server is not None:
+            await self.__server.wait_closed()
+            self.__server = None
+
+    def run(self, address):
+        """Serves on address until interrupted.
+
+        The address is either 'unix:<path>', '<host>:<port>' or a port on
+        the loopback interface.
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        try:
+            if address.startswith("unix:"):
+                bound_address = loop.run_until_complete(
+                    self.start_unix(address[len("unix:"):]))
+            else:
+                host, _, port = address.rpartition(":")
+                bound_address = loop.run_until_complete(
+                    self.start(host or "127.0.0.1", int(port)))
+
+            print("Serving PyMemo on {0}.".format(bound_address))
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+            loop.run_until_complete(self.wait_closed())
+            loop.close()
+
+    async def __serve_client(self, reader, writer):
+        console = MemoConsole(self.memo_stack)
+        self.__writers.add(writer)
+        command_count = 0
+
+        try:
+            while console.is_running:
+                line = await reader.readline()
+
+                if not line:
+                    break
+
+                output = console.execute(line.decode("utf-8", "replace"))
+
+                if output:
+                    writer.write(output.encode("utf-8"))
+                    await writer.drain()
+
+                command_count += 1
+
+                if command_count % MemoServer.__commands_per_turn == 0:
+                    await asyncio.sleep(0)
+        except (ConnectionError, ValueError):
+            # The client went away, or sent a line beyond the stream limit.
+            pass
+        finally:
+            console.close()
+            self.__writers.discard(writer)
+            writer.close()
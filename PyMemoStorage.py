@@ -0,0 +1,1333 @@
+import contextlib
+import itertools
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import weakref
+
+from PyMemo import InvalidTaskId
+from PyMemo import Memo
+from PyMemo import MemoFormatter
+from PyMemo import MemoNotCompleted
+from PyMemo import MemoStack
+from PyMemo import MemoStackIsEmpty
+from PyMemo import MemoTaskView
+from PyMemo import Task
+
+
+class MemoJournal:
+    """Keeps a memo stack on disk as a snapshot and an append-only log.
+
+    Every push, pop and change of a memo on the stack is appended to the log.
+    Records are buffered and written batch_size at a time, each batch is
+    fsynced if fsync is set. After snapshot_interval records the stack is
+    written to a new snapshot and the log starts over, so a restart only
+    has to load the snapshot and replay the tail of the log. With
+    share_descriptions, the loaded stack shares equal task descriptions,
+    see MemoStack.
+    """
+
+    __snapshot_file_name = "snapshot.json"
+    __log_file_template = "journal-{0}.log"
+
+    def __init__(self, directory, batch_size=100, fsync=True,
+                 snapshot_interval=100000, share_descriptions=False):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.snapshot_interval = snapshot_interval
+        self.share_descriptions = share_descriptions
+        self.__stack = None
+        self.__generation = 0
+        self.__log = None
+        self.__pending_records = []
+        self.__logged_record_count = 0
+        self.__journaled_memos = {}
+        self.__next_memo_key = 0
+
+    def open(self):
+        if self.__stack is not None:
+            return self.__stack
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        stack = MemoStack(share_descriptions=self.share_descriptions)
+        memos_by_key = self.__load_snapshot(stack)
+        self.__replay_log(stack, memos_by_key)
+        self.__remove_stale_logs()
+
+        self.__log = open(self.__log_path(self.__generation), "a",
+                          encoding="utf-8")
+        self.__stack = stack
+        stack._add_listener(self.__on_stack_changed)
+
+        for memo in memos_by_key.values():
+            if self.__journaled_memos.get(id(memo)) is not None:
+                memo._add_listener(self.__on_memo_changed)
+
+        return stack
+
+    def flush(self):
+        if not self.__pending_records:
+            return
+
+        self.__log.write("\n".join(self.__pending_records) + "\n")
+        self.__log.flush()
+
+        if self.fsync:
+            os.fsync(self.__log.fileno())
+
+        self.__logged_record_count += len(self.__pending_records)
+        self.__pending_records = []
+
+        if self.__logged_record_count >= self.snapshot_interval:
+            self.snapshot()
+
+    def snapshot(self):
+        """Writes the whole stack to a new snapshot and starts a new log."""
+        self.__pending_records = []
+        generation = self.__generation + 1
+        memos = []
+
+        for memo in self.__stack.memos:
+            memos.append({
+                "key": self.__journaled_memos[id(memo)].key,
+                "name": memo.name,
+                "tasks": [[task.description, task.is_completed]
+                          for _, task in memo._iter_id_task_tuples()]
+            })
+
+        self.__write_snapshot({"generation": generation, "memos": memos})
+
+        old_log_path = self.__log_path(self.__generation)
+        self.__log.close()
+        self.__log = open(self.__log_path(generation), "w",
+                          encoding="utf-8")
+        os.remove(old_log_path)
+        self.__generation = generation
+        self.__logged_record_count = 0
+
+        for memo in self.__stack.memos:
+            self.__journaled_memos[id(memo)].reset_task_keys(memo)
+
+    def close(self):
+        if self.__stack is None:
+            return
+
+        self.flush()
+        self.__log.close()
+        self.__stack._remove_listener(self.__on_stack_changed)
+
+        for journaled_memo in self.__journaled_memos.values():
+            journaled_memo.memo._remove_listener(self.__on_memo_changed)
+
+        self.__stack = None
+        self.__journaled_memos = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __on_stack_changed(self, stack, change, memo):
+        if change == "push":
+            journaled_memo = self.__journaled_memos.get(id(memo))
+
+            if journaled_memo is not None:
+                self.__append_record(["push", journaled_memo.key])
+                return
+
+            journaled_memo = self.__track_memo(memo, self.__next_memo_key)
+            journaled_memo.reset_task_keys(memo)
+            memo._add_listener(self.__on_memo_changed)
+            self.__append_record(["push", journaled_memo.key, memo.name,
+                                  [[task.description, task.is_completed]
+                                   for _, task
+                                   in memo._iter_id_task_tuples()]])
+        elif change == "pop":
+            journaled_memo = self.__journaled_memos[id(memo)]
+            self.__append_record(["pop", journaled_memo.key])
+
+            if memo not in stack.memos:
+                memo._remove_listener(self.__on_memo_changed)
+                del self.__journaled_memos[id(memo)]
+
+    def __on_memo_changed(self, memo, change, argument):
+        journaled_memo = self.__journaled_memos[id(memo)]
+
+        if change == "add":
+            first_task_key = journaled_memo.next_task_key
+            self.__append_record(["add", journaled_memo.key, first_task_key,
+                                  journaled_memo.add_tasks(argument)])
+        elif change == "remove":
+            self.__append_record(["remove", journaled_memo.key,
+                                  journaled_memo.remove_tasks(argument)])
+        elif change == "completion":
+            self.__append_record(["completion", journaled_memo.key,
+                                  journaled_memo.task_keys[id(argument)],
+                                  argument.is_completed])
+        elif change == "description":
+            task = argument[0]
+            self.__append_record(["description", journaled_memo.key,
+                                  journaled_memo.task_keys[id(task)],
+                                  task.description])
+
+    def __append_record(self, record):
+        self.__pending_records.append(json.dumps(record))
+
+        if len(self.__pending_records) >= self.batch_size:
+            self.flush()
+
+    def __track_memo(self, memo, key):
+        journaled_memo = _JournaledMemo(memo, key)
+        self.__journaled_memos[id(memo)] = journaled_memo
+        self.__next_memo_key = max(self.__next_memo_key, key + 1)
+
+        return journaled_memo
+
+    def __load_snapshot(self, stack):
+        memos_by_key = {}
+        snapshot_path = os.path.join(self.directory,
+                                     self.__snapshot_file_name)
+
+        if not os.path.exists(snapshot_path):
+            return memos_by_key
+
+        with open(snapshot_path, encoding="utf-8") as snapshot_file:
+            snapshot = json.load(snapshot_file)
+
+        self.__generation = snapshot["generation"]
+
+        for memo_snapshot in snapshot["memos"]:
+            memo = memos_by_key.get(memo_snapshot["key"])
+
+            if memo is None:
+                memo = Memo(memo_snapshot["name"])
+                memo.add_tasks(Task._create_all(memo_snapshot["tasks"]))
+                memos_by_key[memo_snapshot["key"]] = memo
+                self.__track_memo(memo, memo_snapshot["key"]) \
+                    .reset_task_keys(memo)
+
+            stack.push(memo)
+
+        return memos_by_key
+
+    def __replay_log(self, stack, memos_by_key):
+        log_path = self.__log_path(self.__generation)
+
+        if not os.path.exists(log_path):
+            return
+
+        with open(log_path, "rb") as log_file:
+            content = log_file.read()
+
+        # A crash while writing can leave an incomplete last record, which
+        # was never acknowledged and is dropped.
+        complete_length = content.rfind(b"\n") + 1
+
+        if complete_length < len(content):
+            with open(log_path, "r+b") as log_file:
+                log_file.truncate(complete_length)
+
+        tasks_by_key = {}
+
+        for line in content[:complete_length].splitlines():
+            record = json.loads(line.decode("utf-8"))
+            self.__replay_record(record, stack, memos_by_key, tasks_by_key)
+            self.__logged_record_count += 1
+
+        for memo_key, memo in memos_by_key.items():
+            journaled_memo = self.__journaled_memos.get(id(memo))
+
+            if journaled_memo is not None:
+                journaled_memo.replace_task_keys(tasks_by_key.get(memo_key))
+
+    def __replay_record(self, record, stack, memos_by_key, tasks_by_key):
+        change, memo_key = record[0], record[1]
+
+        if change == "push":
+            memo = memos_by_key.get(memo_key)
+
+            if memo is None:
+                memo = Memo(record[2])
+                tasks = Task._create_all(record[3])
+                memo.add_tasks(tasks)
+                memos_by_key[memo_key] = memo
+                tasks_by_key[memo_key] = dict(enumerate(tasks))
+                self.__track_memo(memo, memo_key).next_task_key = len(tasks)
+
+            stack.push(memo)
+            return
+
+        memo = memos_by_key[memo_key]
+        journaled_memo = self.__journaled_memos[id(memo)]
+
+        if memo_key not in tasks_by_key:
+            tasks_by_key[memo_key] = journaled_memo.tasks_by_key(memo)
+
+        memo_tasks = tasks_by_key[memo_key]
+
+        if change == "pop":
+            # The log holds the pops as they happened, which a journal of
+            # an earlier version may have made of memos with open tasks.
+            stack._pop_if_top(memo, force=True)
+
+            if memo not in stack.memos:
+                del self.__journaled_memos[id(memo)]
+        elif change == "add":
+            tasks = Task._create_all(record[3])
+            memo.add_tasks(tasks)
+
+            for task_key, task in enumerate(tasks, record[2]):
+                memo_tasks[task_key] = task
+
+            journaled_memo.next_task_key = record[2] + len(tasks)
+        elif change == "remove":
+            memo.remove_tasks([memo_tasks.pop(task_key)
+                               for task_key in record[2]])
+        elif change == "completion":
+            memo_tasks[record[2]].is_completed = record[3]
+        elif change == "description":
+            memo_tasks[record[2]].description = record[3]
+
+    def __write_snapshot(self, snapshot):
+        snapshot_path = os.path.join(self.directory,
+                                     self.__snapshot_file_name)
+        temporary_path = snapshot_path + ".tmp"
+
+        with open(temporary_path, "w", encoding="utf-8") as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+
+        os.replace(temporary_path, snapshot_path)
+
+    def __remove_stale_logs(self):
+        current_log_name = self.__log_file_template.format(self.__generation)
+
+        for file_name in os.listdir(self.directory):
+            if file_name.startswith("journal-") \
+                    and file_name.endswith(".log") \
+                    and file_name != current_log_name:
+                os.remove(os.path.join(self.directory, file_name))
+
+    def __log_path(self, generation):
+        return os.path.join(self.directory,
+                            self.__log_file_template.format(generation))
+
+
+class _JournaledMemo:
+    """Journal keys of a memo and of its tasks.
+
+    Task ids shift when tasks are removed, so the journal refers to tasks by
+    keys which stay the same as long as the task belongs to the memo.
+    """
+
+    __slots__ = ("memo", "key", "task_keys", "next_task_key")
+
+    def __init__(self, memo, key):
+        self.memo = memo
+        self.key = key
+        self.task_keys = {}
+        self.next_task_key = 0
+
+    def add_tasks(self, tasks):
+        descriptions = []
+
+        for task in tasks:
+            self.task_keys[id(task)] = self.next_task_key
+            self.next_task_key += 1
+            descriptions.append([task.description, task.is_completed])
+
+        return descriptions
+
+    def remove_tasks(self, tasks):
+        return [self.task_keys.pop(id(task)) for task in tasks]
+
+    def reset_task_keys(self, memo):
+        self.task_keys = {id(task): task_id - 1
+                          for task_id, task in memo._iter_id_task_tuples()}
+        self.next_task_key = len(self.task_keys)
+
+    def replace_task_keys(self, tasks_by_key):
+        if tasks_by_key is not None:
+            self.task_keys = {id(task): task_key
+                              for task_key, task in tasks_by_key.items()}
+
+    def tasks_by_key(self, memo):
+        return {task_id - 1: task
+                for task_id, task in memo._iter_id_task_tuples()}
+
+
+class MemoSnapshot:
+    """Memory-mapped binary snapshot of a memo stack.
+
+    The file starts with a header and a table of the memos, followed by
+    fixed-size task records and a heap with the UTF-8 encoded names and
+    descriptions. Opening a snapshot only reads the memo table, the tasks
+    are read from the mapped file when they are asked for. Completing a
+    task writes its record in place. Adding or removing tasks loads the
+    memo into memory first, and such changes are only kept on disk by
+    writing a new snapshot.
+    """
+
+    __header = struct.Struct("<8sII")
+    __memo_entry = struct.Struct("<QQQQQ")
+    __task_record = struct.Struct("<QIB3x")
+    __magic = b"PYMEMOS\0"
+    __format_version = 1
+    __completion_offset = 12
+
+    def __init__(self, path):
+        self.path = path
+        self.__file = None
+        self.__map = None
+        self.__writable = False
+        self.__records_offset = 0
+
+    @staticmethod
+    def write(memo_stack, path):
+        memos = memo_stack.memos
+        header = MemoSnapshot.__header
+        memo_entry = MemoSnapshot.__memo_entry
+        task_record = MemoSnapshot.__task_record
+        record_count = sum(memo._get_number_of_task() for memo in memos)
+        records_offset = header.size + memo_entry.size * len(memos)
+        heap_offset = records_offset + task_record.size * record_count
+
+        memo_entries = []
+        records = []
+        heap = []
+        heap_size = 0
+
+        for memo in memos:
+            name = memo.name.encode("utf-8")
+            completed_count, task_count = memo.progress()
+            memo_entries.append(memo_entry.pack(
+                heap_offset + heap_size, len(name), len(records), task_count,
+                task_count - completed_count))
+            heap.append(name)
+            heap_size += len(name)
+
+            for _, task in memo._iter_id_task_tuples():
+                description = task.description.encode("utf-8")
+                records.append(task_record.pack(
+                    heap_offset + heap_size, len(description),
+                    task.is_completed))
+                heap.append(description)
+                heap_size += len(description)
+
+        temporary_path = path + ".tmp"
+
+        with open(temporary_path, "wb") as snapshot_file:
+            snapshot_file.write(header.pack(MemoSnapshot.__magic,
+                                            MemoSnapshot.__format_version,
+                                            len(memos)))
+            snapshot_file.write(b"".join(memo_entries))
+            snapshot_file.write(b"".join(records))
+            snapshot_file.write(b"".join(heap))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+
+        os.replace(temporary_path, path)
+
+    def open(self):
+        """Maps the snapshot and returns its memos on a new MemoStack.
+
+        The file is mapped read-only, so snapshots without write permission
+        can be read. It is mapped writable on the first completion change.
+        Raises ValueError if the file is no memo snapshot or is truncated.
+        """
+        self.__file = open(self.path, "rb")
+
+        try:
+            self.__map = self.__map_file(mmap.ACCESS_READ)
+            memo_count = self.__read_header()
+            self.__records_offset = self.__header.size \
+                + self.__memo_entry.size * memo_count
+            memo_entries = [self.__memo_entry.unpack_from(
+                self.__map, self.__memo_entry_offset(memo_index))
+                for memo_index in range(memo_count)]
+            self.__check_extent(memo_entries)
+        except Exception:
+            self.close()
+            raise
+
+        memo_stack = MemoStack()
+
+        for memo_index, memo_entry in enumerate(memo_entries):
+            name_offset, name_length, first_record, task_count, _ = \
+                memo_entry
+            name = self.__read_text(name_offset, name_length)
+            memo_stack.push(MappedMemo(self, memo_index, name, first_record,
+                                       task_count))
+
+        return memo_stack
+
+    def __map_file(self, access):
+        # mmap refuses empty files with a message that names no file.
+        if os.fstat(self.__file.fileno()).st_size < self.__header.size:
+            raise ValueError("'{0}' is no memo snapshot.".format(self.path))
+
+        return mmap.mmap(self.__file.fileno(), 0, access=access)
+
+    def __read_header(self):
+        magic, format_version, memo_count = \
+            self.__header.unpack_from(self.__map, 0)
+
+        if magic != self.__magic or format_version != self.__format_version:
+            raise ValueError("'{0}' is no memo snapshot.".format(self.path))
+
+        if self.__header.size + self.__memo_entry.size * memo_count \
+                > len(self.__map):
+            raise self.__truncated()
+
+        return memo_count
+
+    def __check_extent(self, memo_entries):
+        """Checks that the file holds all records and the end of the heap.
+
+        Records and heap are written in order, so the text of the last
+        record is the end of the heap, and the check is of constant cost
+        per memo.
+        """
+        file_size = len(self.__map)
+        record_count = 0
+
+        for name_offset, name_length, first_record, task_count, _ \
+                in memo_entries:
+            if name_offset + name_length > file_size:
+                raise self.__truncated()
+
+            record_count = max(record_count, first_record + task_count)
+
+        if self.__record_offset(record_count) > file_size:
+            raise self.__truncated()
+
+        if record_count > 0:
+            description_offset, description_length, _ = \
+                self._read_task(record_count - 1)
+
+            if description_offset + description_length > file_size:
+                raise self.__truncated()
+
+    def __truncated(self):
+        return ValueError("The memo snapshot '{0}' is truncated.".format(
+            self.path))
+
+    def flush(self):
+        if self.__map is not None:
+            self.__map.flush()
+
+    def close(self):
+        if self.__map is not None:
+            self.__map.close()
+            self.__map = None
+            self.__writable = False
+
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _count_open_tasks(self, memo_index):
+        return self.__memo_entry.unpack_from(
+            self.__get_map(), self.__memo_entry_offset(memo_index))[4]
+
+    def _read_task(self, record):
+        description_offset, description_length, is_completed = \
+            self.__task_record.unpack_from(self.__get_map(),
+                                           self.__record_offset(record))
+        return description_offset, description_length, bool(is_completed)
+
+    def _read_description(self, record):
+        description_offset, description_length, _ = self._read_task(record)
+        return self.__read_text(description_offset, description_length)
+
+    def _write_completion(self, memo_index, record, is_completed):
+        completion_offset = self.__record_offset(record) \
+            + self.__completion_offset
+
+        if bool(self.__get_map()[completion_offset]) == is_completed:
+            return
+
+        self.__make_writable()
+        self.__map[completion_offset] = int(is_completed)
+        open_task_count = self._count_open_tasks(memo_index) \
+            + (-1 if is_completed else 1)
+        struct.pack_into("<Q", self.__map,
+                         self.__memo_entry_offset(memo_index)
+                         + self.__memo_entry.size - 8,
+                         open_task_count)
+
+    def __read_text(self, offset, length):
+        return self.__get_map()[offset:offset + length].decode("utf-8")
+
+    def __get_map(self):
+        if self.__map is None:
+            raise ValueError("The memo snapshot '{0}' is closed.".format(
+                self.path))
+
+        return self.__map
+
+    def __make_writable(self):
+        if self.__writable:
+            return
+
+        # Raises for a snapshot without write permission, before anything
+        # is changed.
+        writable_file = open(self.path, "r+b")
+        self.__map.close()
+        self.__file.close()
+        self.__file = writable_file
+        self.__map = self.__map_file(mmap.ACCESS_WRITE)
+        self.__writable = True
+
+    def __memo_entry_offset(self, memo_index):
+        return self.__header.size + self.__memo_entry.size * memo_index
+
+    def __record_offset(self, record):
+        return self.__records_offset + self.__task_record.size * record
+
+
+class MappedMemo(Memo):
+    """Memo whose tasks are read from a MemoSnapshot when needed.
+
+    Tasks are handed out as views on their records, which write completion
+    changes through to the snapshot. The first change that adds or removes
+    tasks loads all of them into memory, after which the memo behaves like
+    any other memo.
+    """
+
+    __slots__ = ("__snapshot", "__memo_index", "__first_record",
+                 "__task_count", "__task_views")
+
+    def __init__(self, snapshot, memo_index, name, first_record, task_count):
+        Memo.__init__(self, name)
+        self.__snapshot = snapshot
+        self.__memo_index = memo_index
+        self.__first_record = first_record
+        self.__task_count = task_count
+        self.__task_views = {}
+
+    def add_task(self, task):
+        self.__load_tasks()
+        Memo.add_task(self, task)
+
+    def add_tasks(self, tasks):
+        self.__load_tasks()
+        Memo.add_tasks(self, tasks)
+
+    def remove_task(self, task):
+        self.__load_tasks()
+        Memo.remove_task(self, task)
+
+    def remove_tasks(self, tasks):
+        self.__load_tasks()
+        Memo.remove_tasks(self, tasks)
+
+    def complete_task(self, task_id):
+        if self.__snapshot is None:
+            # The loaded tasks are still views, which write the completion
+            # through to their records.
+            self.get_task(task_id).complete()
+        elif 0 < task_id <= self.__task_count:
+            self.__get_task_view(task_id).complete()
+        else:
+            raise InvalidTaskId(task_id)
+
+    def complete_tasks(self, task_ids):
+        # Completing the tasks one by one keeps the task records of the
+        # snapshot up to date, even after the memo was loaded into memory.
+        task_ids = list(task_ids)
+        task_count = self._get_number_of_task()
+
+        for task_id in task_ids:
+            if not 0 < task_id <= task_count:
+                raise InvalidTaskId(task_id)
+
+        for task_id in task_ids:
+            self.complete_task(task_id)
+
+    def list_id_task_tuples(self):
+        if self.__snapshot is None:
+            return Memo.list_id_task_tuples(self)
+
+        return list(self._iter_id_task_tuples())
+
+    def _iter_id_task_tuples(self, first_id=1, last_id=None, completed=None):
+        if self.__snapshot is None:
+            return Memo._iter_id_task_tuples(self, first_id, last_id,
+                                             completed)
+
+        if last_id is None or last_id > self.__task_count:
+            last_id = self.__task_count
+
+        # The snapshot keeps no index of the open tasks, so they are found
+        # by reading the task records one by one.
+        return ((task_id, task_view) for task_id, task_view
+                in ((task_id, self.__get_task_view(task_id))
+                    for task_id in range(max(first_id, 1), last_id + 1))
+                if completed is None or task_view.is_completed == completed)
+
+    def _get_number_of_task(self):
+        if self.__snapshot is None:
+            return Memo._get_number_of_task(self)
+
+        return self.__task_count
+
+    def get_task(self, task_id):
+        if self.__snapshot is None:
+            return Memo.get_task(self, task_id)
+
+        if 0 < task_id <= self.__task_count:
+            return self.__get_task_view(task_id)
+        else:
+            raise InvalidTaskId(task_id)
+
+    def is_completed(self):
+        if self.__snapshot is None:
+            return Memo.is_completed(self)
+
+        return self.__snapshot._count_open_tasks(self.__memo_index) == 0
+
+    def progress(self):
+        if self.__snapshot is None:
+            return Memo.progress(self)
+
+        open_task_count = self.__snapshot._count_open_tasks(
+            self.__memo_index)
+        return self.__task_count - open_task_count, self.__task_count
+
+    def _on_task_completion_changed(self, task, is_completed):
+        if self.__snapshot is None:
+            Memo._on_task_completion_changed(self, task, is_completed)
+        else:
+            with self.lock:
+                self._notify_listeners("completion", task)
+
+    def __get_task_view(self, task_id):
+        with self.lock:
+            task_view = self.__task_views.get(task_id)
+
+            if task_view is None:
+                task_view = _MappedTask(self.__snapshot, self.__memo_index,
+                                        self.__first_record + task_id - 1)
+                task_view._attach_to(self)
+                self.__task_views[task_id] = task_view
+
+            return task_view
+
+    def __load_tasks(self):
+        with self.lock:
+            if self.__snapshot is None:
+                return
+
+            tasks = [task for _, task in self._iter_id_task_tuples()]
+
+            for task in tasks:
+                task._detach_from(self)
+
+            self.__snapshot = None
+            self.__task_views = {}
+            self._load_tasks(tasks)
+
+
+class _MappedTask(Task):
+    """Task view on a task record of a MemoSnapshot.
+
+    The description is read from the snapshot until it is changed, and
+    completion changes are written through to the record.
+    """
+
+    __slots__ = ("__snapshot", "__memo_index", "__record")
+
+    def __init__(self, snapshot, memo_index, record):
+        _, _, is_completed = snapshot._read_task(record)
+        Task.__init__(self, None)
+        Task.is_completed.fset(self, is_completed)
+        self.__snapshot = snapshot
+        self.__memo_index = memo_index
+        self.__record = record
+
+    @property
+    def description(self):
+        description = Task.description.fget(self)
+
+        if description is None:
+            description = self.__snapshot._read_description(self.__record)
+
+        return description
+
+    @description.setter
+    def description(self, description):
+        Task.description.fset(self, description)
+
+    @property
+    def is_completed(self):
+        return Task.is_completed.fget(self)
+
+    @is_completed.setter
+    def is_completed(self, is_completed):
+        self.__snapshot._write_completion(self.__memo_index, self.__record,
+                                          bool(is_completed))
+        Task.is_completed.fset(self, is_completed)
+
+
+class SqliteMemoStack:
+    """Memo stack stored in an SQLite database.
+
+    The memos and tasks live in indexed tables, so the stack does not have
+    to fit into memory and is queried instead of scanned. A database can
+    hold several stacks by name. Every change is committed on its own
+    unless it is made within transaction(). The database runs in WAL mode,
+    so other processes can read it while the stack is in use.
+
+    Listeners are told about pushed and popped memos like those of a
+    MemoStack, with the memo of the database, which is the same object as
+    long as it is on the stack. The memos report no changes, though.
+    """
+
+    _reports_memo_changes = False
+
+    def __init__(self, path, name="default"):
+        self.__database = _SqliteDatabase(path)
+        self.__memos = {}
+        self.__listeners = ()
+        self.__shared = {}
+
+        with self.__database.transaction() as connection:
+            connection.execute("INSERT OR IGNORE INTO stacks (name) "
+                               "VALUES (?)", (name,))
+            self.__stack_key = connection.execute(
+                "SELECT stack_key FROM stacks WHERE name = ?",
+                (name,)).fetchone()[0]
+
+    @property
+    def memos(self):
+        rows = self.__database.connection.execute(
+            "SELECT memo_key FROM memos WHERE stack_key = ? "
+            "ORDER BY position", (self.__stack_key,))
+        return [self.__get_memo(memo_key) for memo_key, in rows]
+
+    def push(self, memo):
+        """Stores a copy of the memo on top of the stack.
+
+        Changes to the stored memo are made through the memo returned by peek.
+        """
+        if memo is None:
+            return
+
+        with self.__database.transaction() as connection:
+            memo_key = connection.execute(
+                "INSERT INTO memos (stack_key, position, name) "
+                "SELECT ?, COALESCE(MAX(position), 0) + 1, ? FROM memos "
+                "WHERE stack_key = ?",
+                (self.__stack_key, memo.name, self.__stack_key)).lastrowid
+            stored_memo = self.__get_memo(memo_key)
+            stored_memo.add_tasks(Task._create_all(
+                (task.description, task.is_completed)
+                for _, task in memo._iter_id_task_tuples()))
+
+        self.__notify_listeners("push", stored_memo)
+
+    def pop(self):
+        """Removes the top memo and returns it as an in-memory Memo."""
+        with self.__database.transaction():
+            memo = self.peek()
+
+            if not memo.is_completed():
+                raise MemoNotCompleted(memo)
+
+            popped_memo = Memo(memo.name)
+            popped_memo.add_tasks(Task._create_all(
+                (task.description, task.is_completed)
+                for _, task in memo._iter_id_task_tuples()))
+            memo._delete()
+            del self.__memos[memo._get_key()]
+
+        self.__notify_listeners("pop", memo)
+        return popped_memo
+
+    def pop_if_completed(self):
+        """Pops the top memo if it is completed, otherwise returns None."""
+        with self.__database.transaction():
+            if self.is_empty() or not self.peek().is_completed():
+                return None
+
+            return self.pop()
+
+    def peek(self):
+        row = self.__database.connection.execute(
+            "SELECT memo_key FROM memos WHERE stack_key = ? "
+            "ORDER BY position DESC LIMIT 1", (self.__stack_key,)).fetchone()
+
+        if row is None:
+            raise MemoStackIsEmpty()
+
+        return self.__get_memo(row[0])
+
+    def is_empty(self):
+        return self.__database.connection.execute(
+            "SELECT NOT EXISTS (SELECT 1 FROM memos WHERE stack_key = ?)",
+            (self.__stack_key,)).fetchone()[0] == 1
+
+    def transaction(self):
+        """Groups all changes within the with statement into one commit.
+
+        If the changes are rolled back, the tasks handed out by the memos
+        of the database are detached from them, as they may not match the
+        database anymore. Asking the memos again loads them anew.
+        """
+        return self.__database.transaction()
+
+    def close(self):
+        self.__database.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _add_listener(self, listener):
+        """Registers a callable that is told about pushed and popped memos.
+
+        The listener is called with the stack, "push" or "pop" and the memo
+        of the database, once the change is made.
+        """
+        self.__listeners += (listener,)
+
+    def _remove_listener(self, listener):
+        self.__listeners = tuple(
+            registered_listener for registered_listener in self.__listeners
+            if registered_listener != listener)
+
+    def _get_shared(self, key, create):
+        """Returns the object kept with the stack under key, like MemoStack.
+
+        Like the connection, the stack is used by one thread only.
+        """
+        shared = self.__shared.get(key)
+
+        if shared is None:
+            shared = self.__shared[key] = create()
+
+        return shared
+
+    def __notify_listeners(self, change, memo):
+        for listener in self.__listeners:
+            listener(self, change, memo)
+
+    def __get_memo(self, memo_key):
+        memo = self.__memos.get(memo_key)
+
+        if memo is None:
+            memo = SqliteMemo(self.__database, memo_key)
+            self.__memos[memo_key] = memo
+
+        return memo
+
+
+class SqliteMemo:
+    """Memo stored in the database of a SqliteMemoStack.
+
+    The task counts are kept in the memo row, which makes is_completed and
+    progress single row lookups. The positions of the tasks are kept dense,
+    so a task id is looked up by its position in the index. Tasks are
+    loaded when asked for, and stay bound to their row as long as they are
+    referenced, so that completing them or changing their description is
+    written to the database.
+    """
+
+    def __init__(self, database, memo_key):
+        self.__database = database
+        self.__database._add_memo(self)
+        self.__memo_key = memo_key
+        self.__task_keys = weakref.WeakKeyDictionary()
+        self.__tasks = weakref.WeakValueDictionary()
+        self.__version = 0
+        self.__formatter = None
+
+    @property
+    def name(self):
+        return self.__query_memo("name")
+
+    @name.setter
+    def name(self, name):
+        with self.__database.transaction() as connection:
+            connection.execute("UPDATE memos SET name = ? WHERE memo_key = ?",
+                               (name, self.__memo_key))
+
+    def add_task(self, task):
+        self.add_tasks([task])
+
+    def add_tasks(self, tasks):
+        new_task_ids = set()
+        new_tasks = []
+
+        for task in tasks:
+            if task is not None and task not in self.__task_keys \
+                    and id(task) not in new_task_ids:
+                new_task_ids.add(id(task))
+                new_tasks.append(task)
+
+        if not new_tasks:
+            return
+
+        with self.__database.transaction() as connection:
+            first_task_key, first_position = connection.execute(
+                "SELECT (SELECT COALESCE(MAX(task_key), 0) + 1 FROM tasks), "
+                "COALESCE(MAX(position), 0) + 1 FROM tasks "
+                "WHERE memo_key = ?", (self.__memo_key,)).fetchone()
+            connection.executemany(
+                "INSERT INTO tasks (task_key, memo_key, position, "
+                "description, is_completed) VALUES (?, ?, ?, ?, ?)",
+                [(first_task_key + index, self.__memo_key,
+                  first_position + index, task.description,
+                  task.is_completed)
+                 for index, task in enumerate(new_tasks)])
+            self.__update_task_counts(connection, len(new_tasks), sum(
+                1 for task in new_tasks if not task.is_completed))
+
+        self.__version += 1
+
+        for task_key, task in enumerate(new_tasks, first_task_key):
+            self.__bind_task(task_key, task)
+
+    def remove_task(self, task):
+        self.remove_tasks([task])
+
+    def remove_tasks(self, tasks):
+        removed_task_ids = set()
+        removed_tasks = []
+
+        for task in tasks:
+            if task in self.__task_keys and id(task) not in removed_task_ids:
+                removed_task_ids.add(id(task))
+                removed_tasks.append(task)
+
+        if not removed_tasks:
+            return
+
+        with self.__database.transaction() as connection:
+            removed_task_keys = [self.__task_keys[task]
+                                 for task in removed_tasks]
+            removed_positions = self.__query_chunked(
+                connection, "SELECT position FROM tasks "
+                "WHERE task_key IN ({0})", removed_task_keys)
+            connection.executemany(
+                "DELETE FROM tasks WHERE task_key = ?",
+                [(task_key,) for task_key in removed_task_keys])
+            self.__close_gaps(connection, removed_positions)
+            self.__update_task_counts(connection, -len(removed_tasks), -sum(
+                1 for task in removed_tasks if not task.is_completed))
+
+        self.__version += 1
+
+        for task in removed_tasks:
+            del self.__tasks[self.__task_keys.pop(task)]
+            task._detach_from(self)
+
+    def complete_task(self, task_id):
+        task = self.__find_task(task_id)
+
+        if task is None:
+            raise InvalidTaskId(task_id)
+
+        task.complete()
+
+    def complete_tasks(self, task_ids):
+        task_ids = list(task_ids)
+        task_count = self._get_number_of_task()
+
+        for task_id in task_ids:
+            if not 0 < task_id <= task_count:
+                raise InvalidTaskId(task_id)
+
+        with self.__database.transaction() as connection:
+            unbound_task_keys = []
+
+            for task_key in self.__query_chunked(
+                    connection, "SELECT task_key FROM tasks "
+                    "WHERE memo_key = {0} AND position IN ({{0}})".format(
+                        self.__memo_key), set(task_ids)):
+                task = self.__tasks.get(task_key)
+
+                if task is not None:
+                    task.complete()
+                else:
+                    unbound_task_keys.append(task_key)
+
+            completed_count = connection.executemany(
+                "UPDATE tasks SET is_completed = 1 "
+                "WHERE task_key = ? AND is_completed = 0",
+                [(task_key,) for task_key in unbound_task_keys]).rowcount
+            self.__update_task_counts(connection, 0, -completed_count)
+
+    def id_task_tuples(self):
+        return MemoTaskView(self)
+
+    def list_id_task_tuples(self):
+        return list(self._iter_id_task_tuples())
+
+    def _iter_id_task_tuples(self, first_id=1, last_id=None, completed=None):
+        # The positions of the tasks are their ids, so the window is an
+        # index range.
+        query = "SELECT position, task_key, description, is_completed " \
+                "FROM tasks WHERE memo_key = ? AND position >= ?"
+        parameters = [self.__memo_key, first_id]
+
+        if last_id is not None:
+            query += " AND position <= ?"
+            parameters.append(last_id)
+
+        if completed is not None:
+            query += " AND is_completed = ?"
+            parameters.append(completed)
+
+        rows = self.__database.connection.execute(
+            query + " ORDER BY position", parameters)
+
+        for row in rows:
+            yield row[0], self.__get_task(*row[1:])
+
+    def next_open_task(self, after_id=0):
+        return next(self._iter_id_task_tuples(after_id + 1, completed=False),
+                    None)
+
+    def open_task_ids(self, limit=None):
+        return [task_id for task_id, _ in itertools.islice(
+            self._iter_id_task_tuples(completed=False), limit)]
+
+    def completed_task_ids(self, limit=None):
+        return [task_id for task_id, _ in itertools.islice(
+            self._iter_id_task_tuples(completed=True), limit)]
+
+    def count_open(self):
+        return self.__query_memo("open_task_count")
+
+    def _get_number_of_task(self):
+        return self.__query_memo("task_count")
+
+    def _get_version(self):
+        return self.__version, self.__database.connection.execute(
+            "PRAGMA data_version").fetchone()[0]
+
+    def _get_key(self):
+        return self.__memo_key
+
+    def get_task(self, task_id):
+        task = self.__find_task(task_id)
+
+        if task is None:
+            raise InvalidTaskId(task_id)
+
+        return task
+
+    def is_completed(self):
+        return self.__query_memo("open_task_count") == 0
+
+    def progress(self):
+        task_count, open_task_count = self.__database.connection.execute(
+            "SELECT task_count, open_task_count FROM memos "
+            "WHERE memo_key = ?", (self.__memo_key,)).fetchone()
+        return task_count - open_task_count, task_count
+
+    def _on_task_completion_changed(self, task, is_completed):
+        with self.__database.transaction() as connection:
+            connection.execute(
+                "UPDATE tasks SET is_completed = ? WHERE task_key = ?",
+                (is_completed, self.__task_keys[task]))
+            self.__update_task_counts(connection, 0,
+                                      -1 if is_completed else 1)
+
+    def _on_task_description_changed(self, task, previous_description):
+        with self.__database.transaction() as connection:
+            connection.execute(
+                "UPDATE tasks SET description = ? WHERE task_key = ?",
+                (task.description, self.__task_keys[task]))
+
+        self.__version += 1
+
+    def _delete(self):
+        with self.__database.transaction() as connection:
+            connection.execute("DELETE FROM tasks WHERE memo_key = ?",
+                               (self.__memo_key,))
+            connection.execute("DELETE FROM memos WHERE memo_key = ?",
+                               (self.__memo_key,))
+
+        for task in list(self.__tasks.values()):
+            task._detach_from(self)
+
+    def __str__(self):
+        if self.__formatter is None:
+            self.__formatter = MemoFormatter(self)
+
+        return self.__formatter.format()
+
+    def __find_task(self, task_id):
+        if task_id < 1:
+            return None
+
+        row = self.__database.connection.execute(
+            "SELECT task_key, description, is_completed FROM tasks "
+            "WHERE memo_key = ? AND position = ?",
+            (self.__memo_key, task_id)).fetchone()
+
+        return None if row is None else self.__get_task(*row)
+
+    def __get_task(self, task_key, description, is_completed):
+        task = self.__tasks.get(task_key)
+
+        if task is None:
+            task, = Task._create_all([(description, is_completed)])
+            self.__bind_task(task_key, task)
+
+        return task
+
+    def __bind_task(self, task_key, task):
+        self.__task_keys[task] = task_key
+        self.__tasks[task_key] = task
+        task._attach_to(self)
+
+    def __close_gaps(self, connection, removed_positions):
+        """Moves the tasks behind removed ones up, so positions stay ids.
+
+        The tasks between two removed positions move up by the number of
+        removed positions before them. Positions are unique, so the tasks
+        are moved to negative positions first and then flipped back.
+        """
+        removed_positions = sorted(removed_positions)
+        next_positions = removed_positions[1:] + [None]
+
+        for shift, (position, next_position) in enumerate(
+                zip(removed_positions, next_positions), 1):
+            connection.execute(
+                "UPDATE tasks SET position = ? - position "
+                "WHERE memo_key = ? AND position > ? "
+                "AND (? IS NULL OR position < ?)",
+                (shift, self.__memo_key, position, next_position,
+                 next_position))
+
+        connection.execute(
+            "UPDATE tasks SET position = -position "
+            "WHERE memo_key = ? AND position < 0", (self.__memo_key,))
+
+    @staticmethod
+    def __query_chunked(connection, query, values):
+        """Runs query for chunks of values and returns the first columns.
+
+        The query has a {0} for the list of parameters, which SQLite
+        limits to 999.
+        """
+        values = list(values)
+        results = []
+
+        for start in range(0, len(values), 500):
+            chunk = values[start:start + 500]
+            results.extend(value for value, in connection.execute(
+                query.format(", ".join("?" * len(chunk))), chunk))
+
+        return results
+
+    def _invalidate_tasks(self):
+        """Detaches all tasks handed out, i.e. after a rollback.
+
+        Their state may not match the database anymore, so the tasks are
+        loaded again when they are asked for.
+        """
+        for task in list(self.__tasks.values()):
+            task._detach_from(self)
+
+        self.__task_keys = weakref.WeakKeyDictionary()
+        self.__tasks = weakref.WeakValueDictionary()
+        self.__version += 1
+
+    def __update_task_counts(self, connection, task_count_change,
+                             open_task_count_change):
+        connection.execute(
+            "UPDATE memos SET task_count = task_count + ?, "
+            "open_task_count = open_task_count + ? WHERE memo_key = ?",
+            (task_count_change, open_task_count_change, self.__memo_key))
+
+    def __query_memo(self, column):
+        return self.__database.connection.execute(
+            "SELECT {0} FROM memos WHERE memo_key = ?".format(column),
+            (self.__memo_key,)).fetchone()[0]
+
+
+class _SqliteDatabase:
+    __schema = """
+        CREATE TABLE IF NOT EXISTS stacks (
+            stack_key INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS memos (
+            memo_key INTEGER PRIMARY KEY,
+            stack_key INTEGER NOT NULL REFERENCES stacks,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            task_count INTEGER NOT NULL DEFAULT 0,
+            open_task_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS memo_positions
+            ON memos (stack_key, position);
+        CREATE TABLE IF NOT EXISTS tasks (
+            task_key INTEGER PRIMARY KEY,
+            memo_key INTEGER NOT NULL REFERENCES memos,
+            position INTEGER NOT NULL,
+            description TEXT NOT NULL,
+            is_completed INTEGER NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS task_positions
+            ON tasks (memo_key, position);
+        CREATE INDEX IF NOT EXISTS task_completion
+            ON tasks (memo_key, is_completed);
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(self.__schema)
+        self.__transaction_depth = 0
+        self.__memos = weakref.WeakSet()
+
+    def _add_memo(self, memo):
+        """Registers a memo whose tasks are invalidated by a rollback."""
+        self.__memos.add(memo)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        if self.__transaction_depth == 0:
+            self.connection.execute("BEGIN IMMEDIATE")
+
+        self.__transaction_depth += 1
+
+        try:
+            yield self.connection
+        except BaseException:
+            self.__transaction_depth -= 1
+
+            if self.__transaction_depth == 0:
+                self.connection.execute("ROLLBACK")
+
+                for memo in list(self.__memos):
+                    memo._invalidate_tasks()
+
+            raise
+        else:
+            self.__transaction_depth -= 1
+
+            if self.__transaction_depth == 0:
+                self.connection.execute("COMMIT")
@@ -0,0 +1,870 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+from PyMemo import Memo
+from PyMemo import MemoChangeFeed
+from PyMemo import MemoConsole
+from PyMemo import MemoDescriptionPool
+from PyMemo import MemoFormatter
+from PyMemo import MemoScheduler
+from PyMemo import MemoSearchIndex
+from PyMemo import MemoStack
+from PyMemo import Task
+from PyMemoExchange import MemoCsv
+from PyMemoExchange import MemoJsonLines
+from PyMemoExchange import MemoMarkdown
+from PyMemoRegistry import MemoStackRegistry
+from PyMemoServer import MemoServer
+from PyMemoStorage import MemoJournal
+from PyMemoStorage import MemoSnapshot
+from PyMemoStorage import SqliteMemoStack
+
+
+def benchmark_bulk_operations(task_count, repeat=3):
+    print("Bulk task operations with {0} tasks "
+          "(best of {1}):".format(task_count, repeat))
+
+    _print_comparison("add", _best_time(_add_tasks_one_by_one, task_count,
+                                        repeat),
+                      _best_time(_add_tasks_in_bulk, task_count, repeat))
+    _print_comparison("complete",
+                      _best_time(_complete_tasks_one_by_one, task_count,
+                                 repeat),
+                      _best_time(_complete_tasks_in_bulk, task_count,
+                                 repeat))
+    _print_comparison("remove",
+                      _best_time(_remove_tasks_one_by_one, task_count,
+                                 repeat),
+                      _best_time(_remove_tasks_in_bulk, task_count, repeat))
+
+
+def benchmark_task_memory(task_count):
+    print("Memory usage with {0} tasks:".format(task_count))
+
+    plain_task_size = _traced_bytes(
+        lambda: [_PlainTask(description) for description
+                 in _create_descriptions(task_count)]) / task_count
+    task_size = _traced_bytes(
+        lambda: [Task(description) for description
+                 in _create_descriptions(task_count)]) / task_count
+    memo_size = _traced_bytes(
+        lambda: Memo("Benchmark Memo", _create_tasks(task_count))) \
+        / task_count
+
+    print("\tplain task object: {0:8.1f} bytes/task".format(plain_task_size))
+    print("\tTask:              {0:8.1f} bytes/task".format(task_size))
+    print("\tTask in Memo:      {0:8.1f} bytes/task".format(memo_size))
+
+    memo = Memo("Benchmark Memo", _create_tasks(task_count))
+    tuple_list_size = _traced_bytes(memo.list_id_task_tuples) / task_count
+    tuple_view_size = _traced_bytes(memo.id_task_tuples) / task_count
+
+    print("\tid task tuple list: {0:7.1f} bytes/task".format(
+        tuple_list_size))
+    print("\tid task tuple view: {0:7.1f} bytes/task".format(
+        tuple_view_size))
+
+
+def benchmark_journal(operation_count, batch_size=100):
+    print("Journal with {0} operations (batches of {1}):"
+          .format(operation_count, batch_size))
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal = MemoJournal(directory, batch_size=batch_size)
+        memo = Memo("Benchmark Memo")
+        journal.open().push(memo)
+        tasks = _create_tasks(operation_count // 2)
+
+        def run():
+            for task in tasks:
+                memo.add_task(task)
+
+            for task_id in range(1, len(tasks) + 1):
+                memo.complete_task(task_id)
+
+            journal.flush()
+
+        write_time = timeit.timeit(run, number=1)
+        journal.close()
+
+        reopened_journal = MemoJournal(directory)
+        replay_time = timeit.timeit(reopened_journal.open, number=1)
+        reopened_journal.close()
+
+    print("\twrite:  {0:10.0f} operations/s".format(
+        operation_count / write_time))
+    print("\treplay: {0:10.0f} operations/s".format(
+        operation_count / replay_time))
+
+
+def benchmark_snapshot(task_count):
+    print("Binary snapshot with {0} tasks:".format(task_count))
+    memo_stack = MemoStack()
+    memo_stack.push(Memo("Benchmark Memo", _create_tasks(task_count)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "benchmark.snapshot")
+        write_time = timeit.timeit(
+            lambda: MemoSnapshot.write(memo_stack, path), number=1)
+        snapshot = MemoSnapshot(path)
+
+        def open_and_read_last_task():
+            memo = snapshot.open().peek()
+            memo.get_task(task_count).description
+
+        open_time = timeit.timeit(open_and_read_last_task, number=1)
+        snapshot.close()
+
+    print("\twrite: {0:8.4f}s".format(write_time))
+    print("\topen:  {0:8.4f}s".format(open_time))
+
+
+def benchmark_sqlite(task_count):
+    print("SQLite memo stack with {0} tasks:".format(task_count))
+
+    with tempfile.TemporaryDirectory() as directory:
+        with SqliteMemoStack(os.path.join(directory, "memos.db")) \
+                as memo_stack:
+            memo_stack.push(Memo("Benchmark Memo"))
+            memo = memo_stack.peek()
+            add_time = timeit.timeit(
+                lambda: memo.add_tasks(_create_tasks(task_count)), number=1)
+            complete_time = timeit.timeit(
+                lambda: memo.complete_tasks(range(1, task_count + 1)),
+                number=1)
+            query_time = timeit.timeit(
+                lambda: memo_stack.peek().is_completed(), number=1000) / 1000
+
+    print("\tadd_tasks:      {0:8.4f}s".format(add_time))
+    print("\tcomplete_tasks: {0:8.4f}s".format(complete_time))
+    print("\tis_completed:   {0:8.6f}s".format(query_time))
+
+
+def benchmark_batch_console(command_count):
+    print("Console batch mode with {0} commands:".format(command_count))
+    task_count = command_count // 3
+    lines = ["m", "Benchmark Memo"]
+
+    for task_id in range(1, task_count + 1):
+        lines.extend(["t", "Task {0}".format(task_id),
+                      "c {0}".format(task_id)])
+
+    console = MemoConsole()
+    executed_count, _, elapsed_time = console.run_batch(lines,
+                                                        _DiscardedOutput())
+
+    print("\t{0:10.0f} commands/s".format(executed_count / elapsed_time))
+
+
+def benchmark_server(session_count, commands_per_session=10):
+    print("Server with {0} concurrent sessions:".format(session_count))
+    loop = asyncio.new_event_loop()
+    memo_stack = MemoStack()
+    memo_stack.push(Memo("Benchmark Memo"))
+    server = MemoServer(memo_stack)
+    address = loop.run_until_complete(server.start())
+    latencies = []
+
+    async def run_session(session):
+        reader, writer = await asyncio.open_connection(*address)
+
+        for command in range(commands_per_session):
+            start_time = time.perf_counter()
+            writer.write("t Task {0}.{1}\npop\n".format(session, command)
+                         .encode("utf-8"))
+            await reader.readline()
+            latencies.append(time.perf_counter() - start_time)
+
+        writer.write(b"q\n")
+        await reader.read()
+        writer.close()
+
+    async def run_sessions():
+        await asyncio.gather(*[run_session(session)
+                               for session in range(session_count)])
+
+    try:
+        elapsed_time = timeit.timeit(
+            lambda: loop.run_until_complete(run_sessions()), number=1)
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+
+    latencies.sort()
+    print("\t{0:10.0f} round trips/s".format(len(latencies) / elapsed_time))
+    print("\tp50: {0:8.4f}s  p99: {1:8.4f}s  max: {2:8.4f}s".format(
+        latencies[len(latencies) // 2], latencies[len(latencies) * 99 // 100],
+        latencies[-1]))
+
+
+def benchmark_threads(task_count, thread_counts=(1, 2, 4, 8)):
+    print("Thread pool with {0} tasks:".format(task_count))
+
+    for thread_count in thread_counts:
+        memos = [Memo("Benchmark Memo", _create_tasks(
+            task_count // thread_count)) for _ in range(thread_count)]
+        memo_stack = MemoStack()
+
+        def complete_tasks(memo):
+            for task_id in range(1, memo._get_number_of_task() + 1):
+                memo.complete_task(task_id)
+
+        def push_and_pop(memo):
+            # Every memo is pushed while incomplete, and all threads try to
+            # pop while they complete their tasks. Popping a memo which is
+            # not completed at that moment would be a race.
+            race_count = 0
+            memo_stack.push(memo)
+
+            for task_id in range(1, memo._get_number_of_task() + 1):
+                memo.complete_task(task_id)
+
+                if task_id % 100 == 0:
+                    popped_memo = memo_stack.pop_if_completed()
+
+                    if popped_memo is not None \
+                            and not popped_memo.is_completed():
+                        race_count += 1
+
+            return race_count
+
+        with concurrent.futures.ThreadPoolExecutor(thread_count) as pool:
+            complete_time = timeit.timeit(
+                lambda: list(pool.map(complete_tasks, memos)), number=1)
+
+            for memo in memos:
+                for task_id in range(1, memo._get_number_of_task() + 1):
+                    memo.get_task(task_id).is_completed = False
+
+            race_count = sum(pool.map(push_and_pop, memos))
+
+        print("\t{0} threads: {1:10.0f} completions/s, {2} incomplete memos "
+              "popped".format(thread_count, task_count / complete_time,
+                              race_count))
+
+
+def benchmark_registry(stack_count, shard_counts=(1, 2, 4),
+                       batch_size=1000):
+    print("Registry with {0} stacks (batches of {1}):".format(stack_count,
+                                                           batch_size))
+    keys = ["user-{0}".format(number) for number in range(stack_count)]
+
+    for shard_count in shard_counts:
+        with MemoStackRegistry(shard_count) as registry:
+            for first in range(0, stack_count, batch_size):
+                registry.execute([
+                    ("push", key, Memo(key, _create_tasks(2)))
+                    for key in keys[first:first + batch_size]])
+
+            single_time = timeit.timeit(
+                lambda: [registry.complete_task(key, 1)
+                         for key in keys[:batch_size]], number=1)
+            batch_time = timeit.timeit(
+                lambda: [registry.execute([
+                    ("complete_task", key, 2)
+                    for key in keys[first:first + batch_size]])
+                    for first in range(0, stack_count, batch_size)],
+                number=1)
+
+        print("\t{0} shards: single calls {1:10.0f}/s, batched {2:10.0f}/s"
+              .format(shard_count, min(batch_size, stack_count) / single_time,
+                      stack_count / batch_time))
+
+
+def benchmark_search(task_count, memo_count=10, repeat=1000):
+    print("Search index over {0} tasks in {1} memos:".format(task_count,
+                                                           memo_count))
+    memo_stack = MemoStack()
+    tasks = _create_tasks(task_count)
+
+    for first in range(0, task_count, task_count // memo_count):
+        memo_stack.push(Memo("Benchmark Memo", tasks[
+            first:first + task_count // memo_count]))
+
+    index = None
+
+    def build():
+        nonlocal index
+        index = MemoSearchIndex(memo_stack)
+
+    build_time = timeit.timeit(build, number=1)
+    print("\tbuild:         {0:8.4f}s".format(build_time))
+
+    # The first prefix query sorts the terms, which is not repeated. A word
+    # like 'task' matches every task, so the last query has to find the best
+    # of a million hits.
+    for query, query_repeat in (("4711", repeat), ("4711*", 1),
+                                ("4711*", repeat), ("task 4711", 3)):
+        query_time = timeit.timeit(lambda: index.search(query, limit=10),
+                                   number=query_repeat) / query_repeat
+        print("\t{0:<14} {1:8.6f}s".format("'{0}':".format(query),
+                                           query_time))
+
+    add_time = timeit.timeit(
+        lambda: memo_stack.peek().add_task(Task("Task added later")),
+        number=repeat) / repeat
+    print("\tadd_task:      {0:8.6f}s".format(add_time))
+
+
+class _DiscardedOutput:
+    def write(self, text):
+        pass
+
+
+class _PlainTask:
+    """Task layout without __slots__, as a reference for the memory usage."""
+
+    def __init__(self, description):
+        self.description = description
+        self.is_completed = False
+
+
+def benchmark_open_tasks(task_count, repeat=1000):
+    print("Open task queries on {0} tasks, nine in ten completed:".format(
+        task_count))
+    tasks = _create_tasks(task_count)
+    memo = Memo("Benchmark Memo", tasks)
+    memo.complete_tasks(range(1, task_count * 9 // 10 + 1))
+
+    def scan_for_open_task():
+        return next(task for task in tasks if not task.is_completed)
+
+    for name, query in (("scan of all tasks", scan_for_open_task),
+                        ("next_open_task", memo.next_open_task),
+                        ("first 10 open", lambda: memo.open_task_ids(10)),
+                        ("count_open", memo.count_open)):
+        query_time = timeit.timeit(query, number=repeat) / repeat
+        print("\t{0:<19} {1:8.6f}s".format(name + ":", query_time))
+
+
+def benchmark_exchange(task_count):
+    print("Import and export of {0} tasks:".format(task_count))
+    memo_stack = MemoStack()
+    memo_stack.push(Memo("Benchmark Memo", _create_tasks(task_count)))
+    memo_stack.peek().complete_tasks(range(1, task_count // 2 + 1))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, exchange in (("JSON Lines", MemoJsonLines),
+                               ("CSV", MemoCsv),
+                               ("Markdown", MemoMarkdown)):
+            path = os.path.join(directory, "benchmark.export")
+
+            with open(path, "w", encoding="utf-8", newline="") as stream:
+                write_time = timeit.timeit(
+                    lambda: exchange.write(memo_stack, stream), number=1)
+
+            line = "\t{0:<11} write: {1:10.0f} tasks/s".format(
+                name + ":", task_count / write_time)
+
+            if hasattr(exchange, "read"):
+                with open(path, encoding="utf-8", newline="") as stream:
+                    read_time = timeit.timeit(
+                        lambda: exchange.read(stream), number=1)
+
+                line += "  read: {0:10.0f} tasks/s".format(
+                    task_count / read_time)
+
+            print(line)
+
+
+def benchmark_change_feed(task_count, repeat=1000):
+    print("Change feed on {0} tasks:".format(task_count))
+    memo_stack = MemoStack()
+    memo = Memo("Benchmark Memo", _create_tasks(task_count))
+    memo_stack.push(memo)
+    feed = MemoChangeFeed(memo_stack)
+    deliveries = []
+    feed.subscribe(deliveries.append)
+
+    def toggle_task():
+        task = memo.get_task(1)
+        task.is_completed = not task.is_completed
+        feed.flush()
+
+    single_time = timeit.timeit(toggle_task, number=repeat) / repeat
+
+    def complete_all_in_batch():
+        with feed.batch():
+            memo.complete_tasks(range(1, task_count + 1))
+
+    del deliveries[:]
+    batch_time = timeit.timeit(complete_all_in_batch, number=1)
+    feed.close()
+
+    print("\tsingle change:   {0:8.6f}s".format(single_time))
+    print("\tbatch of {0} completions: {1:8.4f}s in {2} delivery".format(
+        task_count, batch_time, len(deliveries)))
+
+
+def benchmark_scheduler(memo_count):
+    print("Scheduler with {0} memos:".format(memo_count))
+    benchmark_random = random.Random(4711)
+    memos = [Memo("Benchmark Memo {0}".format(number))
+             for number in range(memo_count)]
+    priorities = [benchmark_random.randint(0, 1000) for _ in memos]
+    scheduler = MemoScheduler()
+
+    def schedule_all():
+        for memo, priority in zip(memos, priorities):
+            scheduler.schedule(memo, priority)
+
+    schedule_time = timeit.timeit(schedule_all, number=1)
+    benchmark_random.shuffle(priorities)
+    reschedule_time = timeit.timeit(schedule_all, number=1)
+    benchmark_random.shuffle(memos)
+    removed_memos = memos[:memo_count // 2]
+
+    def remove_half():
+        for memo in removed_memos:
+            scheduler.remove(memo)
+
+    remove_time = timeit.timeit(remove_half, number=1)
+    next_count = len(scheduler)
+
+    def take_all():
+        for _ in range(next_count):
+            scheduler.next()
+
+    next_time = timeit.timeit(take_all, number=1)
+
+    for name, elapsed_time, count in (
+            ("schedule", schedule_time, memo_count),
+            ("reschedule", reschedule_time, memo_count),
+            ("remove", remove_time, len(removed_memos)),
+            ("next", next_time, next_count)):
+        print("\t{0:<11} {1:10.0f} operations/s".format(
+            name + ":", count / elapsed_time if elapsed_time else 0))
+
+
+def benchmark_description_pool(task_count, template_count=100):
+    print("Descriptions of {0} tasks from {1} templates:".format(
+        task_count, template_count))
+
+    def push_memo_from_templates(memo_stack):
+        memo = Memo("Benchmark Memo")
+        memo_stack.push(memo)
+
+        for number in range(task_count):
+            # Concatenating creates a new string for every task, like
+            # reading the descriptions from a file does.
+            memo.add_task(Task("Template task number "
+                               + str(number % template_count)))
+
+    sizes = []
+
+    for use_pool in (False, True):
+        memo_stack = MemoStack()
+        pool = MemoDescriptionPool(memo_stack) if use_pool else None
+        elapsed_time = timeit.timeit(
+            lambda: push_memo_from_templates(memo_stack), number=1)
+        memo_stack = MemoStack()
+
+        if pool is not None:
+            pool.close()
+            pool = MemoDescriptionPool(memo_stack)
+
+        tracemalloc.start()
+        push_memo_from_templates(memo_stack)
+        sizes.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+        print("\t{0:<10} {1:8.1f} bytes/task {2:8.4f}s".format(
+            "pooled:" if use_pool else "unpooled:",
+            sizes[-1] / task_count, elapsed_time))
+
+    report = pool.report()
+    pool.close()
+    print("\tdedup ratio: {0:.1f}, {1} bytes saved, {2:.0%} less "
+          "memory".format(report["dedup_ratio"], report["bytes_saved"],
+                          1 - sizes[1] / sizes[0]))
+
+
+SUITE_TASK_COUNTS = (10, 1000, 100000, 1000000)
+# The committed results the suite is compared to with a bare --baseline.
+# Update it with --output when a change is meant to alter the numbers.
+SUITE_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "benchmark_baseline.json")
+
+
+def run_suite(task_counts=SUITE_TASK_COUNTS):
+    """Measures the core operations at every task count.
+
+    Returns one result per operation and task count, with the best time
+    per operation over several runs and the peak memory of a separate
+    traced run, which tracemalloc would otherwise slow down.
+    """
+    print("Core operations (best time per operation, peak memory):")
+    results = []
+
+    for task_count in task_counts:
+        # Small task counts are repeated more often, so their timings are
+        # not dominated by noise.
+        repeat = max(3, min(1000, 100000 // task_count))
+
+        for operation, benchmark in _suite_benchmarks:
+            timings = []
+
+            for _ in range(repeat):
+                run, operation_count = benchmark(task_count)
+                timings.append(timeit.timeit(run, number=1))
+
+            run, operation_count = benchmark(task_count)
+            tracemalloc.start()
+
+            try:
+                run()
+                peak_bytes = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+            results.append({
+                "operation": operation,
+                "task_count": task_count,
+                "seconds_per_operation": min(timings) / operation_count,
+                "peak_bytes": peak_bytes,
+            })
+            _print_suite_result(results[-1])
+
+    return results
+
+
+def write_suite_results(results, path):
+    with open(path, "w") as file:
+        json.dump({"python": platform.python_version(),
+                   "platform": _suite_platform(), "results": results},
+                  file, indent=2, sort_keys=True)
+
+
+def read_suite_results(path):
+    """Returns the results at path, or None if they were measured elsewhere.
+
+    Timings only compare on the Python version and platform they were
+    measured on, so results recorded with another one are left out.
+    """
+    with open(path) as file:
+        suite = json.load(file)
+
+    if suite.get("python") != platform.python_version() or \
+            suite.get("platform") != _suite_platform():
+        return None
+
+    return suite["results"]
+
+
+def compare_suite_results(results, baseline, threshold=0.25):
+    """Returns the results which are worse than their baseline.
+
+    A result regressed if its time per operation or its peak memory exceeds
+    the baseline result for the same operation and task count by more than
+    the threshold, a fraction of the baseline. Each regression is a tuple
+    of the operation, the task count, the measure, the baseline value and
+    the new value.
+    """
+    baseline_results = {(result["operation"], result["task_count"]): result
+                        for result in baseline}
+    regressions = []
+
+    for result in results:
+        baseline_result = baseline_results.get(
+            (result["operation"], result["task_count"]))
+
+        if baseline_result is None:
+            continue
+
+        for measure in ("seconds_per_operation", "peak_bytes"):
+            if result[measure] > baseline_result[measure] * (1 + threshold):
+                regressions.append((result["operation"],
+                                    result["task_count"], measure,
+                                    baseline_result[measure],
+                                    result[measure]))
+
+    return regressions
+
+
+def _suite_platform():
+    return "{0}-{1}".format(platform.system(), platform.machine())
+
+
+def _print_suite_result(result):
+    print("\t{0:<14} {1:>8} tasks: {2:12.9f}s/op {3:12.1f} KiB peak".format(
+        result["operation"], result["task_count"],
+        result["seconds_per_operation"], result["peak_bytes"] / 1024))
+
+
+def _suite_add_task(task_count):
+    return _add_tasks_one_by_one(task_count), task_count
+
+
+def _suite_remove_task(task_count):
+    return _remove_tasks_one_by_one(task_count), task_count
+
+
+def _suite_complete_task(task_count):
+    return _complete_tasks_one_by_one(task_count), task_count
+
+
+def _suite_is_completed(task_count):
+    memo = Memo("Benchmark Memo", _create_tasks(task_count))
+
+    def run():
+        for _ in range(task_count):
+            memo.is_completed()
+
+    return run, task_count
+
+
+def _suite_push(task_count):
+    # The stack does not mind holding the same memo many times, which keeps
+    # the memory of a million memos out of the measurement.
+    memo_stack = MemoStack()
+    memo = Memo("Benchmark Memo")
+
+    def run():
+        for _ in range(task_count):
+            memo_stack.push(memo)
+
+    return run, task_count
+
+
+def _suite_peek(task_count):
+    memo_stack = MemoStack()
+    memo_stack.push(Memo("Benchmark Memo"))
+
+    def run():
+        for _ in range(task_count):
+            memo_stack.peek()
+
+    return run, task_count
+
+
+def _suite_pop(task_count):
+    memo_stack = MemoStack()
+    memo = Memo("Benchmark Memo")
+
+    for _ in range(task_count):
+        memo_stack.push(memo)
+
+    def run():
+        for _ in range(task_count):
+            memo_stack.pop()
+
+    return run, task_count
+
+
+def _suite_format(task_count):
+    memo = Memo("Benchmark Memo", _create_tasks(task_count))
+
+    def run():
+        MemoFormatter(memo).format()
+
+    return run, 1
+
+
+def _suite_console(task_count):
+    console = MemoConsole()
+    console.execute("m Benchmark Memo")
+    lines = ["t Task {0}".format(task_id)
+             for task_id in range(1, task_count + 1)]
+
+    def run():
+        for line in lines:
+            console.execute(line)
+
+    return run, task_count
+
+
+_suite_benchmarks = (
+    ("add_task", _suite_add_task),
+    ("remove_task", _suite_remove_task),
+    ("complete_task", _suite_complete_task),
+    ("is_completed", _suite_is_completed),
+    ("push", _suite_push),
+    ("peek", _suite_peek),
+    ("pop", _suite_pop),
+    ("format", _suite_format),
+    ("console", _suite_console),
+)
+
+
+def _traced_bytes(create):
+    tracemalloc.start()
+
+    try:
+        created = create()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    del created
+    return size
+
+
+def _best_time(benchmark, task_count, repeat):
+    timings = []
+
+    for _ in range(repeat):
+        run = benchmark(task_count)
+        timings.append(timeit.timeit(run, number=1))
+
+    return min(timings)
+
+
+def _print_comparison(operation, loop_time, bulk_time):
+    print("\t{0:<10} loop: {1:8.4f}s  bulk: {2:8.4f}s  speedup: {3:6.1f}x"
+          .format(operation, loop_time, bulk_time, loop_time / bulk_time))
+
+
+def _create_descriptions(task_count):
+    return ["Task {0}".format(number) for number in range(1, task_count + 1)]
+
+
+def _create_tasks(task_count):
+    return [Task(description)
+            for description in _create_descriptions(task_count)]
+
+
+def _add_tasks_one_by_one(task_count):
+    tasks = _create_tasks(task_count)
+    memo = Memo("Benchmark Memo")
+
+    def run():
+        for task in tasks:
+            memo.add_task(task)
+
+    return run
+
+
+def _add_tasks_in_bulk(task_count):
+    tasks = _create_tasks(task_count)
+    memo = Memo("Benchmark Memo")
+
+    def run():
+        memo.add_tasks(tasks)
+
+    return run
+
+
+def _complete_tasks_one_by_one(task_count):
+    memo = Memo("Benchmark Memo", _create_tasks(task_count))
+
+    def run():
+        for task_id in range(1, task_count + 1):
+            memo.complete_task(task_id)
+
+    return run
+
+
+def _complete_tasks_in_bulk(task_count):
+    memo = Memo("Benchmark Memo", _create_tasks(task_count))
+
+    def run():
+        memo.complete_tasks(range(1, task_count + 1))
+
+    return run
+
+
+def _remove_tasks_one_by_one(task_count):
+    tasks = _create_tasks(task_count)
+    memo = Memo("Benchmark Memo", tasks)
+
+    def run():
+        for task in tasks:
+            memo.remove_task(task)
+
+    return run
+
+
+def _remove_tasks_in_bulk(task_count):
+    tasks = _create_tasks(task_count)
+    memo = Memo("Benchmark Memo", tasks)
+
+    def run():
+        memo.remove_tasks(tasks)
+
+    return run
+
+
+def _run_suite_command(arguments):
+    # The baseline is read first, as the output may replace it.
+    baseline = read_suite_results(arguments.baseline) \
+        if arguments.baseline else None
+
+    if arguments.baseline and baseline is None:
+        print("Not comparing to {0}: it was measured on another Python "
+              "version or platform.".format(arguments.baseline))
+
+    results = run_suite(arguments.task_counts)
+
+    if arguments.output:
+        write_suite_results(results, arguments.output)
+
+    if baseline is None:
+        return 0
+
+    regressions = compare_suite_results(results, baseline,
+                                        arguments.threshold)
+
+    for operation, task_count, measure, baseline_value, value in regressions:
+        print("Regression: {0} with {1} tasks, {2} {3:.6g} -> {4:.6g}"
+              .format(operation, task_count, measure, baseline_value, value))
+
+    return 1 if regressions else 0
+
+
+def _parse_arguments(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of PyMemo.")
+    parser.add_argument("task_count", nargs="?", type=int, default=100000,
+                        help="task count of the individual benchmarks")
+    parser.add_argument("--suite", action="store_true",
+                        help="run the benchmark suite of the core operations "
+                             "instead")
+    parser.add_argument("--task-counts", type=int, nargs="+",
+                        default=list(SUITE_TASK_COUNTS),
+                        help="task counts of the suite")
+    parser.add_argument("--output", metavar="PATH",
+                        help="write the suite results as JSON to PATH")
+    parser.add_argument("--baseline", metavar="PATH", nargs="?",
+                        const=SUITE_BASELINE_PATH,
+                        help="compare the suite results to the JSON results "
+                             "at PATH, measured on the same Python version "
+                             "and platform, and fail on regressions (PATH "
+                             "defaults to benchmark_baseline.json next to "
+                             "this file)")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="tolerated slowdown or memory growth against "
+                             "the baseline, as a fraction (default 0.25)")
+    return parser.parse_args(arguments)
+
+
+if __name__ == '__main__':
+    benchmark_arguments = _parse_arguments()
+
+    if benchmark_arguments.suite:
+        sys.exit(_run_suite_command(benchmark_arguments))
+
+    benchmark_task_count = benchmark_arguments.task_count
+    benchmark_bulk_operations(benchmark_task_count)
+    benchmark_task_memory(benchmark_task_count)
+    benchmark_journal(benchmark_task_count)
+    benchmark_snapshot(benchmark_task_count)
+    benchmark_sqlite(benchmark_task_count)
+    benchmark_batch_console(benchmark_task_count)
+    benchmark_server(min(benchmark_task_count, 1000))
+    benchmark_threads(benchmark_task_count)
+    benchmark_registry(benchmark_task_count)
+    benchmark_search(benchmark_task_count)
+    benchmark_open_tasks(benchmark_task_count)
+    benchmark_exchange(benchmark_task_count)
+    benchmark_change_feed(benchmark_task_count)
+    benchmark_scheduler(benchmark_task_count)
+    benchmark_description_pool(benchmark_task_count)
@@ -1,3 +1,4 @@
+import threading
 from unittest import TestCase
 from PyMemo import Memo
 from PyMemo import Task
@@ -10,16 +11,13 @@ class TestMemo(TestCase):
 
     def tearDown(self):
         del self.memo
-     
-    def test_fail():
-        self.fail()
-    
+
     def test_add_new_task(self):
         task = Task("Test Task")
 
-        memo_count_before = len(self.memo.__tasks)
+        memo_count_before = len(self.memo.id_task_tuples())
         self.memo.add_task(task)
-        memo_count_after = len(self.memo.__tasks)
+        memo_count_after = len(self.memo.id_task_tuples())
 
         self.assertEqual(memo_count_after, memo_count_before + 1)
 
@@ -27,16 +25,16 @@ class TestMemo(TestCase):
         task = Task("Test Task")
         self.memo.add_task(task)
 
-        memo_count_before = len(self.memo.__tasks)
+        memo_count_before = len(self.memo.id_task_tuples())
         self.memo.add_task(task)
-        memo_count_after = len(self.memo.__tasks)
+        memo_count_after = len(self.memo.id_task_tuples())
 
         self.assertEqual(memo_count_after, memo_count_before)
 
     def test_add_none_should_not_change_the_task_list(self):
-        memo_count_before = len(self.memo.__tasks)
+        memo_count_before = len(self.memo.id_task_tuples())
         self.memo.add_task(None)
-        memo_count_after = len(self.memo.__tasks)
+        memo_count_after = len(self.memo.id_task_tuples())
 
         self.assertEqual(memo_count_after, memo_count_before)
 
@@ -88,18 +86,18 @@ class TestMemo(TestCase):
 
         self.memo = Memo("Test Memo", [task])
 
-        task_count_before = len(self.memo.__tasks)
+        task_count_before = len(self.memo.id_task_tuples())
         self.memo.remove_task(task)
-        task_count_after = len(self.memo.__tasks)
+        task_count_after = len(self.memo.id_task_tuples())
 
         self.assertEqual(task_count_after, task_count_before - 1)
 
     def test_remove_non_existing_task(self):
         task = Task("Test Task")
 
-        task_count_before = len(self.memo.__tasks)
+        task_count_before = len(self.memo.id_task_tuples())
         self.memo.remove_task(task)
-        task_count_after = len(self.memo.__tasks)
+        task_count_after = len(self.memo.id_task_tuples())
 
         self.assertEqual(task_count_after, task_count_before)
 
@@ -181,6 +179,306 @@ class TestMemo(TestCase):
         with self.assertRaises(InvalidTaskId):
             self.memo.get_task(11)
 
+    def test_is_completed_after_completing_task_directly(self):
+        task = Task("Test Task")
+        self.memo.add_task(task)
+
+        task.complete()
+
+        self.assertTrue(self.memo.is_completed())
+
+    def test_is_completed_after_reopening_task_directly(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 3,
+                                                     "Test Task", True)
+
+        self.memo.get_task(2).is_completed = False
+
+        self.assertFalse(self.memo.is_completed())
+
+    def test_is_completed_after_removing_open_task(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 3,
+                                                     "Test Task", True)
+        open_task = Task("Open Test Task")
+        self.memo.add_task(open_task)
+
+        self.memo.remove_task(open_task)
+
+        self.assertTrue(self.memo.is_completed())
+
+    def test_removed_task_does_not_affect_memo_anymore(self):
+        task = Task("Test Task")
+        self.memo.add_task(task)
+        self.memo.add_task(Task("Other Test Task"))
+        self.memo.remove_task(task)
+
+        task.complete()
+
+        self.assertEqual((0, 1), self.memo.progress())
+
+    def test_progress(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 5,
+                                                     "Test Task")
+        self.memo.complete_task(2)
+        self.memo.complete_task(4)
+
+        self.assertEqual((2, 5), self.memo.progress())
+
+    def test_progress_with_empty_memo(self):
+        self.assertEqual((0, 0), self.memo.progress())
+
+    def test_add_existing_task_keeps_task_ids(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 3,
+                                                     "Test Task")
+        self.memo.add_task(self.memo.get_task(1))
+
+        self.assertEqual(["Test Task 1", "Test Task 2", "Test Task 3"],
+                         [task_tuple[1].description for task_tuple
+                          in self.memo.list_id_task_tuples()])
+
+    def test_create_memo_with_duplicate_tasks(self):
+        task = Task("Test Task")
+
+        self.memo = Memo("Test Memo", [task, None, task])
+
+        self.assertEqual([(1, task)], self.memo.list_id_task_tuples())
+
+    def test_remove_task_shifts_following_task_ids(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 5,
+                                                     "Test Task")
+        self.memo.remove_task(self.memo.get_task(2))
+        self.memo.remove_task(self.memo.get_task(3))
+
+        self.assertEqual("Test Task 3", self.memo.get_task(2).description)
+        self.assertEqual("Test Task 5", self.memo.get_task(3).description)
+        self.assertEqual(3, len(self.memo.list_id_task_tuples()))
+
+    def test_add_removed_task_again(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 3,
+                                                     "Test Task")
+        task = self.memo.get_task(1)
+        self.memo.remove_task(task)
+
+        self.memo.add_task(task)
+
+        self.assertIs(task, self.memo.get_task(3))
+        self.assertEqual((0, 3), self.memo.progress())
+
+    def test_add_tasks(self):
+        task = Task("Test Task")
+        self.memo.add_task(task)
+        new_task = Task("New Test Task")
+
+        self.memo.add_tasks([new_task, task, None, new_task])
+
+        self.assertEqual([(1, task), (2, new_task)],
+                         self.memo.list_id_task_tuples())
+        self.assertEqual((0, 2), self.memo.progress())
+
+    def test_add_tasks_keeps_their_order(self):
+        tasks = [Task("Test Task {0}".format(number))
+                 for number in range(1, 101)]
+
+        self.memo.add_tasks(tasks + tasks[::-1])
+
+        self.assertEqual(list(enumerate(tasks, 1)),
+                         self.memo.list_id_task_tuples())
+
+    def test_remove_tasks(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 5,
+                                                     "Test Task")
+        tasks = [self.memo.get_task(2), self.memo.get_task(4)]
+
+        self.memo.remove_tasks(tasks + [Task("Unknown Test Task")])
+
+        self.assertEqual(["Test Task 1", "Test Task 3", "Test Task 5"],
+                         [task_tuple[1].description for task_tuple
+                          in self.memo.list_id_task_tuples()])
+        self.assertEqual((0, 3), self.memo.progress())
+
+    def test_complete_tasks(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 5,
+                                                     "Test Task")
+
+        self.memo.complete_tasks(range(2, 6))
+
+        self.assertFalse(self.memo.get_task(1).is_completed)
+        self.assertEqual((4, 5), self.memo.progress())
+
+    def test_complete_tasks_with_invalid_id_completes_nothing(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 5,
+                                                     "Test Task")
+
+        with self.assertRaises(InvalidTaskId):
+            self.memo.complete_tasks([1, 2, 6])
+
+        self.assertEqual((0, 5), self.memo.progress())
+
+    def test_complete_tasks_updates_other_memos(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 2,
+                                                     "Test Task")
+        other_memo = Memo("Other Test Memo", [self.memo.get_task(1)])
+
+        self.memo.complete_tasks([1])
+
+        self.assertTrue(other_memo.is_completed())
+
+    def test_task_shared_between_memos(self):
+        task = Task("Test Task")
+        other_memo = Memo("Other Test Memo", [task])
+        third_memo = Memo("Third Test Memo", [task])
+        self.memo.add_task(task)
+        other_memo.remove_task(task)
+
+        task.complete()
+
+        self.assertTrue(self.memo.is_completed())
+        self.assertTrue(third_memo.is_completed())
+        self.assertEqual((0, 0), other_memo.progress())
+
+    def test_complete_task_updates_other_memos(self):
+        task = Task("Test Task")
+        other_memo = Memo("Other Test Memo", [task])
+        self.memo.add_task(task)
+
+        self.memo.complete_task(1)
+
+        self.assertTrue(other_memo.is_completed())
+
+    def test_concurrent_changes_of_shared_tasks(self):
+        tasks = [Task("Test Task " + str(number)) for number in range(200)]
+        memos = [Memo("Test Memo " + str(number), tasks)
+                 for number in range(4)]
+
+        def change_tasks(memo):
+            for _ in range(20):
+                memo.complete_tasks(range(1, len(tasks) + 1))
+
+                for task in tasks:
+                    task.is_completed = False
+
+                for task_id in range(1, len(tasks) + 1, 2):
+                    memo.complete_task(task_id)
+
+        threads = [threading.Thread(target=change_tasks, args=(memo,))
+                   for memo in memos]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        completed_task_count = sum(1 for task in tasks if task.is_completed)
+
+        for memo in memos:
+            self.assertEqual((completed_task_count, len(tasks)),
+                             memo.progress())
+
+    def test_id_task_tuples(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 5,
+                                                     "Test Task")
+        task_tuples = self.memo.id_task_tuples()
+
+        self.assertEqual(5, len(task_tuples))
+        self.assertEqual((2, self.memo.get_task(2)), task_tuples[1])
+        self.assertEqual((5, self.memo.get_task(5)), task_tuples[-1])
+        self.assertEqual(self.memo.list_id_task_tuples(), list(task_tuples))
+        self.assertEqual([2, 3], [task_id for task_id, _ in task_tuples[1:3]])
+        self.assertEqual([5, 3, 1],
+                         [task_id for task_id, _ in task_tuples[::-2]])
+
+        with self.assertRaises(IndexError):
+            task_tuples[5]
+
+    def test_id_task_tuples_reflect_changes(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 3,
+                                                     "Test Task")
+        task_tuples = self.memo.id_task_tuples()
+        first_tasks = task_tuples[:2]
+
+        self.memo.remove_task(self.memo.get_task(1))
+
+        self.assertEqual(2, len(task_tuples))
+        self.assertEqual("Test Task 2", task_tuples[0][1].description)
+        self.assertEqual(["Test Task 2", "Test Task 3"],
+                         [task.description for _, task in first_tasks])
+
+    def test_open_and_completed_task_ids(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 6,
+                                                     "Test Task")
+
+        self.memo.complete_tasks([1, 2, 5])
+
+        self.assertEqual([3, 4, 6], self.memo.open_task_ids())
+        self.assertEqual([3, 4], self.memo.open_task_ids(limit=2))
+        self.assertEqual([1, 2, 5], self.memo.completed_task_ids())
+        self.assertEqual(3, self.memo.count_open())
+
+    def test_next_open_task(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 3,
+                                                     "Test Task")
+
+        self.memo.complete_task(1)
+
+        self.assertEqual((2, self.memo.get_task(2)),
+                         self.memo.next_open_task())
+        self.assertEqual((3, self.memo.get_task(3)),
+                         self.memo.next_open_task(after_id=2))
+
+        self.memo.complete_tasks([2, 3])
+
+        self.assertIsNone(self.memo.next_open_task())
+
+        self.memo.get_task(1).is_completed = False
+
+        self.assertEqual(1, self.memo.next_open_task()[0])
+
+    def test_open_task_ids_after_removing_task(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 4,
+                                                     "Test Task")
+        self.memo.complete_task(3)
+
+        self.memo.remove_task(self.memo.get_task(2))
+
+        self.assertEqual([1, 3], self.memo.open_task_ids())
+        self.assertEqual([2], self.memo.completed_task_ids())
+        self.assertEqual((1, 3), self.memo.progress())
+
+    def test_open_tasks_while_tasks_are_removed(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 40,
+                                                     "Test Task")
+        tasks = [task for _, task in self.memo.list_id_task_tuples()]
+        id_task_tuples = self.memo._iter_id_task_tuples(completed=False)
+        first_tasks = [next(id_task_tuples)[1] for _ in range(16)]
+
+        # The next batch is looked up after the task list was compacted.
+        self.memo.remove_tasks(tasks[:5])
+        self.memo.get_task(1)
+
+        self.assertEqual(tasks[:16], first_tasks)
+        self.assertEqual(list(enumerate(tasks[16:], 12)),
+                         list(id_task_tuples))
+
+    def test_open_task_ids_of_many_tasks(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 10000,
+                                                     "Test Task")
+        self.memo.complete_tasks(range(1, 10001))
+        self.memo.get_task(9000).is_completed = False
+        self.memo.get_task(70).is_completed = False
+
+        self.assertEqual([70, 9000], self.memo.open_task_ids())
+        self.assertEqual(9000, self.memo.next_open_task(after_id=70)[0])
+
+    def test_open_task_ids_after_completion_through_other_memo(self):
+        self.memo = TestMemo.prepare_memo_with_tasks("Test Memo", 2,
+                                                     "Test Task")
+        other_memo = Memo("Other Test Memo", [self.memo.get_task(2)])
+
+        other_memo.complete_task(1)
+
+        self.assertEqual([1], self.memo.open_task_ids())
+        self.assertEqual([], other_memo.open_task_ids())
+
     @staticmethod
     def prepare_memo_with_tasks(memo_label, number_of_tasks, task_label,
                                 complete_tasks=False):
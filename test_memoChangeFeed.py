@@ -0,0 +1,167 @@
+import threading
+from unittest import TestCase
+
+from PyMemo import Memo
+from PyMemo import MemoChangeFeed
+from PyMemo import MemoStack
+from PyMemo import Task
+
+
+class TestMemoChangeFeed(TestCase):
+    def setUp(self):
+        self.memo_stack = MemoStack()
+        self.memo = Memo("Test Memo", [Task("Test Task 1"),
+                                       Task("Test Task 2")])
+        self.memo_stack.push(self.memo)
+        self.feed = MemoChangeFeed(self.memo_stack)
+        self.deliveries = []
+        self.feed.subscribe(self.deliveries.append)
+
+    def tearDown(self):
+        self.feed.close()
+
+    def delivered_changes(self):
+        return [[(change.kind, change.memo, change.tasks)
+                 for change in changes] for changes in self.deliveries]
+
+    def test_changes_are_delivered_in_order(self):
+        memo = Memo("Other Test Memo")
+        task = Task("Test Task 3")
+
+        self.memo.add_task(task)
+        self.memo.complete_task(3)
+        self.memo.remove_task(task)
+        self.memo_stack.push(memo)
+        self.feed.flush()
+
+        self.assertEqual([("add", self.memo, (task,)),
+                          ("completion", self.memo, (task,)),
+                          ("remove", self.memo, (task,)),
+                          ("push", memo, ())],
+                         [change for changes in self.delivered_changes()
+                          for change in changes])
+
+    def test_subscribers_are_called_outside_of_locks(self):
+        blocked = []
+
+        def use_stack_from_other_thread(changes):
+            thread = threading.Thread(
+                target=self.memo_stack.pop_if_completed)
+            thread.start()
+            thread.join(5)
+            blocked.append(thread.is_alive())
+
+        self.feed.subscribe(use_stack_from_other_thread,
+                            kinds=["completion"])
+        self.memo.complete_task(1)
+        self.feed.flush()
+
+        self.assertEqual([False], blocked)
+
+    def test_changes_of_popped_memos_are_not_delivered(self):
+        self.memo.complete_tasks([1, 2])
+        self.memo_stack.pop()
+        self.feed.flush()
+        del self.deliveries[:]
+
+        self.memo.add_task(Task("Test Task 3"))
+        self.feed.flush()
+
+        self.assertEqual([], self.deliveries)
+
+    def test_batch_is_coalesced(self):
+        tasks = [Task("Test Task 3"), Task("Test Task 4")]
+
+        with self.feed.batch():
+            self.memo.add_task(tasks[0])
+            self.memo.add_task(tasks[1])
+            self.memo.complete_tasks([1, 2, 3])
+            self.memo.complete_task(3)
+            self.memo.get_task(3).is_completed = False
+
+            self.assertEqual([], self.deliveries)
+
+        self.assertEqual([[("add", self.memo, tuple(tasks)),
+                           ("completion", self.memo,
+                            (self.memo.get_task(1), self.memo.get_task(2),
+                             tasks[0]))]], self.delivered_changes())
+
+    def test_memo_pushed_and_popped_within_batch_is_left_out(self):
+        with self.feed.batch():
+            self.memo_stack.push(Memo("Other Test Memo"))
+            self.memo_stack.pop()
+
+        self.assertEqual([], self.deliveries)
+
+    def test_nested_batches(self):
+        with self.feed.batch():
+            with self.feed.batch():
+                self.memo.complete_task(1)
+
+            self.assertEqual([], self.deliveries)
+
+        self.assertEqual(1, len(self.deliveries))
+
+    def test_deferred_feed(self):
+        feed = MemoChangeFeed(self.memo_stack, deferred=True)
+        deliveries = []
+        feed.subscribe(deliveries.append)
+
+        with feed.batch():
+            self.memo.complete_task(1)
+
+        self.memo.complete_task(2)
+
+        self.assertEqual([], deliveries)
+
+        feed.flush()
+
+        self.assertEqual([["completion"]], [[change.kind for change in changes]
+                                            for changes in deliveries])
+        self.assertEqual(2, len(deliveries[0][0].tasks))
+        feed.close()
+
+    def test_filters(self):
+        completions = []
+        other_memo_changes = []
+        other_memo = Memo("Other Test Memo")
+        self.feed.subscribe(completions.append, kinds=["completion"])
+        self.feed.subscribe(
+            other_memo_changes.append,
+            predicate=lambda change: change.memo is other_memo)
+
+        with self.feed.batch():
+            self.memo.complete_task(1)
+            self.memo.add_task(Task("Test Task 3"))
+
+        self.assertEqual(1, len(completions))
+        self.assertEqual(["completion"],
+                         [change.kind for change in completions[0]])
+        self.assertEqual([], other_memo_changes)
+
+    def test_subscribe_to_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            self.feed.subscribe(print, kinds=["completed"])
+
+    def test_unsubscribe(self):
+        self.feed.unsubscribe(self.deliveries.append)
+        self.memo.complete_task(1)
+        self.feed.flush()
+
+        self.assertEqual([], self.deliveries)
+
+    def test_description_change(self):
+        self.memo.get_task(1).description = "Changed Test Task"
+        self.feed.flush()
+
+        self.assertEqual([[("description", self.memo,
+                            (self.memo.get_task(1),))]],
+                         self.delivered_changes())
+
+    def test_close(self):
+        self.feed.close()
+        self.memo.complete_task(1)
+        self.memo_stack.push(Memo("Other Test Memo"))
+        self.feed.flush()
+
+        self.assertEqual([], self.deliveries)
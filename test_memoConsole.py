@@ -0,0 +1,296 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import TestCase
+from unittest import mock
+
+from PyMemo import MemoConsole
+from PyMemo import MemoStack
+from PyMemoStorage import SqliteMemoStack
+
+
+class TestMemoConsole(TestCase):
+    def setUp(self):
+        self.memo_stack = MemoStack()
+        self.console = MemoConsole(self.memo_stack)
+        self.output = StringIO()
+
+    def test_run_batch(self):
+        summary = self.__run_batch("m", "Test Memo", "t", "Test Task 1",
+                                   "t", "Test Task 2", "c 2")
+
+        memo = self.memo_stack.peek()
+        self.assertEqual("Test Memo", memo.name)
+        self.assertEqual((1, 2), memo.progress())
+        self.assertEqual("", self.output.getvalue())
+        self.assertEqual((4, 0), summary[:2])
+
+    def test_run_batch_prints_memo(self):
+        self.__run_batch("m", "Test Memo", "t", "Test Task", "", "p")
+
+        self.assertEqual("*************************\n"
+                         "*       Test Memo       *\n"
+                         "*************************\n"
+                         "* [1] Test Task         *\n"
+                         "*************************\n",
+                         self.output.getvalue())
+
+    def test_run_batch_counts_errors(self):
+        summary = self.__run_batch("c 1", "unknown", "m", "Test Memo", "c 1")
+
+        self.assertEqual((4, 3), summary[:2])
+        self.assertEqual("The memo stack is empty.\n"
+                         "We're sorry. But the command you entered is "
+                         "unknown.\n"
+                         "The task id you entered does not exist!\n"
+                         "Please enter a valid task id. You'll find them "
+                         "next to the task you want to complete.\n",
+                         self.output.getvalue())
+
+    def test_run_batch_stops_at_quit(self):
+        self.__run_batch("m", "First Test Memo", "q", "m", "Second Test Memo")
+
+        self.assertEqual(1, len(self.memo_stack.memos))
+
+    def test_run_batch_with_missing_task_description(self):
+        summary = self.__run_batch("m", "Test Memo", "t")
+
+        self.assertEqual((0, 0), self.memo_stack.peek().progress())
+        self.assertEqual((2, 0), summary[:2])
+
+    def test_complete_several_tasks_and_ranges(self):
+        self.__run_batch("m Test Memo", *["t Test Task {0}".format(number)
+                                          for number in range(1, 9)] +
+                         ["c 1 3 5-7"])
+
+        memo = self.memo_stack.peek()
+        self.assertEqual((5, 8), memo.progress())
+        self.assertFalse(memo.get_task(2).is_completed)
+        self.assertTrue(memo.get_task(6).is_completed)
+
+    def test_complete_with_invalid_task_id_completes_nothing(self):
+        summary = self.__run_batch("m Test Memo", "t Test Task", "c 1 2")
+
+        self.assertEqual((0, 1), self.memo_stack.peek().progress())
+        self.assertEqual(1, summary[1])
+
+    def test_complete_with_huge_range_completes_nothing(self):
+        summary = self.__run_batch("m Test Memo", "t Test Task",
+                                   "c 1-10000000000")
+
+        self.assertEqual((0, 1), self.memo_stack.peek().progress())
+        self.assertEqual(1, summary[1])
+
+    def test_commands_starting_with_c_are_not_completions(self):
+        summary = self.__run_batch("m Test Memo", "t Test Task", "cat 1")
+
+        self.assertEqual((0, 1), self.memo_stack.peek().progress())
+        self.assertEqual("We're sorry. But the command you entered is "
+                         "unknown.\n", self.output.getvalue())
+        self.assertEqual(1, summary[1])
+
+    def test_inline_memo_name_and_task_description(self):
+        self.__run_batch("M  Test Memo", "TASK Test  Task\t ", "C 1")
+
+        memo = self.memo_stack.peek()
+        self.assertEqual("Test Memo", memo.name)
+        self.assertEqual("Test  Task\t ", memo.get_task(1).description)
+        self.assertTrue(memo.is_completed())
+
+    def test_register_command(self):
+        self.console.register_command(
+            lambda arguments: self.console.write_line(
+                len(self.console.memo_stack.memos), *arguments),
+            "count", "n")
+
+        summary = self.__run_batch("m Test Memo", "count a b", "N")
+
+        self.assertEqual("1 a b\n1\n", self.output.getvalue())
+        self.assertEqual((3, 0), summary[:2])
+
+    def test_execute(self):
+        self.assertEqual("", self.console.execute("m"))
+        self.assertEqual("", self.console.execute("Test Memo"))
+        self.assertEqual("", self.console.execute("t Test Task"))
+        self.assertEqual("The memo stack is empty! Please create a memo "
+                         "first.\n", MemoConsole().execute("t"))
+        self.assertIn("* [1] Test Task", self.console.execute("p"))
+        self.assertTrue(self.console.is_running)
+
+        self.console.execute("q")
+
+        self.assertFalse(self.console.is_running)
+        self.assertEqual("Test Memo", self.memo_stack.peek().name)
+
+    def test_search(self):
+        self.__run_batch("m Groceries", "t Buy milk", "t Buy bread",
+                         "c 1", "search BUY bre*", "s milk is:open",
+                         "s is:open")
+
+        self.assertEqual("Groceries [2] Buy bread\n"
+                         "Groceries [1] Buy milk (completed)\n"
+                         "No matching tasks found.\n"
+                         "We're sorry. But the command you entered is "
+                         "unknown.\n", self.output.getvalue())
+
+    def test_search_sqlite_stack(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with SqliteMemoStack(os.path.join(directory, "memos.db")) \
+                    as memo_stack:
+                self.console = MemoConsole(memo_stack)
+                self.__run_batch("m Groceries", "t Buy milk", "t Buy bread",
+                                 "c 1", "search BUY bre*", "s milk is:open")
+
+        self.assertEqual("Groceries [2] Buy bread\n"
+                         "Groceries [1] Buy milk (completed)\n"
+                         "No matching tasks found.\n", self.output.getvalue())
+
+    def test_open(self):
+        self.__run_batch("m Test Memo", "t Test Task 1", "t Test Task 2",
+                         "t Test Task 3", "c 1", "open 1", "o x", "c 2-3",
+                         "o")
+
+        self.assertEqual("*************************\n"
+                         "*       Test Memo       *\n"
+                         "*************************\n"
+                         "* [2] Test Task 2       *\n"
+                         "*************************\n"
+                         "We're sorry. But the command you entered is "
+                         "unknown.\n"
+                         "All tasks of this memo are completed.\n",
+                         self.output.getvalue())
+
+    def test_print_page_of_open_tasks(self):
+        self.__run_batch("m Test Memo", *["t Test Task {0}".format(number)
+                                          for number in range(1, 31)] +
+                         ["c 1-5", "p open page 2", "p page 0"])
+
+        lines = self.output.getvalue().splitlines()
+        self.assertEqual(["* [{0}] Test Task {0}     *".format(number)
+                          for number in range(26, 31)], lines[3:-2])
+        self.assertEqual("We're sorry. But the command you entered is "
+                         "unknown.", lines[-1])
+
+    def test_stats(self):
+        self.__run_batch("stats", "stats on", "m Test Memo", "t Test Task",
+                         "stats reset", "c 1", "stats", "stats off",
+                         "stats json")
+
+        lines = self.output.getvalue().splitlines()
+        self.assertEqual("The metrics are disabled. Enter 'stats on' to "
+                         "collect them.", lines[0])
+        self.assertEqual(["command:complete", "command:stats", "complete"],
+                         sorted(line.partition(": ")[0]
+                                for line in lines[1:4]))
+        self.assertIn("1 calls, 1 tasks", lines[1])
+        self.assertEqual(lines[0], lines[4])
+
+    def test_stats_of_a_command_entered_by_different_names(self):
+        self.__run_batch("stats on", "m Test Memo", "t Test Task",
+                         "t Other Task", "stats reset", "c 1", "COMPLETE 2",
+                         "stats")
+
+        stats = dict(line.partition(": ")[::2]
+                     for line in self.output.getvalue().splitlines()[-3:])
+        self.assertEqual(["command:complete", "command:stats", "complete"],
+                         sorted(stats))
+        self.assertTrue(stats["command:complete"].startswith("2 calls"))
+
+    def test_undo_and_redo(self):
+        for line in ("m Test Memo", "t Test Task", "c 1", "pop"):
+            self.console.execute(line)
+
+        self.console.execute("undo")
+        memo = self.memo_stack.peek()
+        self.console.execute("undo")
+
+        self.assertEqual((0, 1), memo.progress())
+
+        self.console.execute("redo")
+
+        self.assertEqual((1, 1), memo.progress())
+        self.assertEqual([memo], self.memo_stack.memos)
+
+        self.console.execute("redo")
+
+        self.assertTrue(self.memo_stack.is_empty())
+        self.assertEqual("There is nothing to redo.\n",
+                         self.console.execute("redo"))
+
+    def test_consoles_undo_only_their_own_commands(self):
+        other_console = MemoConsole(self.memo_stack)
+        self.console.execute("m Shared Memo")
+        self.console.execute("t Task of the console")
+        other_console.execute("t Task of the other console")
+
+        self.console.execute("undo")
+
+        self.assertEqual((("Shared Memo",
+                           (("Task of the other console", False),)),),
+                         self.memo_stack.snapshot())
+        self.assertEqual("There is nothing to undo.\n",
+                         MemoConsole(self.memo_stack).execute("undo"))
+
+    def test_no_undo_in_batch_mode(self):
+        self.__run_batch("m Test Memo", "undo")
+
+        self.assertEqual(1, len(self.memo_stack.memos))
+        self.assertEqual("There is no undo in batch mode.\n",
+                         self.output.getvalue())
+
+    def test_schedule(self):
+        for line in ("m Groceries", "sc 1 2026-12-24", "m Report",
+                     "schedule 3", "m Bakery", "sc 1 2026-12-20",
+                     "m Taxes"):
+            self.console.execute(line)
+
+        self.assertEqual("Next: Report (priority 3)\n",
+                         self.console.execute("next"))
+        self.assertEqual("1. Report (priority 3)\n"
+                         "2. Bakery (priority 1, due 2026-12-20)\n",
+                         self.console.execute("agenda 2"))
+        self.assertEqual("The top memo is not scheduled.\n",
+                         self.console.execute("unschedule"))
+
+        self.console.execute("pop")
+        self.console.execute("pop")
+
+        self.assertEqual("1. Report (priority 3)\n"
+                         "2. Groceries (priority 1, due 2026-12-24)\n",
+                         self.console.execute("a"))
+
+    def test_undo_pop_restores_schedule(self):
+        for line in ("m Groceries", "sc 2", "pop", "undo"):
+            self.console.execute(line)
+
+        self.assertEqual("1. Groceries (priority 2)\n",
+                         self.console.execute("agenda"))
+
+    def test_schedule_sqlite_stack(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with SqliteMemoStack(os.path.join(directory, "memos.db")) \
+                    as memo_stack:
+                console = MemoConsole(memo_stack)
+
+                for line in ("m Groceries", "m Report", "sc 2", "pop"):
+                    console.execute(line)
+
+                self.assertEqual("No memo is scheduled.\n",
+                                 console.execute("agenda"))
+
+                console.execute("sc 1")
+
+                self.assertEqual("1. Groceries (priority 1)\n",
+                                 console.execute("agenda"))
+
+    def test_schedule_with_invalid_deadline(self):
+        self.console.execute("m Groceries")
+
+        self.assertEqual("We're sorry. But the command you entered is "
+                         "unknown.\n", self.console.execute("sc 1 24.12.2026"))
+        self.assertEqual("No memo is scheduled.\n",
+                         self.console.execute("next"))
+
+    def __run_batch(self, *lines):
+        with mock.patch("sys.stderr", new_callable=StringIO):
+            return self.console.run_batch(lines, self.output)
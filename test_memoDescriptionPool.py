@@ -0,0 +1,102 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import TestCase
+from unittest import mock
+
+from PyMemo import Memo
+from PyMemo import MemoDescriptionPool
+from PyMemo import MemoStack
+from PyMemo import Task
+from PyMemo import main
+from PyMemoStorage import SqliteMemoStack
+
+
+def _copy(text):
+    # Joining creates a new string, unlike a literal, which is shared.
+    return "".join(list(text))
+
+
+class TestMemoDescriptionPool(TestCase):
+    def setUp(self):
+        self.memo_stack = MemoStack()
+        self.memo = Memo("Test Memo", [Task(_copy("Run smoke tests")),
+                                       Task(_copy("Update changelog"))])
+        self.memo_stack.push(self.memo)
+        self.pool = MemoDescriptionPool(self.memo_stack)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_added_tasks_share_their_description(self):
+        task = Task(_copy("Run smoke tests"))
+        self.memo.add_task(task)
+
+        self.assertIs(self.memo.get_task(1).description, task.description)
+        self.assertIs(self.memo.get_task(1).description,
+                      self.pool.intern(_copy("Run smoke tests")))
+
+    def test_pushed_memos_share_their_descriptions(self):
+        memo = Memo("Other Test Memo", [Task(_copy("Update changelog"))])
+        self.memo_stack.push(memo)
+
+        self.assertIs(self.memo.get_task(2).description,
+                      memo.get_task(1).description)
+
+    def test_report(self):
+        self.memo.add_tasks([Task(_copy("Run smoke tests"))
+                             for _ in range(3)])
+
+        report = self.pool.report()
+
+        self.assertEqual(5, report["descriptions"])
+        self.assertEqual(2, report["unique_descriptions"])
+        self.assertEqual(2.5, report["dedup_ratio"])
+        self.assertGreater(report["bytes_saved"], 3 * len("Run smoke tests"))
+
+    def test_removed_tasks_are_released(self):
+        self.memo.remove_task(self.memo.get_task(2))
+
+        self.assertEqual(1, self.pool.report()["unique_descriptions"])
+
+        changelog = _copy("Update changelog")
+
+        self.assertIs(changelog, self.pool.intern(changelog))
+
+    def test_popped_memos_are_released(self):
+        self.memo.complete_tasks([1, 2])
+        self.memo_stack.pop()
+
+        self.assertEqual({"descriptions": 0, "unique_descriptions": 0,
+                          "dedup_ratio": 1.0, "bytes_saved": 0},
+                         self.pool.report())
+
+    def test_changed_description(self):
+        task = self.memo.get_task(1)
+        task.description = _copy("Update changelog")
+
+        self.assertIs(self.memo.get_task(2).description, task.description)
+        self.assertEqual(1, self.pool.report()["unique_descriptions"])
+        self.assertEqual(2, self.pool.report()["descriptions"])
+
+    def test_stack_sharing_descriptions(self):
+        memo_stack = MemoStack(share_descriptions=True)
+        memo_stack.push(Memo("Test Memo", [Task(_copy("Run smoke tests")),
+                                           Task(_copy("Run smoke tests"))]))
+
+        self.assertIs(memo_stack.peek().get_task(1).description,
+                      memo_stack.peek().get_task(2).description)
+        self.assertEqual(2, MemoDescriptionPool.shared(memo_stack).report()[
+            "descriptions"])
+
+    def test_sqlite_stack_is_refused(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with SqliteMemoStack(os.path.join(directory, "memos.db")) \
+                    as memo_stack:
+                with self.assertRaises(TypeError):
+                    MemoDescriptionPool(memo_stack)
+
+                with mock.patch("sys.stderr", new_callable=StringIO), \
+                        self.assertRaises(SystemExit):
+                    main(["--sqlite", os.path.join(directory, "memos.db"),
+                          "--share-descriptions"])
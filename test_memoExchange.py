@@ -0,0 +1,173 @@
+import io
+import os
+import tempfile
+from unittest import TestCase
+
+from PyMemo import Memo
+from PyMemo import MemoStack
+from PyMemo import Task
+from PyMemoExchange import MemoCsv
+from PyMemoExchange import MemoJsonLines
+from PyMemoExchange import MemoMarkdown
+from PyMemoStorage import SqliteMemoStack
+
+
+def _prepare_memo_stack():
+    memo_stack = MemoStack()
+    memo_stack.push(Memo("Groceries", [Task("Buy milk"),
+                                       Task("Buy \"bread\", rolls")]))
+    memo_stack.push(Memo("Empty Mémo"))
+    memo_stack.push(Memo("Work", [Task("Write report")]))
+    memo_stack.memos[0].complete_task(1)
+    return memo_stack
+
+
+def _describe(memo_stack):
+    return [(memo.name, [(task.description, task.is_completed)
+                         for _, task in memo.list_id_task_tuples()])
+            for memo in memo_stack.memos]
+
+
+class TestMemoJsonLines(TestCase):
+    def test_write_and_read(self):
+        memo_stack = _prepare_memo_stack()
+        stream = io.StringIO()
+
+        MemoJsonLines.write(memo_stack, stream)
+        stream.seek(0)
+
+        self.assertEqual(_describe(memo_stack),
+                         _describe(MemoJsonLines.read(stream)))
+
+    def test_write(self):
+        stream = io.StringIO()
+
+        MemoJsonLines.write(_prepare_memo_stack(), stream)
+
+        self.assertEqual('{"memo": "Groceries"}\n'
+                         '{"task": "Buy milk", "completed": true}\n',
+                         "".join(stream.getvalue().splitlines(True)[:2]))
+
+    def test_read_in_batches_into_sqlite_stack(self):
+        lines = ['{"memo": "Test Memo"}'] + [
+            '{{"task": "Test Task {0}"}}'.format(number)
+            for number in range(1, 6)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            with SqliteMemoStack(os.path.join(directory, "memos.db")) \
+                    as memo_stack:
+                MemoJsonLines.read(lines, memo_stack, batch_size=2)
+
+                self.assertEqual((0, 5), memo_stack.peek().progress())
+                self.assertEqual("Test Task 5",
+                                 memo_stack.peek().get_task(5).description)
+
+    def test_read_sharing_descriptions(self):
+        memo_stack = MemoJsonLines.read(
+            ['{"memo": "Test Memo"}', '{"task": "Test Task"}',
+             '{"task": "Test Task"}'], share_descriptions=True)
+
+        self.assertIs(memo_stack.peek().get_task(1).description,
+                      memo_stack.peek().get_task(2).description)
+
+    def test_read_invalid_line(self):
+        with self.assertRaises(ValueError) as raised:
+            MemoJsonLines.read(['{"memo": "Test Memo"}', '', '[1, 2]'])
+
+        self.assertIn("Line 3", str(raised.exception))
+
+    def test_read_completed_strictly(self):
+        memo_stack = MemoJsonLines.read([
+            '{"memo": "Test Memo"}', '{"task": "Test Task 1"}',
+            '{"task": "Test Task 2", "completed": true}'])
+
+        self.assertEqual([("Test Memo", [("Test Task 1", False),
+                                         ("Test Task 2", True)])],
+                         _describe(memo_stack))
+
+        for completed in ('"false"', '1', 'null'):
+            with self.assertRaises(ValueError) as raised:
+                MemoJsonLines.read([
+                    '{"memo": "Test Memo"}',
+                    '{{"task": "Test Task", "completed": {0}}}'.format(
+                        completed)])
+
+            self.assertIn("Line 2", str(raised.exception))
+
+    def test_read_task_without_memo(self):
+        with self.assertRaises(ValueError):
+            MemoJsonLines.read(['{"task": "Test Task"}'])
+
+
+class TestMemoCsv(TestCase):
+    def test_write_and_read(self):
+        memo_stack = _prepare_memo_stack()
+        stream = io.StringIO()
+
+        MemoCsv.write(memo_stack, stream)
+        stream.seek(0)
+
+        self.assertEqual(_describe(memo_stack),
+                         _describe(MemoCsv.read(stream)))
+
+    def test_write(self):
+        stream = io.StringIO()
+
+        MemoCsv.write(_prepare_memo_stack(), stream)
+
+        self.assertEqual("memo,task,completed\n"
+                         "Groceries,,\n"
+                         "Groceries,Buy milk,true\n"
+                         "Groceries,\"Buy \"\"bread\"\", rolls\",false\n",
+                         "".join(stream.getvalue().splitlines(True)[:4]))
+
+    def test_read_without_memo_rows(self):
+        memo_stack = MemoCsv.read(["Memo,Task,Completed",
+                                   "Groceries,Buy milk,x",
+                                   "Groceries,Buy bread,",
+                                   "Work,Write report,no"])
+
+        self.assertEqual([("Groceries", [("Buy milk", True),
+                                         ("Buy bread", False)]),
+                          ("Work", [("Write report", False)])],
+                         _describe(memo_stack))
+
+    def test_read_invalid_rows(self):
+        for rows in (["memo,description"],
+                     ["memo,task,completed", "Groceries,Buy milk"],
+                     ["memo,task,completed", "Groceries,Buy milk,maybe"]):
+            with self.assertRaises(ValueError):
+                MemoCsv.read(rows)
+
+
+class TestMemoMarkdown(TestCase):
+    def test_write(self):
+        memo_stack = _prepare_memo_stack()
+        memo_stack.peek().get_task(1).description = "Write\nreport"
+        stream = io.StringIO()
+
+        MemoMarkdown.write(memo_stack, stream)
+
+        self.assertEqual("## Groceries\n"
+                         "\n"
+                         "- [x] Buy milk\n"
+                         "- [ ] Buy \"bread\", rolls\n"
+                         "\n"
+                         "## Empty Mémo\n"
+                         "\n"
+                         "\n"
+                         "## Work\n"
+                         "\n"
+                         "- [ ] Write report\n", stream.getvalue())
+
+    def test_write_escapes_special_characters(self):
+        memo_stack = MemoStack()
+        memo_stack.push(Memo("A | B", [Task("[x] see [1](a\\b)")]))
+        stream = io.StringIO()
+
+        MemoMarkdown.write(memo_stack, stream)
+
+        self.assertEqual("## A \\| B\n"
+                         "\n"
+                         "- [ ] \\[x\\] see \\[1\\](a\\\\b)\n",
+                         stream.getvalue())
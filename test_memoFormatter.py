@@ -0,0 +1,181 @@
+import gc
+import tracemalloc
+from io import StringIO
+from unittest import TestCase
+
+from PyMemo import Memo
+from PyMemo import MemoFormatter
+from PyMemo import Task
+
+
+class TestMemoFormatter(TestCase):
+    def setUp(self):
+        self.memo = Memo("Test Memo", [
+            Task("Test Task 1"),
+            Task("A rather long test task description")
+        ])
+
+    def test_format(self):
+        memo_formatter = MemoFormatter(self.memo)
+
+        self.assertEqual("*************************\n"
+                         "*       Test Memo       *\n"
+                         "*************************\n"
+                         "* [1] Test Task 1       *\n"
+                         "* [2] A rather long tes *\n"
+                         "*     t task descriptio *\n"
+                         "*     n                 *\n"
+                         "*************************",
+                         memo_formatter.format())
+
+    def test_iter_lines(self):
+        memo_formatter = MemoFormatter(self.memo)
+
+        self.assertEqual(["*************************",
+                          "*       Test Memo       *",
+                          "*************************",
+                          "* [1] Test Task 1       *",
+                          "* [2] A rather long tes *",
+                          "*     t task descriptio *",
+                          "*     n                 *",
+                          "*************************"],
+                         list(memo_formatter.iter_lines()))
+
+    def test_write_to_matches_format(self):
+        memo_formatter = MemoFormatter(self.memo)
+        stream = StringIO()
+
+        memo_formatter.write_to(stream)
+
+        self.assertEqual(memo_formatter.format(), stream.getvalue())
+
+    def test_format_empty_memo(self):
+        memo_formatter = MemoFormatter(Memo("Empty Test Memo"))
+
+        self.assertEqual("*************************\n"
+                         "*    Empty Test Memo    *\n"
+                         "*************************\n"
+                         "*************************",
+                         memo_formatter.format())
+
+    def test_format_unchanged_memo_twice(self):
+        memo_formatter = MemoFormatter(self.memo)
+
+        self.assertIs(memo_formatter.format(), memo_formatter.format())
+
+    def test_format_after_changing_task_description(self):
+        memo_formatter = MemoFormatter(self.memo)
+        memo_formatter.format()
+
+        self.memo.get_task(1).description = "Changed Task"
+
+        self.assertIn("* [1] Changed Task      *", memo_formatter.format())
+
+    def test_format_after_removing_task(self):
+        memo_formatter = MemoFormatter(self.memo)
+        memo_formatter.format()
+
+        self.memo.remove_task(self.memo.get_task(1))
+
+        self.assertEqual("*************************\n"
+                         "*       Test Memo       *\n"
+                         "*************************\n"
+                         "* [1] A rather long tes *\n"
+                         "*     t task descriptio *\n"
+                         "*     n                 *\n"
+                         "*************************",
+                         memo_formatter.format())
+
+    def test_format_after_id_column_grows(self):
+        memo_formatter = MemoFormatter(self.memo)
+        memo_formatter.format()
+
+        for task_count in range(3, 11):
+            self.memo.add_task(Task("Test Task " + str(task_count)))
+
+        lines = memo_formatter.format().split("\n")
+
+        self.assertEqual("*  [1] Test Task 1      *", lines[3])
+        self.assertEqual("* [10] Test Task 10     *", lines[-2])
+
+    def test_format_after_renaming_memo(self):
+        memo_formatter = MemoFormatter(self.memo)
+        memo_formatter.format()
+
+        self.memo.name = "Renamed Test Memo"
+
+        self.assertIn("*   Renamed Test Memo   *", memo_formatter.format())
+
+    def test_format_large_memo_without_keeping_it(self):
+        memo = Memo("Large Test Memo", [Task("Test Task {0}".format(number))
+                                        for number in range(20000)])
+        memo_formatter = MemoFormatter(memo)
+        gc.collect()
+        tracemalloc.start()
+
+        try:
+            formatted_memo = memo_formatter.format()
+            self.assertTrue("\n".join(memo_formatter.iter_lines())
+                            == formatted_memo)
+            del formatted_memo
+            gc.collect()
+            retained_bytes = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(retained_bytes, 100000)
+
+        memo.get_task(1).description = "Changed"
+
+        self.assertTrue(memo_formatter.format().splitlines()[3].startswith(
+            "*     [1] Changed "))
+
+    def test_format_window(self):
+        memo_formatter = MemoFormatter(self.__prepare_memo_with_ten_tasks())
+
+        self.assertEqual("*************************\n"
+                         "*       Test Memo       *\n"
+                         "*************************\n"
+                         "*  [9] Test Task 9      *\n"
+                         "* [10] Test Task 10     *\n"
+                         "*************************",
+                         memo_formatter.format_window(9, 12))
+
+    def test_format_window_with_open_tasks_only(self):
+        memo = self.__prepare_memo_with_ten_tasks()
+        memo.complete_tasks([1, 2, 4])
+        memo_formatter = MemoFormatter(memo)
+
+        lines = memo_formatter.format_window(open_only=True,
+                                             limit=2).split("\n")
+
+        self.assertEqual(["*  [3] Test Task 3      *",
+                          "*  [5] Test Task 5      *"], lines[3:-1])
+
+    def test_format_window_with_page_of_open_tasks(self):
+        memo = self.__prepare_memo_with_ten_tasks()
+        memo.complete_tasks([1, 2, 4])
+        memo_formatter = MemoFormatter(memo)
+
+        lines = memo_formatter.format_window(open_only=True, limit=2,
+                                             skip=2).split("\n")
+
+        self.assertEqual(["*  [6] Test Task 6      *",
+                          "*  [7] Test Task 7      *"], lines[3:-1])
+
+    def test_format_window_after_removing_task(self):
+        memo = self.__prepare_memo_with_ten_tasks()
+        memo.remove_task(memo.get_task(2))
+        memo_formatter = MemoFormatter(memo)
+
+        lines = memo_formatter.format_window(2, 2).split("\n")
+
+        self.assertEqual(["* [2] Test Task 3       *"], lines[3:-1])
+
+    def __prepare_memo_with_ten_tasks(self):
+        memo = Memo("Test Memo")
+
+        for task_count in range(1, 11):
+            memo.add_task(Task("Test Task " + str(task_count)))
+
+        return memo
@@ -0,0 +1,230 @@
+import threading
+from unittest import TestCase
+
+from PyMemo import Memo
+from PyMemo import MemoHistory
+from PyMemo import MemoHistoryConflict
+from PyMemo import MemoStack
+from PyMemo import Task
+
+
+class TestMemoHistory(TestCase):
+    def setUp(self):
+        self.memo_stack = MemoStack()
+        self.memo = Memo("Test Memo", [Task("Test Task 1"),
+                                       Task("Test Task 2")])
+        self.memo_stack.push(self.memo)
+        self.history = MemoHistory(self.memo_stack)
+
+    def tearDown(self):
+        self.history.close()
+
+    def test_undo_and_redo_push(self):
+        memo = Memo("Other Test Memo")
+
+        with self.history.step():
+            self.memo_stack.push(memo)
+
+        self.assertTrue(self.history.undo())
+        self.assertEqual([self.memo], self.memo_stack.memos)
+        self.assertTrue(self.history.redo())
+        self.assertEqual([self.memo, memo], self.memo_stack.memos)
+
+    def test_undo_pop(self):
+        self.memo.complete_tasks([1, 2])
+
+        with self.history.step():
+            self.memo_stack.pop()
+
+        self.history.undo()
+
+        self.assertEqual([self.memo], self.memo_stack.memos)
+
+    def test_undo_completion_of_several_tasks_as_one_step(self):
+        with self.history.step():
+            self.memo.complete_tasks([1, 2])
+
+        self.history.undo()
+
+        self.assertEqual((0, 2), self.memo.progress())
+
+        self.history.redo()
+
+        self.assertEqual((2, 2), self.memo.progress())
+
+    def test_undo_added_and_removed_tasks(self):
+        task = Task("Test Task 3")
+
+        with self.history.step():
+            self.memo.add_task(task)
+
+        with self.history.step():
+            self.memo.remove_task(self.memo.get_task(1))
+
+        self.history.undo()
+
+        self.assertEqual(["Test Task 2", "Test Task 3", "Test Task 1"],
+                         [task.description for _, task
+                          in self.memo.list_id_task_tuples()])
+
+        self.history.undo()
+
+        self.assertEqual(2, len(self.memo.id_task_tuples()))
+        self.assertFalse(self.history.can_undo)
+
+    def test_undo_and_redo_description_change(self):
+        with self.history.step():
+            self.memo.get_task(1).description = "Changed Test Task"
+
+        self.history.undo()
+
+        self.assertEqual("Test Task 1", self.memo.get_task(1).description)
+
+        self.history.redo()
+
+        self.assertEqual("Changed Test Task",
+                         self.memo.get_task(1).description)
+
+    def test_undo_changes_of_memos_pushed_within_the_step(self):
+        memo = Memo("Other Test Memo")
+
+        with self.history.step():
+            self.memo_stack.push(memo)
+            memo.add_task(Task("Other Test Task"))
+
+        self.history.undo()
+
+        self.assertEqual([self.memo], self.memo_stack.memos)
+        self.assertEqual(0, len(memo.id_task_tuples()))
+
+    def test_changes_outside_of_steps_are_not_recorded(self):
+        self.memo.complete_task(1)
+
+        self.assertFalse(self.history.undo())
+        self.assertTrue(self.memo.get_task(1).is_completed)
+
+    def test_new_step_clears_redo(self):
+        with self.history.step():
+            self.memo.complete_task(1)
+
+        self.history.undo()
+
+        with self.history.step():
+            self.memo.complete_task(2)
+
+        self.assertFalse(self.history.can_redo)
+        self.assertFalse(self.history.redo())
+
+    def test_history_is_limited(self):
+        history = MemoHistory(self.memo_stack, limit=1)
+
+        for task_id in (1, 2):
+            with history.step():
+                self.memo.complete_task(task_id)
+
+        self.assertTrue(history.undo())
+        self.assertFalse(history.undo())
+        self.assertEqual([1], self.memo.completed_task_ids())
+        history.close()
+
+    def test_history_is_limited_by_task_count(self):
+        history = MemoHistory(self.memo_stack, task_limit=3)
+
+        for number in (3, 5):
+            with history.step():
+                self.memo.add_tasks([Task("Test Task {0}".format(number)),
+                                     Task("Test Task {0}".format(
+                                         number + 1))])
+
+        self.assertTrue(history.undo())
+        self.assertFalse(history.undo())
+        self.assertEqual(4, self.memo._get_number_of_task())
+        history.close()
+
+    def test_changes_of_other_threads_are_not_part_of_the_step(self):
+        with self.history.step():
+            thread = threading.Thread(target=self.memo.complete_task,
+                                      args=(1,))
+            thread.start()
+            thread.join()
+
+        self.assertFalse(self.history.can_undo)
+
+    def test_histories_keep_their_own_steps(self):
+        other_history = MemoHistory(self.memo_stack)
+
+        with self.history.step():
+            self.memo.complete_task(1)
+
+        with other_history.step():
+            self.memo.complete_task(2)
+
+        self.assertTrue(self.history.undo())
+        self.assertFalse(self.history.can_undo)
+        self.assertEqual([2], self.memo.completed_task_ids())
+        self.assertTrue(other_history.undo())
+        self.assertEqual([], self.memo.completed_task_ids())
+
+    def test_conflict(self):
+        memo = Memo("Other Test Memo")
+
+        with self.history.step():
+            self.memo_stack.push(memo)
+
+        self.memo_stack.push(Memo("Third Test Memo"))
+
+        with self.assertRaises(MemoHistoryConflict):
+            self.history.undo()
+
+        self.assertTrue(self.history.can_undo)
+        self.assertEqual(3, len(self.memo_stack.memos))
+
+    def test_conflict_with_tasks_added_outside_of_the_step(self):
+        memo = Memo("Other Test Memo")
+
+        with self.history.step():
+            self.memo_stack.push(memo)
+
+        memo.add_task(Task("Other Test Task"))
+
+        with self.assertRaises(MemoHistoryConflict):
+            self.history.undo()
+
+        self.assertTrue(self.history.can_undo)
+        self.assertEqual([self.memo, memo], self.memo_stack.memos)
+
+    def test_conflict_with_redo_of_pop(self):
+        memo = Memo("Other Test Memo")
+        self.memo_stack.push(memo)
+
+        with self.history.step():
+            self.memo_stack.pop()
+
+        self.history.undo()
+        memo.add_task(Task("Other Test Task"))
+
+        with self.assertRaises(MemoHistoryConflict):
+            self.history.redo()
+
+        self.assertTrue(self.history.can_redo)
+        self.assertEqual([self.memo, memo], self.memo_stack.memos)
+
+    def test_conflict_takes_back_replayed_changes(self):
+        memo = Memo("Other Test Memo")
+
+        with self.history.step():
+            self.memo_stack.push(memo)
+            self.memo.complete_task(1)
+
+        self.memo_stack.push(Memo("Third Test Memo"))
+
+        with self.assertRaises(MemoHistoryConflict):
+            self.history.undo()
+
+        self.assertEqual([1], self.memo.completed_task_ids())
+        self.assertTrue(self.history.can_undo)
+        self.assertFalse(self.history.can_redo)
+        self.memo_stack._pop_if_top(self.memo_stack.peek())
+        self.assertTrue(self.history.undo())
+        self.assertEqual([self.memo], self.memo_stack.memos)
+        self.assertEqual([], self.memo.completed_task_ids())
@@ -0,0 +1,195 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import TestCase
+from unittest import mock
+
+from PyMemo import Memo
+from PyMemo import Task
+from PyMemo import main
+from PyMemoStorage import MemoJournal
+
+
+class TestMemoJournal(TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.directory = self.temporary_directory.name
+
+    def tearDown(self):
+        self.temporary_directory.cleanup()
+
+    def test_open_empty_journal(self):
+        with MemoJournal(self.directory) as journal:
+            memo_stack = journal.open()
+
+        self.assertTrue(memo_stack.is_empty())
+
+    def test_reopen_restores_memos_and_tasks(self):
+        with MemoJournal(self.directory) as journal:
+            memo_stack = journal.open()
+            memo_stack.push(Memo("First Test Memo", [Task("Test Task 1")]))
+            memo = Memo("Second Test Memo")
+            memo_stack.push(memo)
+            memo.add_task(Task("Test Task 2"))
+            memo.add_tasks([Task("Test Task 3"), Task("Test Task 4")])
+            memo.complete_task(2)
+
+        memo_stack = self.__reopen()
+
+        self.assertEqual(["First Test Memo", "Second Test Memo"],
+                         [memo.name for memo in memo_stack.memos])
+        self.assertEqual([("Test Task 2", False), ("Test Task 3", True),
+                          ("Test Task 4", False)],
+                         self.__describe_tasks(memo_stack.peek()))
+
+    def test_reopen_sharing_descriptions(self):
+        with MemoJournal(self.directory) as journal:
+            journal.open().push(Memo("Test Memo", [
+                Task("Test Task"), Task("Test Task")]))
+            journal.snapshot()
+            journal.open().peek().add_task(Task("Test Task"))
+
+        with MemoJournal(self.directory,
+                         share_descriptions=True) as journal:
+            memo = journal.open().peek()
+
+            self.assertEqual(1, len({id(task.description) for _, task
+                                     in memo.list_id_task_tuples()}))
+            self.assertEqual(3, len(memo.list_id_task_tuples()))
+
+    def test_main_writes_every_change_by_default(self):
+        journals = []
+
+        def create_journal(*arguments, **keyword_arguments):
+            journals.append(MemoJournal(*arguments, **keyword_arguments))
+            return journals[-1]
+
+        commands_path = os.path.join(self.directory, "commands.txt")
+
+        with open(commands_path, "w", encoding="utf-8") as commands:
+            commands.write("m Test Memo\n")
+
+        for options, batch_size, fsync in (
+                ([], 1, True),
+                (["--journal-batch", "50", "--no-fsync"], 50, False)):
+            with mock.patch("PyMemoStorage.MemoJournal",
+                            side_effect=create_journal), \
+                    mock.patch("sys.stderr", new_callable=StringIO):
+                main(["--journal", os.path.join(self.directory, "journal"),
+                      "--batch", commands_path] + options)
+
+            self.assertEqual((batch_size, fsync),
+                             (journals[-1].batch_size, journals[-1].fsync))
+
+    def test_reopen_after_removing_tasks(self):
+        with MemoJournal(self.directory) as journal:
+            memo = Memo("Test Memo", [Task("Test Task " + str(task_count))
+                                      for task_count in range(1, 6)])
+            journal.open().push(memo)
+            memo.remove_task(memo.get_task(2))
+            memo.get_task(3).complete()
+            memo.remove_tasks([memo.get_task(1)])
+            memo.get_task(1).description = "Changed Test Task"
+
+        memo_stack = self.__reopen()
+
+        self.assertEqual([("Changed Test Task", False), ("Test Task 4", True),
+                          ("Test Task 5", False)],
+                         self.__describe_tasks(memo_stack.peek()))
+
+    def test_reopen_after_pop(self):
+        with MemoJournal(self.directory) as journal:
+            memo_stack = journal.open()
+            memo_stack.push(Memo("First Test Memo"))
+            memo = Memo("Second Test Memo", [Task("Test Task")])
+            memo_stack.push(memo)
+            memo.complete_task(1)
+            memo_stack.pop()
+
+        memo_stack = self.__reopen()
+
+        self.assertEqual(["First Test Memo"],
+                         [memo.name for memo in memo_stack.memos])
+
+    def test_reopen_after_pop_of_memo_with_open_tasks(self):
+        with MemoJournal(self.directory) as journal:
+            memo_stack = journal.open()
+            memo = Memo("Test Memo", [Task("Test Task")])
+            memo_stack.push(memo)
+            memo_stack._pop_if_top(memo, force=True)
+
+        memo_stack = self.__reopen()
+
+        self.assertTrue(memo_stack.is_empty())
+
+    def test_changes_are_journaled_after_reopen(self):
+        with MemoJournal(self.directory) as journal:
+            journal.open().push(Memo("Test Memo", [Task("Test Task 1")]))
+
+        with MemoJournal(self.directory) as journal:
+            memo = journal.open().peek()
+            memo.add_task(Task("Test Task 2"))
+            memo.complete_task(1)
+
+        memo_stack = self.__reopen()
+
+        self.assertEqual([("Test Task 1", True), ("Test Task 2", False)],
+                         self.__describe_tasks(memo_stack.peek()))
+
+    def test_snapshot_starts_a_new_log(self):
+        with MemoJournal(self.directory, batch_size=1,
+                         snapshot_interval=3) as journal:
+            memo = Memo("Test Memo")
+            journal.open().push(memo)
+
+            for task_count in range(1, 6):
+                memo.add_task(Task("Test Task " + str(task_count)))
+
+            memo.remove_task(memo.get_task(1))
+            memo.complete_task(1)
+
+        memo_stack = self.__reopen()
+
+        self.assertIn("snapshot.json", os.listdir(self.directory))
+        self.assertEqual(1, len([file_name for file_name
+                                 in os.listdir(self.directory)
+                                 if file_name.endswith(".log")]))
+        self.assertEqual([("Test Task 2", True), ("Test Task 3", False),
+                          ("Test Task 4", False), ("Test Task 5", False)],
+                         self.__describe_tasks(memo_stack.peek()))
+
+    def test_incomplete_last_record_is_ignored(self):
+        with MemoJournal(self.directory) as journal:
+            journal.open().push(Memo("Test Memo", [Task("Test Task")]))
+
+        with open(os.path.join(self.directory, "journal-0.log"), "a") \
+                as log_file:
+            log_file.write('["completion", 0, 0, tr')
+
+        memo_stack = self.__reopen()
+
+        self.assertEqual([("Test Task", False)],
+                         self.__describe_tasks(memo_stack.peek()))
+
+    def test_records_are_buffered_until_batch_is_full(self):
+        journal = MemoJournal(self.directory, batch_size=3)
+        memo = Memo("Test Memo")
+        journal.open().push(memo)
+        memo.add_task(Task("Test Task"))
+        log_path = os.path.join(self.directory, "journal-0.log")
+
+        size_before_batch_is_full = os.path.getsize(log_path)
+        memo.complete_task(1)
+        journal.close()
+
+        self.assertEqual(0, size_before_batch_is_full)
+        self.assertGreater(os.path.getsize(log_path), 0)
+
+    def __reopen(self):
+        with MemoJournal(self.directory) as journal:
+            return journal.open()
+
+    @staticmethod
+    def __describe_tasks(memo):
+        return [(task.description, task.is_completed)
+                for _, task in memo.list_id_task_tuples()]
@@ -0,0 +1,120 @@
+import json
+from unittest import TestCase
+
+from PyMemo import Memo
+from PyMemo import MemoFormatter
+from PyMemo import MemoMetrics
+from PyMemo import MemoNotCompleted
+from PyMemo import MemoStack
+from PyMemo import Task
+
+
+class TestMemoMetrics(TestCase):
+    def setUp(self):
+        self.records = []
+        self.metrics = MemoMetrics(
+            lambda *record: self.records.append(record)).enable()
+
+    def tearDown(self):
+        self.metrics.disable()
+
+    def test_operations_are_measured(self):
+        memo_stack = MemoStack()
+        memo = Memo("Test Memo")
+        memo_stack.push(memo)
+        memo.add_task(Task("Test Task 1"))
+        memo.add_tasks([Task("Test Task 2"), Task("Test Task 3")])
+        memo.complete_task(1)
+        memo.complete_tasks([2, 3])
+        formatted_memo = MemoFormatter(memo).format()
+        memo_stack.pop()
+
+        operations = self.metrics.snapshot()
+
+        self.assertEqual(["add", "complete", "pop", "push", "render"],
+                         sorted(operations))
+        self.assertEqual(2, operations["add"]["count"])
+        self.assertEqual(3, operations["add"]["task_count"])
+        self.assertEqual(3, operations["complete"]["task_count"])
+        self.assertEqual(3, operations["render"]["task_count"])
+        self.assertEqual(len(formatted_memo), operations["render"]["size"])
+        self.assertEqual(1, sum(operations["push"]["buckets"]))
+        self.assertEqual(7, len(self.records))
+
+    def test_failed_operations_are_not_measured(self):
+        memo_stack = MemoStack()
+        memo_stack.push(Memo("Test Memo", [Task("Test Task")]))
+
+        with self.assertRaises(MemoNotCompleted):
+            memo_stack.pop()
+
+        self.assertNotIn("pop", self.metrics.snapshot())
+
+    def test_pop_if_completed_counts_only_pops(self):
+        memo_stack = MemoStack()
+        memo_stack.pop_if_completed()
+        memo_stack.push(Memo("Test Memo", [Task("Test Task")]))
+        memo_stack.pop_if_completed()
+
+        self.assertNotIn("pop", self.metrics.snapshot())
+
+    def test_window_counts_rendered_tasks(self):
+        memo = Memo("Test Memo", [Task("Test Task " + str(number))
+                                  for number in range(1, 11)])
+
+        MemoFormatter(memo).format_window(3, 4)
+
+        self.assertEqual(2, self.metrics.snapshot()["render"]["task_count"])
+
+    def test_disable(self):
+        self.metrics.disable()
+        MemoStack().push(Memo("Test Memo"))
+
+        self.assertFalse(self.metrics.is_enabled)
+        self.assertEqual({}, self.metrics.snapshot())
+        self.assertEqual([], self.records)
+
+    def test_only_one_metrics_is_enabled(self):
+        with MemoMetrics() as other_metrics:
+            MemoStack().push(Memo("Test Memo"))
+
+        self.assertFalse(self.metrics.is_enabled)
+        self.assertEqual(1, other_metrics.snapshot()["push"]["count"])
+        self.assertEqual({}, self.metrics.snapshot())
+
+    def test_reset(self):
+        MemoStack().push(Memo("Test Memo"))
+
+        self.metrics.reset()
+
+        self.assertEqual({}, self.metrics.snapshot())
+
+    def test_to_json(self):
+        self.metrics.record("push", 0.5)
+
+        exported = json.loads(self.metrics.to_json())
+
+        self.assertEqual(1, exported["operations"]["push"]["count"])
+        self.assertEqual(0.5, exported["operations"]["push"]["seconds"])
+        self.assertEqual(len(MemoMetrics.latency_buckets),
+                         len(exported["latency_buckets"]))
+
+    def test_to_prometheus(self):
+        self.metrics.record("push", 0.5)
+        self.metrics.record("render", 0.00005, 2, 100)
+
+        lines = self.metrics.to_prometheus().splitlines()
+
+        self.assertIn("# TYPE pymemo_operation_seconds histogram", lines)
+        self.assertIn('pymemo_operation_seconds_bucket{operation="push",'
+                      'le="0.1"} 0', lines)
+        self.assertIn('pymemo_operation_seconds_bucket{operation="push",'
+                      'le="1.0"} 1', lines)
+        self.assertIn('pymemo_operation_seconds_bucket{operation="push",'
+                      'le="+Inf"} 1', lines)
+        self.assertIn('pymemo_operation_seconds_count{operation="push"} 1',
+                      lines)
+        self.assertIn('pymemo_operation_tasks_total{operation="render"} 2',
+                      lines)
+        self.assertIn('pymemo_operation_characters_total'
+                      '{operation="render"} 100', lines)
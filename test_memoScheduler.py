@@ -0,0 +1,162 @@
+import datetime
+import random
+from unittest import TestCase
+
+from PyMemo import Memo
+from PyMemo import MemoScheduler
+from PyMemo import MemoSchedulerIsEmpty
+from PyMemo import MemoStack
+from PyMemo import Task
+
+
+class TestMemoScheduler(TestCase):
+    def setUp(self):
+        self.scheduler = MemoScheduler()
+        self.memos = [Memo("Test Memo {0}".format(number))
+                      for number in range(1, 5)]
+
+    def test_next_by_priority_and_deadline(self):
+        self.scheduler.schedule(self.memos[0], 1)
+        self.scheduler.schedule(self.memos[1], 2, datetime.date(2026, 12, 24))
+        self.scheduler.schedule(self.memos[2], 2, datetime.date(2026, 12, 20))
+        self.scheduler.schedule(self.memos[3])
+
+        self.assertEqual(self.memos[2], self.scheduler.peek())
+        self.assertEqual([self.memos[2], self.memos[1], self.memos[0],
+                          self.memos[3]],
+                         [self.scheduler.next() for _ in range(4)])
+        self.assertEqual(0, len(self.scheduler))
+
+    def test_ties_keep_the_order_of_scheduling(self):
+        for memo in self.memos:
+            self.scheduler.schedule(memo, 1)
+
+        self.scheduler.schedule(self.memos[0], 1)
+
+        self.assertEqual(self.memos, [self.scheduler.next()
+                                      for _ in range(4)])
+
+    def test_schedule_takes_priority_and_deadline_of_memo(self):
+        memo = Memo("Test Memo", priority=5, deadline=datetime.date.today())
+        self.scheduler.schedule(self.memos[0], 4)
+        self.scheduler.schedule(memo)
+
+        self.assertEqual(memo, self.scheduler.peek())
+        self.assertEqual((5, datetime.date.today()),
+                         self.scheduler.get_schedule(memo))
+
+    def test_reschedule(self):
+        for priority, memo in enumerate(self.memos):
+            self.scheduler.schedule(memo, priority)
+
+        self.scheduler.schedule(self.memos[3], 0)
+        self.scheduler.schedule(self.memos[0], 9)
+
+        self.assertEqual(9, self.memos[0].priority)
+        self.assertEqual([self.memos[0], self.memos[2], self.memos[1],
+                          self.memos[3]],
+                         [memo for memo, _, _ in self.scheduler.top(4)])
+
+    def test_remove(self):
+        for priority, memo in enumerate(self.memos):
+            self.scheduler.schedule(memo, priority)
+
+        self.assertTrue(self.scheduler.remove(self.memos[2]))
+        self.assertFalse(self.scheduler.remove(self.memos[2]))
+        self.assertNotIn(self.memos[2], self.scheduler)
+        self.assertIsNone(self.scheduler.get_schedule(self.memos[2]))
+        self.assertEqual([self.memos[3], self.memos[1], self.memos[0]],
+                         [self.scheduler.next() for _ in range(3)])
+
+    def test_remove_clears_priority_and_deadline(self):
+        self.scheduler.schedule(self.memos[0], 1, datetime.date(2026, 12, 24))
+        self.scheduler.schedule(self.memos[1], 2)
+        self.scheduler.remove(self.memos[0])
+        self.scheduler.next()
+
+        self.assertEqual([(None, None), (None, None)],
+                         [(memo.priority, memo.deadline)
+                          for memo in self.memos[:2]])
+
+    def test_follow_memo_stack(self):
+        memo_stack = MemoStack()
+        memo_stack.push(self.memos[0])
+        self.memos[1].priority = 2
+        scheduler = MemoScheduler(memo_stack)
+        scheduler.schedule(self.memos[0], 1)
+        memo_stack.push(self.memos[1])
+        memo_stack.push(self.memos[2])
+
+        self.assertEqual([self.memos[1], self.memos[0]],
+                         [memo for memo, _, _ in scheduler.top(3)])
+
+        memo_stack.pop()
+        memo_stack.pop()
+
+        self.assertEqual([self.memos[0]],
+                         [memo for memo, _, _ in scheduler.top(3)])
+        self.assertEqual(2, self.memos[1].priority)
+
+        memo_stack.push(self.memos[1])
+
+        self.assertEqual((2, None), scheduler.get_schedule(self.memos[1]))
+        scheduler.close()
+
+    def test_memo_pushed_twice_stays_scheduled(self):
+        memo_stack = MemoStack()
+        scheduler = MemoScheduler.shared(memo_stack)
+        memo_stack.push(self.memos[0])
+        memo_stack.push(self.memos[0])
+        scheduler.schedule(self.memos[0], 1)
+        memo_stack.pop()
+
+        self.assertIn(self.memos[0], scheduler)
+        self.assertIs(scheduler, MemoScheduler.shared(memo_stack))
+
+    def test_tasks(self):
+        tasks = [Task("Test Task 1"), Task("Test Task 2")]
+        self.scheduler.schedule(tasks[0], 1)
+        self.scheduler.schedule(tasks[1], 2)
+
+        self.assertEqual(tasks[1], self.scheduler.next())
+        self.assertEqual((1, None), self.scheduler.get_schedule(tasks[0]))
+
+    def test_top(self):
+        self.scheduler.schedule(self.memos[0], 1, datetime.date(2026, 1, 1))
+        self.scheduler.schedule(self.memos[1], 2)
+
+        self.assertEqual([(self.memos[1], 2, None)], self.scheduler.top(1))
+        self.assertEqual(2, len(self.scheduler.top(5)))
+        self.assertEqual([], self.scheduler.top(0))
+
+    def test_random_operations_keep_the_order(self):
+        scheduler_random = random.Random(4711)
+        memos = [Memo("Test Memo {0}".format(number)) for number in range(200)]
+        expected_priorities = {}
+
+        for _ in range(2000):
+            memo = scheduler_random.choice(memos)
+
+            if scheduler_random.random() < 0.2:
+                self.scheduler.remove(memo)
+                expected_priorities.pop(memo, None)
+            else:
+                priority = scheduler_random.randint(0, 20)
+                self.scheduler.schedule(memo, priority)
+                expected_priorities[memo] = priority
+
+        expected_order = sorted(expected_priorities.values(), reverse=True)
+
+        self.assertEqual(expected_order, [
+            priority for _, priority, _
+            in self.scheduler.top(len(expected_priorities))])
+        self.assertEqual(expected_order, [
+            expected_priorities[self.scheduler.next()]
+            for _ in expected_order])
+
+    def test_empty(self):
+        with self.assertRaises(MemoSchedulerIsEmpty):
+            self.scheduler.peek()
+
+        with self.assertRaises(MemoSchedulerIsEmpty):
+            self.scheduler.next()
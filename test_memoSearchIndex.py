@@ -0,0 +1,135 @@
+from unittest import TestCase
+
+from PyMemo import Memo
+from PyMemo import MemoSearchIndex
+from PyMemo import MemoStack
+from PyMemo import Task
+
+
+class TestMemoSearchIndex(TestCase):
+    def setUp(self):
+        self.memo_stack = MemoStack()
+        self.memo = Memo("Groceries", [Task("Buy milk"), Task("Buy bread"),
+                                       Task("Call the bakery")])
+        self.memo_stack.push(self.memo)
+        self.index = MemoSearchIndex(self.memo_stack)
+
+    def test_search(self):
+        self.assertEqual([(self.memo, 2)], self.index.search("bread"))
+
+    def test_search_is_case_insensitive(self):
+        self.assertEqual([(self.memo, 1)], self.index.search("MILK"))
+
+    def test_search_ranks_by_matched_words(self):
+        self.assertEqual([(self.memo, 2), (self.memo, 1)],
+                         self.index.search("buy bread"))
+
+    def test_search_with_prefix(self):
+        self.assertEqual([(self.memo, 2), (self.memo, 3)],
+                         self.index.search("br* bak*"))
+        self.assertEqual([(self.memo, 1), (self.memo, 2), (self.memo, 3)],
+                         self.index.search("b*"))
+
+    def test_search_word_of_several_terms(self):
+        task = Task("Answer the e-mail")
+        self.memo.add_task(Task("Write a mail"))
+        self.memo.add_task(task)
+
+        self.assertEqual([(self.memo, 5)], self.index.search("e-mail"))
+        self.assertEqual([], self.index.search("e-milk"))
+
+    def test_search_without_hits(self):
+        self.assertEqual([], self.index.search("butter"))
+        self.assertEqual([], self.index.search("x*"))
+
+    def test_search_by_completion(self):
+        self.memo.complete_task(1)
+
+        self.assertEqual([(self.memo, 1)],
+                         self.index.search("buy", completed=True))
+        self.assertEqual([(self.memo, 2)],
+                         self.index.search("buy", completed=False))
+
+    def test_search_with_limit(self):
+        self.assertEqual([(self.memo, 1)], self.index.search("buy", limit=1))
+
+    def test_added_and_removed_tasks(self):
+        task = Task("Buy butter")
+        self.memo.add_task(task)
+
+        self.assertEqual([(self.memo, 4)], self.index.search("butter"))
+
+        self.memo.remove_task(self.memo.get_task(1))
+
+        self.assertEqual([(self.memo, 3)], self.index.search("butter"))
+        self.assertEqual([], self.index.search("milk"))
+
+    def test_changed_description(self):
+        self.memo.get_task(1).description = "Buy oat milk"
+
+        self.assertEqual([(self.memo, 1)], self.index.search("oat"))
+
+        self.memo.get_task(1).description = "Buy water"
+
+        self.assertEqual([], self.index.search("oat"))
+        self.assertEqual([], self.index.search("milk"))
+
+    def test_pushed_and_popped_memos(self):
+        top_memo = Memo("Bakery", [Task("Pick up bread")])
+        self.memo_stack.push(top_memo)
+
+        self.assertEqual([(top_memo, 1), (self.memo, 2)],
+                         self.index.search("bread"))
+
+        top_memo.complete_task(1)
+        self.memo_stack.pop()
+
+        self.assertEqual([(self.memo, 2)], self.index.search("bread"))
+
+    def test_task_shared_between_memos(self):
+        top_memo = Memo("Bakery", [self.memo.get_task(2)])
+        self.memo_stack.push(top_memo)
+
+        self.assertEqual([(top_memo, 1), (self.memo, 2)],
+                         self.index.search("bread"))
+
+        self.memo.remove_task(self.memo.get_task(2))
+
+        self.assertEqual([(top_memo, 1)], self.index.search("bread"))
+
+    def test_memo_pushed_twice(self):
+        self.memo_stack.push(self.memo)
+        self.memo.complete_tasks([1, 2, 3])
+        self.memo_stack.pop()
+        self.memo.add_task(Task("Buy butter"))
+
+        self.assertEqual([(self.memo, 4)], self.index.search("butter"))
+
+    def test_scan_ranks_like_search(self):
+        self.memo_stack.push(Memo("Bakery", [Task("Pick up bread"),
+                                             Task("Buy e-mail bread")]))
+        self.memo.complete_task(2)
+
+        for query, completed, limit in (
+                ("bread", None, None), ("buy bread", None, None),
+                ("br* bak*", None, None), ("b*", True, None),
+                ("buy", False, 1), ("e-mail", None, None),
+                ("butter x*", None, None)):
+            self.assertEqual(
+                self.index.search(query, completed, limit),
+                MemoSearchIndex.scan(self.memo_stack, query, completed,
+                                     limit))
+
+    def test_shared(self):
+        index = MemoSearchIndex.shared(self.memo_stack)
+
+        self.assertIs(index, MemoSearchIndex.shared(self.memo_stack))
+        self.assertIsNot(index, MemoSearchIndex.shared(MemoStack()))
+        self.assertEqual([(self.memo, 2)], index.search("bread"))
+
+    def test_close(self):
+        self.index.close()
+        self.memo.add_task(Task("Buy butter"))
+
+        self.assertEqual([], self.index.search("butter"))
+        self.assertEqual([], self.index.search("milk"))
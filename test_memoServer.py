@@ -0,0 +1,102 @@
+import asyncio
+import os
+import socket
+import tempfile
+from unittest import TestCase
+from unittest import skipUnless
+
+from PyMemo import Memo
+from PyMemo import MemoStack
+from PyMemoServer import MemoServer
+
+
+class TestMemoServer(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.memo_stack = MemoStack()
+        self.server = MemoServer(self.memo_stack)
+        self.address = self.loop.run_until_complete(self.server.start())
+
+    def tearDown(self):
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+
+    def test_execute_commands(self):
+        output = self.loop.run_until_complete(
+            self.__send("m", "Test Memo", "t Test Task", "c 1", "p", "q"))
+
+        self.assertEqual("*************************\n"
+                         "*       Test Memo       *\n"
+                         "*************************\n"
+                         "* [1] Test Task         *\n"
+                         "*************************\n", output)
+        self.assertTrue(self.memo_stack.peek().is_completed())
+
+    def test_errors_are_sent_to_the_client(self):
+        output = self.loop.run_until_complete(self.__send("pop", "q"))
+
+        self.assertEqual("The memo stack is empty.\n", output)
+
+    def test_clients_share_the_memo_stack(self):
+        self.loop.run_until_complete(self.__send("m Test Memo", "q"))
+        output = self.loop.run_until_complete(
+            self.__send("t Test Task", "p", "q"))
+
+        self.assertIn("* [1] Test Task", output)
+        self.assertEqual(1, len(self.memo_stack.memos))
+
+    def test_concurrent_clients(self):
+        self.memo_stack.push(Memo("Test Memo"))
+        client_count = 50
+        task_count = 20
+
+        async def send_concurrently():
+            await asyncio.gather(*[
+                self.__send(*["t Task {0}.{1}".format(client, task)
+                              for task in range(task_count)] + ["q"])
+                for client in range(client_count)])
+
+        self.loop.run_until_complete(send_concurrently())
+
+        self.assertEqual((0, client_count * task_count),
+                         self.memo_stack.peek().progress())
+        self.assertEqual(0, self.server.session_count)
+
+    def test_disconnect_without_quit(self):
+        self.loop.run_until_complete(self.__send("m Test Memo"))
+
+        self.assertEqual(1, len(self.memo_stack.memos))
+
+    @skipUnless(hasattr(socket, "AF_UNIX"), "requires Unix domain sockets")
+    def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "pymemo.sock")
+            server = MemoServer(self.memo_stack)
+            self.loop.run_until_complete(server.start_unix(path))
+
+            async def send():
+                reader, writer = await asyncio.open_unix_connection(path)
+                writer.write(b"m Test Memo\nt Test Task\npop\nq\n")
+                output = await reader.read()
+                writer.close()
+                return output
+
+            try:
+                output = self.loop.run_until_complete(send())
+            finally:
+                server.close()
+                self.loop.run_until_complete(server.wait_closed())
+
+        self.assertIn(b"You cannot remove this memo", output)
+
+    async def __send(self, *lines):
+        reader, writer = await asyncio.open_connection(*self.address)
+        writer.write("".join(line + "\n" for line in lines).encode("utf-8"))
+
+        if lines[-1] != "q":
+            writer.write_eof()
+
+        output = await reader.read()
+        writer.close()
+        return output.decode("utf-8")
@@ -0,0 +1,154 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from PyMemo import InvalidTaskId
+from PyMemo import Memo
+from PyMemo import MemoStack
+from PyMemo import Task
+from PyMemoStorage import MemoSnapshot
+
+
+class TestMemoSnapshot(TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temporary_directory.name,
+                                 "stack.snapshot")
+
+        memo_stack = MemoStack()
+        memo_stack.push(Memo("First Test Memo", [Task("Test Task")]))
+        memo_stack.push(Memo("Second Test Mémo", [
+            Task("Test Task " + str(task_count))
+            for task_count in range(1, 6)]))
+        memo_stack.peek().complete_task(2)
+        MemoSnapshot.write(memo_stack, self.path)
+
+        self.snapshot = MemoSnapshot(self.path)
+
+    def tearDown(self):
+        self.snapshot.close()
+        self.temporary_directory.cleanup()
+
+    def test_open(self):
+        memo_stack = self.snapshot.open()
+
+        self.assertEqual(["First Test Memo", "Second Test Mémo"],
+                         [memo.name for memo in memo_stack.memos])
+        self.assertEqual([("Test Task 1", False), ("Test Task 2", True),
+                          ("Test Task 3", False), ("Test Task 4", False),
+                          ("Test Task 5", False)],
+                         self.__describe_tasks(memo_stack.peek()))
+        self.assertEqual((1, 5), memo_stack.peek().progress())
+
+    def test_open_task_ids(self):
+        memo = self.snapshot.open().peek()
+
+        self.assertEqual([1, 3, 4, 5], memo.open_task_ids())
+        self.assertEqual((3, memo.get_task(3)), memo.next_open_task(2))
+        self.assertEqual(4, memo.count_open())
+
+        memo.add_task(Task("Test Task 6"))
+        memo.complete_task(1)
+
+        self.assertEqual([1, 2], memo.completed_task_ids())
+
+    def test_get_task_returns_same_task(self):
+        memo = self.snapshot.open().peek()
+
+        self.assertIs(memo.get_task(3), memo.get_task(3))
+
+    def test_complete_task_in_place(self):
+        memo = self.snapshot.open().memos[0]
+        memo.complete_task(1)
+        self.snapshot.close()
+
+        memo = MemoSnapshot(self.path).open().memos[0]
+
+        self.assertTrue(memo.get_task(1).is_completed)
+        self.assertTrue(memo.is_completed())
+
+    def test_complete_task_with_invalid_id(self):
+        memo = self.snapshot.open().peek()
+
+        with self.assertRaises(InvalidTaskId):
+            memo.complete_task(6)
+
+    def test_add_task_loads_tasks_into_memory(self):
+        memo = self.snapshot.open().peek()
+        task_four = memo.get_task(4)
+
+        memo.add_task(Task("Test Task 6"))
+        memo.remove_task(task_four)
+        memo.complete_task(4)
+
+        self.assertEqual([("Test Task 1", False), ("Test Task 2", True),
+                          ("Test Task 3", False), ("Test Task 5", True),
+                          ("Test Task 6", False)],
+                         self.__describe_tasks(memo))
+        self.assertEqual((2, 5), memo.progress())
+
+    def test_completing_loaded_task_updates_snapshot(self):
+        memo = self.snapshot.open().peek()
+        memo.add_task(Task("Test Task 6"))
+        memo.complete_tasks([1, 3, 4, 5])
+        self.snapshot.close()
+
+        memo = MemoSnapshot(self.path).open().peek()
+
+        self.assertEqual((5, 5), memo.progress())
+
+    def test_format_mapped_memo(self):
+        memo = self.snapshot.open().memos[0]
+
+        self.assertEqual("*************************\n"
+                         "*    First Test Memo    *\n"
+                         "*************************\n"
+                         "* [1] Test Task         *\n"
+                         "*************************", str(memo))
+
+    def test_open_file_without_snapshot(self):
+        with open(self.path, "wb") as snapshot_file:
+            snapshot_file.write(b"no snapshot at all")
+
+        with self.assertRaises(ValueError):
+            self.snapshot.open()
+
+    def test_open_empty_file(self):
+        open(self.path, "wb").close()
+
+        with self.assertRaises(ValueError) as raised:
+            self.snapshot.open()
+
+        self.assertIn("no memo snapshot", str(raised.exception))
+
+    def test_open_truncated_file(self):
+        os.truncate(self.path, os.path.getsize(self.path) - 1)
+
+        with self.assertRaises(ValueError) as raised:
+            self.snapshot.open()
+
+        self.assertIn("truncated", str(raised.exception))
+
+    def test_open_read_only_file(self):
+        os.chmod(self.path, 0o444)
+
+        memo = self.snapshot.open().peek()
+
+        self.assertEqual("Test Task 3", memo.get_task(3).description)
+
+    def test_use_task_of_closed_snapshot(self):
+        memo = self.snapshot.open().peek()
+        task = memo.get_task(3)
+        self.snapshot.close()
+
+        for use in (lambda: task.description, task.complete,
+                    memo.progress):
+            with self.assertRaises(ValueError) as raised:
+                use()
+
+            self.assertIn("closed", str(raised.exception))
+
+    @staticmethod
+    def __describe_tasks(memo):
+        return [(task.description, task.is_completed)
+                for _, task in memo.list_id_task_tuples()]
@@ -1,3 +1,4 @@
+import threading
 from unittest import TestCase
 
 from PyMemo import MemoStack
@@ -11,9 +12,6 @@ class TestMemoStack(TestCase):
     def setUp(self):
         self.memo_stack = MemoStack()
 
-    def test_fail(self):
-        self.assertEqual(1,0)
-        
     def test_push_on_empty_stack(self):
         memo = Memo("Test Memo")
 
@@ -118,3 +116,68 @@ class TestMemoStack(TestCase):
 
     def test_is_empty_on_empty_stack(self):
         self.assertTrue(self.memo_stack.is_empty())
+
+    def test_pop_if_completed(self):
+        memo = Memo("Test Memo")
+        self.memo_stack.push(memo)
+
+        self.assertIs(memo, self.memo_stack.pop_if_completed())
+        self.assertTrue(self.memo_stack.is_empty())
+
+    def test_pop_if_completed_with_the_top_memo_not_completed(self):
+        memo = Memo("Test Memo", [Task("Incomplete Task")])
+        self.memo_stack.push(memo)
+
+        self.assertIsNone(self.memo_stack.pop_if_completed())
+        self.assertIs(memo, self.memo_stack.peek())
+
+    def test_pop_if_completed_from_empty_stack(self):
+        self.assertIsNone(self.memo_stack.pop_if_completed())
+
+    def test_snapshot(self):
+        memo = Memo("Test Memo", [Task("Test Task 1"), Task("Test Task 2")])
+        self.memo_stack.push(Memo("Other Test Memo"))
+        self.memo_stack.push(memo)
+        memo.complete_task(2)
+
+        snapshot = self.memo_stack.snapshot()
+        memo.add_task(Task("Test Task 3"))
+        self.memo_stack.pop_if_completed()
+
+        self.assertEqual((("Other Test Memo", ()),
+                          ("Test Memo", (("Test Task 1", False),
+                                         ("Test Task 2", True)))),
+                         snapshot)
+
+    def test_snapshot_of_empty_stack(self):
+        self.assertEqual((), self.memo_stack.snapshot())
+
+    def test_concurrent_pop_if_completed_only_pops_completed_memos(self):
+        popped_memos = []
+
+        def push_memos():
+            for _ in range(500):
+                memo = Memo("Test Memo", [Task("Test Task")])
+                self.memo_stack.push(memo)
+                memo.complete_task(1)
+
+        def pop_memos():
+            for _ in range(2000):
+                memo = self.memo_stack.pop_if_completed()
+
+                if memo is not None:
+                    popped_memos.append((memo, memo.is_completed()))
+
+        threads = [threading.Thread(target=push_memos) for _ in range(2)] \
+            + [threading.Thread(target=pop_memos) for _ in range(2)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(is_completed for _, is_completed
+                            in popped_memos))
+        self.assertEqual(1000,
+                         len(popped_memos) + len(self.memo_stack.memos))
@@ -0,0 +1,89 @@
+from unittest import TestCase
+
+from PyMemo import InvalidTaskId
+from PyMemo import Memo
+from PyMemo import MemoNotCompleted
+from PyMemo import MemoStackIsEmpty
+from PyMemo import Task
+from PyMemoRegistry import MemoStackRegistry
+
+
+class TestMemoStackRegistry(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.registry = MemoStackRegistry(shard_count=2).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.registry.close()
+
+    def setUp(self):
+        self.key = self.id()
+
+    def test_push_and_peek(self):
+        self.registry.push(self.key, Memo("Test Memo", [Task("Test Task")]))
+
+        memo = self.registry.peek(self.key)
+
+        self.assertEqual("Test Memo", memo.name)
+        self.assertEqual("Test Task", memo.get_task(1).description)
+        self.assertFalse(self.registry.is_empty(self.key))
+
+    def test_complete_task_and_pop(self):
+        self.registry.push(self.key, Memo("Test Memo", [Task("Test Task")]))
+
+        with self.assertRaises(MemoNotCompleted) as raised:
+            self.registry.pop(self.key)
+
+        self.assertEqual("Test Memo", raised.exception.memo.name)
+
+        self.registry.complete_task(self.key, 1)
+        memo = self.registry.pop(self.key)
+
+        self.assertTrue(memo.is_completed())
+        self.assertTrue(self.registry.is_empty(self.key))
+
+    def test_pushed_memo_is_copied(self):
+        memo = Memo("Test Memo", [Task("Test Task")])
+        self.registry.push(self.key, memo)
+
+        memo.complete_task(1)
+
+        self.assertFalse(self.registry.peek(self.key).is_completed())
+
+    def test_unknown_key_is_an_empty_stack(self):
+        self.assertTrue(self.registry.is_empty(self.key))
+
+        with self.assertRaises(MemoStackIsEmpty):
+            self.registry.peek(self.key)
+
+        with self.assertRaises(MemoStackIsEmpty):
+            self.registry.complete_task(self.key, 1)
+
+    def test_complete_task_with_invalid_id(self):
+        self.registry.push(self.key, Memo("Test Memo"))
+
+        with self.assertRaises(InvalidTaskId) as raised:
+            self.registry.complete_task(self.key, 1)
+
+        self.assertEqual(1, raised.exception.index)
+
+    def test_execute_batch_across_shards(self):
+        keys = [self.key + str(number) for number in range(10)]
+        calls = [("push", key, Memo(key, [Task("Test Task")]))
+                 for key in keys]
+        calls += [("complete_task", key, 1) for key in keys[::2]]
+        calls += [("pop", key) for key in keys]
+
+        results = self.registry.execute(calls)
+
+        popped_memos = results[-len(keys):]
+        self.assertEqual(keys[::2], [memo.name for memo in popped_memos[::2]])
+        self.assertTrue(all(isinstance(result, MemoNotCompleted)
+                            for result in popped_memos[1::2]))
+        self.assertEqual([True, False] * 5,
+                         [self.registry.is_empty(key) for key in keys])
+
+    def test_execute_unknown_operation(self):
+        with self.assertRaises(ValueError):
+            self.registry.execute([("clear", self.key)])
@@ -0,0 +1,194 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from PyMemo import InvalidTaskId
+from PyMemo import Memo
+from PyMemo import MemoNotCompleted
+from PyMemo import MemoStackIsEmpty
+from PyMemo import Task
+from PyMemoStorage import SqliteMemoStack
+
+
+class TestSqliteMemoStack(TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temporary_directory.name, "memos.db")
+        self.memo_stack = SqliteMemoStack(self.path)
+
+    def tearDown(self):
+        self.memo_stack.close()
+        self.temporary_directory.cleanup()
+
+    def test_is_empty_on_empty_stack(self):
+        self.assertTrue(self.memo_stack.is_empty())
+
+    def test_peek_from_empty_stack(self):
+        with self.assertRaises(MemoStackIsEmpty):
+            self.memo_stack.peek()
+
+    def test_push_and_peek(self):
+        self.memo_stack.push(Memo("First Test Memo"))
+        self.memo_stack.push(Memo("Second Test Memo", [Task("Test Task")]))
+
+        memo = self.memo_stack.peek()
+
+        self.assertEqual("Second Test Memo", memo.name)
+        self.assertEqual("Test Task", memo.get_task(1).description)
+        self.assertEqual(2, len(self.memo_stack.memos))
+
+    def test_peek_returns_same_memo(self):
+        self.memo_stack.push(Memo("Test Memo"))
+
+        self.assertIs(self.memo_stack.peek(), self.memo_stack.peek())
+
+    def test_pop_returns_in_memory_memo(self):
+        self.memo_stack.push(Memo("Test Memo", [Task("Test Task")]))
+        self.memo_stack.peek().complete_task(1)
+
+        popped_memo = self.memo_stack.pop()
+
+        self.assertIsInstance(popped_memo, Memo)
+        self.assertTrue(popped_memo.get_task(1).is_completed)
+        self.assertTrue(self.memo_stack.is_empty())
+
+    def test_pop_with_the_top_memo_not_completed(self):
+        self.memo_stack.push(Memo("Test Memo", [Task("Test Task")]))
+
+        with self.assertRaises(MemoNotCompleted):
+            self.memo_stack.pop()
+
+        self.assertFalse(self.memo_stack.is_empty())
+
+    def test_pop_if_completed(self):
+        self.memo_stack.push(Memo("Test Memo", [Task("Test Task")]))
+
+        self.assertIsNone(self.memo_stack.pop_if_completed())
+
+        self.memo_stack.peek().complete_task(1)
+        popped_memo = self.memo_stack.pop_if_completed()
+
+        self.assertEqual("Test Memo", popped_memo.name)
+        self.assertTrue(self.memo_stack.is_empty())
+        self.assertIsNone(self.memo_stack.pop_if_completed())
+
+    def test_add_and_remove_tasks(self):
+        self.memo_stack.push(Memo("Test Memo"))
+        memo = self.memo_stack.peek()
+        task = Task("Test Task 1")
+
+        memo.add_task(task)
+        memo.add_task(task)
+        memo.add_tasks([Task("Test Task 2"), Task("Test Task 3")])
+        memo.remove_task(memo.get_task(2))
+
+        self.assertEqual(["Test Task 1", "Test Task 3"],
+                         [task.description for _, task
+                          in memo.list_id_task_tuples()])
+        self.assertEqual((0, 2), memo.progress())
+
+    def test_completing_task_directly_is_stored(self):
+        self.memo_stack.push(Memo("Test Memo"))
+        task = Task("Test Task")
+        self.memo_stack.peek().add_task(task)
+
+        task.complete()
+
+        self.assertTrue(self.__reopen().peek().is_completed())
+
+    def test_complete_tasks(self):
+        self.memo_stack.push(Memo("Test Memo", [
+            Task("Test Task " + str(task_count))
+            for task_count in range(1, 6)]))
+        memo = self.memo_stack.peek()
+        task_two = memo.get_task(2)
+
+        memo.complete_tasks([2, 3, 3, 5])
+
+        self.assertTrue(task_two.is_completed)
+        self.assertEqual((3, 5), memo.progress())
+
+    def test_open_task_ids(self):
+        self.memo_stack.push(Memo("Test Memo", [
+            Task("Test Task " + str(task_count))
+            for task_count in range(1, 5)]))
+        memo = self.memo_stack.peek()
+
+        memo.complete_tasks([1, 3])
+
+        self.assertEqual([2, 4], memo.open_task_ids())
+        self.assertEqual([1, 3], memo.completed_task_ids(limit=2))
+        self.assertEqual(2, memo.next_open_task(after_id=1)[0])
+        self.assertEqual(2, memo.count_open())
+
+    def test_complete_tasks_with_invalid_id_completes_nothing(self):
+        self.memo_stack.push(Memo("Test Memo", [Task("Test Task")]))
+        memo = self.memo_stack.peek()
+
+        with self.assertRaises(InvalidTaskId):
+            memo.complete_tasks([1, 2])
+
+        self.assertEqual((0, 1), memo.progress())
+
+    def test_transaction_is_rolled_back_on_error(self):
+        self.memo_stack.push(Memo("Test Memo"))
+
+        with self.assertRaises(InvalidTaskId):
+            with self.memo_stack.transaction():
+                self.memo_stack.peek().add_task(Task("Test Task"))
+                self.memo_stack.peek().complete_task(2)
+
+        self.assertEqual((0, 0), self.memo_stack.peek().progress())
+
+    def test_task_ids_follow_removed_tasks(self):
+        self.memo_stack.push(Memo("Test Memo", [
+            Task("Test Task " + str(task_count))
+            for task_count in range(1, 8)]))
+        memo = self.memo_stack.peek()
+
+        memo.remove_tasks([memo.get_task(2), memo.get_task(3),
+                           memo.get_task(5)])
+        memo.complete_tasks([3])
+
+        self.assertEqual("Test Task 6", memo.get_task(3).description)
+        self.assertEqual([(1, "Test Task 1"), (2, "Test Task 4"),
+                          (4, "Test Task 7")],
+                         [(task_id, task.description) for task_id, task
+                          in memo._iter_id_task_tuples(completed=False)])
+
+    def test_rollback_invalidates_tasks(self):
+        self.memo_stack.push(Memo("Test Memo", [Task("Test Task")]))
+        memo = self.memo_stack.peek()
+        task = memo.get_task(1)
+
+        with self.assertRaises(InvalidTaskId):
+            with self.memo_stack.transaction():
+                task.complete()
+                memo.complete_task(2)
+
+        self.assertFalse(memo.get_task(1).is_completed)
+        self.assertIsNot(task, memo.get_task(1))
+
+        task.description = "Detached Test Task"
+
+        self.assertEqual("Test Task", memo.get_task(1).description)
+
+    def test_stacks_are_kept_apart_by_name(self):
+        self.memo_stack.push(Memo("Test Memo"))
+
+        with SqliteMemoStack(self.path, "other") as other_memo_stack:
+            self.assertTrue(other_memo_stack.is_empty())
+
+    def test_reopen(self):
+        self.memo_stack.push(Memo("Test Memo", [Task("Test Task")]))
+        self.memo_stack.peek().name = "Renamed Test Memo"
+
+        memo = self.__reopen().peek()
+
+        self.assertEqual("Renamed Test Memo", memo.name)
+        self.assertEqual("Test Task", memo.get_task(1).description)
+
+    def __reopen(self):
+        self.memo_stack.close()
+        self.memo_stack = SqliteMemoStack(self.path)
+        return self.memo_stack
@@ -1,4 +1,6 @@
+import threading
 from unittest import TestCase
+from PyMemo import Memo
 from PyMemo import Task
 
 
@@ -22,3 +24,41 @@ class TestTask(TestCase):
         self.task.complete()
 
         self.assertTrue(self.task.is_completed)
+
+    def test_create_all(self):
+        tasks = Task._create_all([("Test Task 1", 1), ("Test Task 2", None)])
+
+        self.assertEqual([("Test Task 1", True), ("Test Task 2", False)],
+                         [(task.description, task.is_completed)
+                          for task in tasks])
+
+    def test_bulk_operations_take_only_the_locks_of_their_tasks(self):
+        locks = Task._Task__locks
+        memo = Memo("Test Memo", [Task("Test Task 1"), Task("Test Task 2")])
+        used_indexes = {(id(memo.get_task(task_id)) >> 4) % len(locks)
+                        for task_id in (1, 2)}
+        other_lock = next(lock for index, lock in enumerate(locks)
+                          if index not in used_indexes)
+        is_holding = threading.Event()
+        may_release = threading.Event()
+
+        def hold_other_lock():
+            with other_lock:
+                is_holding.set()
+                may_release.wait()
+
+        holder = threading.Thread(target=hold_other_lock)
+        holder.start()
+        is_holding.wait()
+
+        try:
+            completer = threading.Thread(target=memo.complete_tasks,
+                                         args=([1, 2],))
+            completer.start()
+            completer.join(5)
+
+            self.assertFalse(completer.is_alive())
+            self.assertEqual((2, 2), memo.progress())
+        finally:
+            may_release.set()
+            holder.join()